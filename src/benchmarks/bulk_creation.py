@@ -0,0 +1,91 @@
+"""
+Times creating N buildings one entity at a time (create_entity + add_components + set_parent)
+against a single create_entities batch, as SceneGeneratorSystem now does.
+
+Run from `src/`:
+
+    python -m benchmarks.bulk_creation --counts 1000 50000
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from entities.components.command_buffer import CommandBuffer
+from entities.components.entity_flags import EntityFlags
+from entities.components.street_scene.building import Building
+from entities.components.transform import Transform, TransformData
+from entities.components.visuals.assets import Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.systems.command_buffer import CommandBufferSystem
+from entities.systems.street_scene.scene_generator import SceneGeneratorSystem
+
+
+def one_by_one(registry: Registry, root: int, positions: np.ndarray, scales: np.ndarray, mesh: Mesh, material: Material) -> List[int]:
+    entities = []
+    for i in range(len(positions)):
+        entity = registry.create_entity()
+        registry.add_components(
+            entity,
+            EntityFlags(name=f"Building {i}"),
+            Transform(local=TransformData(position=positions[i].copy(), scale=scales[i].copy())),
+            Visuals(mesh, material),
+            Building()
+        )
+        registry.set_parent(entity, root)
+        entities.append(entity)
+    return entities
+
+
+def batched(registry: Registry, root: int, positions: np.ndarray, scales: np.ndarray, mesh: Mesh, material: Material) -> List[int]:
+    buffer = CommandBuffer()
+    entities = SceneGeneratorSystem.create_static_meshes(registry, buffer, root, "Building", positions, scales, mesh, material, Building)
+    CommandBufferSystem.apply(registry, buffer)
+    return entities
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mesh = Mesh(id=1)
+    material = Material()
+
+    print(f"{'buildings':>10} {'one by one (ms)':>16} {'batched (ms)':>13} {'speedup':>8}")
+    for count in args.counts:
+        positions = rng.uniform(-500, 500, (count, 3)).astype(np.float32)
+        scales = rng.uniform(5, 40, (count, 3)).astype(np.float32)
+
+        timings = []
+        results = []
+        for create in (one_by_one, batched):
+            best = float("inf")
+            for _ in range(args.repeat):
+                registry = Registry()
+                root = registry.create_entity()
+                registry.add_components(root, EntityFlags(name="Street scene"), Transform())
+                start = time.perf_counter()
+                entities = create(registry, root, positions, scales, mesh, material)
+                best = min(best, time.perf_counter() - start)
+            timings.append(best)
+            results.append((registry, entities))
+
+        # both paths must produce the same entities
+        (reg_a, ents_a), (reg_b, ents_b) = results
+        assert ents_a == ents_b and reg_a.get_children(root) == reg_b.get_children(root)
+        for a, b in zip(ents_a, ents_b):
+            (ta, fa), (tb, fb) = reg_a.get_components(a, Transform, EntityFlags), reg_b.get_components(b, Transform, EntityFlags)  # type: ignore
+            assert fa.name == fb.name and (ta.local.position == tb.local.position).all() and (ta.local.scale == tb.local.scale).all()
+        assert list(reg_a.get_all_components(ents_a[0])) == list(reg_b.get_all_components(ents_b[0]))
+
+        print(f"{count:>10} {timings[0] * 1000:>16.2f} {timings[1] * 1000:>13.2f} {timings[0] / timings[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Times TransformInheritanceSystem on a street-like scene when every transform changed
+(what every frame cost before change ticks) against a frame where only the vehicles moved.
+
+Run from `src/`:
+
+    python -m benchmarks.change_detection --counts 1000 20000
+"""
+import argparse
+from typing import List
+
+from benchmarks.registry_layout import populate, time_best
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform
+from entities.registry import Registry
+from entities.systems.transform_inheritance import TransformInheritanceSystem
+
+
+def mark(registry: Registry, entities: List[int]) -> None:
+    for entity in entities:
+        registry.mark_changed(entity, Transform)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 20_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entities':>10} {'moving':>8} {'all changed (ms)':>17} {'vehicles only (ms)':>19} {'speedup':>8}")
+    for count in args.counts:
+        registry = Registry()
+        populate(registry, count)
+        everything = [entity for entity, _ in registry.view(Transform)]
+        vehicles = [entity for entity, _ in registry.view(Transform, Vehicle)]
+
+        def frame(changed: List[int]) -> None:
+            mark(registry, changed)
+            TransformInheritanceSystem.update(registry)
+
+        # the incremental update must agree with a full recompute
+        TransformInheritanceSystem.update(registry)
+        transforms = registry.get_components_of_type(Transform)
+        for entity in vehicles:
+            transforms[entity].local.position[0] += 1.0
+        frame(vehicles)
+        incremental = [transforms[entity].world.position.copy() for entity in everything]
+        frame(everything)
+        assert all((a == transforms[e].world.position).all() for a, e in zip(incremental, everything))
+
+        t_all = time_best(lambda: frame(everything), args.repeat)
+        t_moving = time_best(lambda: frame(vehicles), args.repeat)
+        print(f"{count:>10} {len(vehicles):>8} {t_all * 1000:>17.2f} {t_moving * 1000:>19.2f} {t_all / t_moving:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Times structural changes made straight on the registry against the same changes recorded
+into a CommandBuffer and applied at the sync point.
+
+Each frame every entity is tagged by a few systems in turn (one add_components each) and
+a batch of new entities is spawned and tagged. Applied immediately, every add moves the
+entity to another archetype; the buffer folds them into one move per entity and creates
+new entities straight in their final archetype. Also checks that entities recorded under a
+parent removed before the flush are never created.
+
+Run from `src/`:
+
+    python -m benchmarks.command_buffer --counts 1000 20000
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import List
+
+from entities.components.command_buffer import CommandBuffer
+from entities.components.entity_flags import EntityFlags
+from entities.components.transform import Transform
+from entities.registry import Registry
+from entities.systems.command_buffer import CommandBufferSystem
+
+
+@dataclass(slots=True, eq=False)
+class Selected:
+    pass
+
+
+@dataclass(slots=True, eq=False)
+class Highlighted:
+    pass
+
+
+@dataclass(slots=True, eq=False)
+class Dirty:
+    pass
+
+
+TAGS = (Selected, Highlighted, Dirty)
+
+
+def populate(count: int) -> tuple[Registry, List[int]]:
+    registry = Registry()
+    entities = registry.create_entities(count, lambda i: EntityFlags(name=f"Entity {i}"), lambda i: Transform())
+    return registry, entities
+
+
+def immediate(registry: Registry, entities: List[int], spawned: int) -> List[int]:
+    for tag in TAGS:
+        for entity in entities:
+            registry.add_components(entity, tag())
+
+    new_entities = []
+    for i in range(spawned):
+        entity = registry.create_entity()
+        registry.add_components(entity, EntityFlags(name=f"Spawned {i}"), Transform())
+        registry.add_components(entity, Selected())
+        new_entities.append(entity)
+    return new_entities
+
+
+def buffered(registry: Registry, entities: List[int], spawned: int) -> List[int]:
+    buffer = CommandBuffer()
+    for tag in TAGS:
+        for entity in entities:
+            CommandBufferSystem.add_components(buffer, entity, tag())
+
+    new_entities = []
+    for i in range(spawned):
+        entity = CommandBufferSystem.create_entity(registry, buffer, EntityFlags(name=f"Spawned {i}"), Transform())
+        CommandBufferSystem.add_components(buffer, entity, Selected())
+        new_entities.append(entity)
+
+    CommandBufferSystem.apply(registry, buffer)
+    return new_entities
+
+
+def check_removed_parent() -> None:
+    # children recorded under a parent that is removed before the flush are never created,
+    # whether or not later commands touch them, and neither are their own children
+    registry = Registry()
+    gone, kept = registry.create_entities(2, lambda i: Transform())
+    buffer = CommandBuffer()
+    touched = CommandBufferSystem.create_entity(registry, buffer, Transform(), parent=gone)
+    CommandBufferSystem.add_components(buffer, touched, Selected())
+    untouched = CommandBufferSystem.create_entity(registry, buffer, Transform(), parent=gone)
+    grandchild = CommandBufferSystem.create_entity(registry, buffer, Transform(), parent=touched)
+    survivor = CommandBufferSystem.create_entity(registry, buffer, Transform(), parent=kept)
+    CommandBufferSystem.add_components(buffer, survivor, Selected())
+    registry.remove_entity(gone)
+    CommandBufferSystem.apply(registry, buffer)
+
+    assert not any(registry.is_alive(e) for e in (touched, untouched, grandchild))
+    assert registry.is_alive(survivor) and registry.get_parent(survivor) == kept
+    assert registry.get_components(survivor, Selected) is not None
+    assert sum(1 for _ in registry.view(Transform)) == 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 20_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    check_removed_parent()
+
+    print(f"{'entities':>10} {'immediate (ms)':>15} {'buffered (ms)':>14} {'speedup':>8}")
+    for count in args.counts:
+        spawned = count // 10
+        timings = []
+        results = []
+        for apply in (immediate, buffered):
+            best = float("inf")
+            for _ in range(args.repeat):
+                registry, entities = populate(count)
+                start = time.perf_counter()
+                new_entities = apply(registry, entities, spawned)
+                best = min(best, time.perf_counter() - start)
+            timings.append(best)
+            results.append((registry, entities, new_entities))
+
+        # both paths must end in the same state
+        (reg_a, ents_a, new_a), (reg_b, ents_b, new_b) = results
+        assert len(new_a) == len(new_b)
+        for a, b in zip(ents_a + new_a, ents_b + new_b):
+            types_a = {type(c) for c in reg_a.get_all_components(a)}
+            types_b = {type(c) for c in reg_b.get_all_components(b)}
+            assert types_a == types_b, (types_a, types_b)
+        assert all(reg_b.is_alive(e) for e in new_b)
+        assert sum(1 for _ in reg_a.view(Selected)) == sum(1 for _ in reg_b.view(Selected)) == count + spawned
+
+        print(f"{count:>10} {timings[0] * 1000:>15.2f} {timings[1] * 1000:>14.2f} {timings[0] / timings[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Regenerates a street-like scene over and over, the way SceneGeneratorSystem does on
+every `should_generate`, and checks that the registry stays the same size and
+views stay the same speed across cycles.
+
+Run from `src/`:
+
+    python -m benchmarks.entity_recycling --cycles 2000 --count 500
+"""
+import argparse
+
+from benchmarks.registry_layout import render_batching, time_best
+from entities.components.disposal import Disposal
+from entities.components.entity_flags import EntityFlags
+from entities.components.street_scene.building import Building
+from entities.components.transform import Transform
+from entities.components.visuals.assets import Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import MIN_FREE_SLOTS, Registry
+from entities.systems.disposal import DisposalSystem
+
+
+def regenerate(registry: Registry, disposal: Disposal, root: int, count: int, mesh: Mesh, material: Material) -> None:
+    for child in registry.get_children(root):
+        disposal.entities_to_dispose.add(child)
+    DisposalSystem.update(registry)
+
+    for i in range(count):
+        entity = registry.create_entity()
+        registry.add_components(entity, EntityFlags(name=f"Building {i}"), Transform(), Visuals(mesh, material), Building())
+        registry.set_parent(entity, root)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=2000)
+    parser.add_argument("--count", type=int, default=500)
+    args = parser.parse_args()
+
+    registry = Registry()
+    disposal = Disposal()
+    registry.add_components(registry.create_entity(), EntityFlags(is_internal=True), disposal)
+    root = registry.create_entity()
+    registry.add_components(root, EntityFlags(name="Street scene"), Transform())
+
+    mesh = Mesh(id=1)
+    material = Material()
+    stale_handles = []
+
+    print(f"{'cycle':>8} {'slots':>8} {'free':>6} {'max handle':>12} {'view (ms)':>10}")
+    report_at = {1, 10, 100, 1000, args.cycles}
+    for cycle in range(1, args.cycles + 1):
+        regenerate(registry, disposal, root, args.count, mesh, material)
+        if cycle == 1:
+            stale_handles = list(registry.get_children(root))
+        elif cycle == 2:
+            # handles from the previous generation of the scene are all detected as stale
+            assert not any(registry.is_alive(e) for e in stale_handles)
+            assert all(registry.get_components(e, Transform) is None for e in stale_handles)
+
+        if cycle in report_at:
+            assert render_batching(registry) == args.count
+            elapsed = time_best(lambda: render_batching(registry), 5)
+            print(f"{cycle:>8} {len(registry._generations):>8} {len(registry._free_slots):>6} "
+                  f"{max(registry.get_children(root)):>12} {elapsed * 1000:>10.3f}")
+
+    # slots are recycled instead of growing with every cycle
+    assert len(registry._generations) <= 3 + args.count + MIN_FREE_SLOTS + 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Runs one second of game time at 60 frames per second with the simulation ticking at
+different rates: vehicles (each with model-node children) driven once per tick and
+TransformInheritanceSystem, then RenderSystem's model matrix step every frame, interpolating
+what the last tick moved. Lockstep is one tick per frame drawn without interpolation, as
+before the fixed timestep. Also checks SimulationSystem's tick counting and that drawn
+matrices sit between the last two ticks while things start and stop moving, are moved
+between ticks, and are removed.
+
+Run from `src/`:
+
+    python -m benchmarks.fixed_timestep --counts 1000 5000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+import math_utils
+from entities.components.simulation_state import SimulationState
+from entities.components.transform import TRANSFORMS, Transform, TransformStore
+from entities.registry import Registry
+from entities.systems.simulation import SimulationSystem
+from entities.systems.transform_inheritance import TransformInheritanceSystem
+
+FRAME = 1.0 / 60.0
+TURN = math_utils.quaternion_from_axis_angle(math_utils.vec3(0.0, 1.0, 0.0), 3.0)
+
+
+class ModelMatrices:
+    """
+    RenderSystem's model matrix step, without the Visuals.
+    """
+    def __init__(self):
+        self.interpolated = np.zeros(0, dtype=np.int64)
+
+    def update(self, registry: Registry) -> None:
+        simulation = registry.get_resource(SimulationState)
+        with registry.change_scope(ModelMatrices) as since:
+            rows = TransformStore.rows(t for _, (t, ) in registry.view(Transform, changed=(Transform, ), since=since))
+            interpolated = np.zeros(0, dtype=np.int64)
+            if simulation is not None and simulation.interpolate:
+                transforms = registry.get_components_of_type(Transform)
+                found = [transforms.get(entity) for entity in simulation.moved]
+                interpolated = np.unique(np.array([t.row for t in found if t is not None], dtype=np.int64))
+            rows = np.setdiff1d(np.union1d(rows, self.interpolated), interpolated)
+            self.interpolated = interpolated
+            if len(rows):
+                TRANSFORMS.matrices[rows] = math_utils.batch_transformation_matrix(
+                    TRANSFORMS.world_positions[rows], TRANSFORMS.world_rotations[rows], TRANSFORMS.world_scales[rows]
+                )
+            if len(interpolated):
+                alpha = simulation.alpha  # type: ignore
+                positions = TRANSFORMS.previous_positions[interpolated]
+                positions += (TRANSFORMS.world_positions[interpolated] - positions) * alpha
+                scales = TRANSFORMS.previous_scales[interpolated]
+                scales += (TRANSFORMS.world_scales[interpolated] - scales) * alpha
+                rotations = math_utils.batch_quaternion_slerp(
+                    TRANSFORMS.previous_rotations[interpolated], TRANSFORMS.world_rotations[interpolated], alpha
+                )
+                TRANSFORMS.matrices[interpolated] = math_utils.batch_transformation_matrix(positions, rotations, scales)
+
+
+def drive(registry: Registry, vehicles: List[int], dt: float) -> None:
+    for vehicle in vehicles:
+        (transform, ) = registry.get_components(vehicle, Transform)  # type: ignore
+        transform.local.position[2] += 10.0 * dt
+        transform.local.rotation = math_utils.quaternion_mul(transform.local.rotation, TURN)
+        registry.mark_changed(vehicle, Transform)
+
+
+def populate(count: int, simulation: SimulationState) -> Tuple[Registry, List[int]]:
+    registry = Registry()
+    registry.track_changes(Transform)
+    registry.insert_resource(simulation)
+    street = registry.create_entity()
+    registry.add_components(street, Transform())
+    vehicles = registry.create_entities(count, lambda i: Transform(), parent=street)
+    for vehicle in vehicles:
+        registry.create_entities(5, lambda i: Transform(), parent=vehicle)
+    TransformInheritanceSystem.update(registry)
+    return registry, vehicles
+
+
+def run_frame(registry: Registry, vehicles: List[int], matrices: ModelMatrices, dt: float) -> Tuple[float, float]:
+    simulation = registry.get_resource(SimulationState)
+    start = time.perf_counter()
+    for _ in range(SimulationSystem.advance(simulation, dt)):  # type: ignore
+        SimulationSystem.begin_tick(registry, simulation)  # type: ignore
+        drive(registry, vehicles, simulation.tick_duration)  # type: ignore
+        TransformInheritanceSystem.update(registry)
+        SimulationSystem.end_tick(registry, simulation)  # type: ignore
+    middle = time.perf_counter()
+    TransformInheritanceSystem.update(registry)
+    matrices.update(registry)
+    return middle - start, time.perf_counter() - middle
+
+
+def check_ticks(seed: int) -> None:
+    rng = random.Random(seed)
+    simulation = SimulationState(tick_rate=rng.choice((20.0, 30.0, 60.0, 144.0)))
+    total, ticks = 0.0, 0
+    for _ in range(2000):
+        dt = rng.choice((FRAME, rng.uniform(0.0, 0.05)))
+        total += dt
+        ticks += SimulationSystem.advance(simulation, dt)
+        assert 0.0 <= simulation.accumulator < simulation.tick_duration
+        assert 0.0 <= simulation.alpha <= 1.0
+    assert abs(ticks + simulation.accumulator * simulation.tick_rate - total * simulation.tick_rate) < 1e-6
+
+    # frames lasting exactly one tick run exactly one
+    simulation = SimulationState(tick_rate=60.0)
+    assert all(SimulationSystem.advance(simulation, FRAME) == 1 for _ in range(10000))
+
+    # a long frame runs at most max_ticks_per_frame and drops the rest, unless capped is off
+    simulation = SimulationState(tick_rate=60.0, max_ticks_per_frame=8)
+    assert SimulationSystem.advance(simulation, 1.0) == 8 and simulation.accumulator == 0.0
+    assert SimulationSystem.advance(simulation, 1.0, capped=False) == 60
+
+
+def matrix_of(rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float32]:
+    return math_utils.batch_transformation_matrix(
+        TRANSFORMS.world_positions[rows], TRANSFORMS.world_rotations[rows], TRANSFORMS.world_scales[rows]
+    )
+
+
+def check_interpolation(seed: int) -> None:
+    rng = random.Random(seed)
+    simulation = SimulationState(tick_rate=rng.choice((20.0, 60.0, 90.0)))
+    registry, vehicles = populate(30, simulation)
+    matrices = ModelMatrices()
+    # world transforms of every entity when the last tick started
+    tick_start: Dict[int, Tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]] = {}
+    in_between = 0
+
+    for _ in range(300):
+        ticks = SimulationSystem.advance(simulation, rng.choice((FRAME, rng.uniform(0.0, 0.1))))
+        for _ in range(ticks):
+            tick_start = {e: (t.world.position.copy(), t.world.rotation.copy()) for e, (t, ) in registry.view(Transform)}
+            SimulationSystem.begin_tick(registry, simulation)
+            # some vehicles stop and start
+            drive(registry, rng.sample(vehicles, len(vehicles) // 2), simulation.tick_duration)
+            TransformInheritanceSystem.update(registry)
+            SimulationSystem.end_tick(registry, simulation)
+
+        # moved outside the simulation, like the gizmo does, or removed
+        for vehicle in rng.sample(vehicles, 3):
+            (transform, ) = registry.get_components(vehicle, Transform)  # type: ignore
+            transform.local.position[0] += 1.0
+            registry.mark_changed(vehicle, Transform)
+        if rng.random() < 0.05 and len(vehicles) > 10:
+            registry.remove_entity(vehicles.pop(rng.randrange(len(vehicles))))
+        TransformInheritanceSystem.update(registry)
+        matrices.update(registry)
+
+        moved = set(simulation.moved)
+        in_between += bool(moved) and 0.0 < simulation.alpha < 1.0
+        for entity, (transform, ) in registry.view(Transform):
+            row = np.array([transform.row], dtype=np.int64)
+            if entity not in moved:
+                assert np.array_equal(TRANSFORMS.matrices[row], matrix_of(row)), entity
+                continue
+            start_position, start_rotation = tick_start[entity]
+            position = start_position + (transform.world.position - start_position) * simulation.alpha
+            rotation = math_utils.quaternion_slerp(start_rotation, transform.world.rotation, simulation.alpha)
+            expected = math_utils.create_transformation_matrix(position, rotation, transform.world.scale)
+            assert np.allclose(TRANSFORMS.matrices[row][0], expected, atol=1e-4), entity
+    assert in_between > 50
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 5000], help="vehicles")
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check_ticks(seed)
+        check_interpolation(seed)
+
+    print(f"{'vehicles':>10} {'ticks':<12} {'simulate (ms/s)':>16} {'draw (ms/s)':>12} {'total (ms/s)':>13}")
+    for count in args.counts:
+        for name, tick_rate, interpolate in (
+            ("lockstep", 60.0, False), ("20 Hz", 20.0, True), ("60 Hz", 60.0, True), ("120 Hz", 120.0, True),
+        ):
+            registry, vehicles = populate(count, SimulationState(tick_rate=tick_rate, interpolate=interpolate))
+            matrices = ModelMatrices()
+            simulate = draw = 0.0
+            for _ in range(60):
+                a, b = run_frame(registry, vehicles, matrices, FRAME)
+                simulate += a
+                draw += b
+            print(f"{count:>10} {name:<12} {simulate * 1000:>16.1f} {draw * 1000:>12.1f} {(simulate + draw) * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
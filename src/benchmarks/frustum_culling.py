@@ -0,0 +1,198 @@
+"""
+Compares testing world-space boxes against the camera's frustum one entity at a time against
+RenderSystem's batched cull over the same entities, with a camera looking along a street of
+boxes so that part of them is culled. Also checks math_utils.frustum_planes against points of
+the clip volume, that math_utils.batch_aabb_in_frustum never culls a box with a corner or point
+inside the frustum, and that boxes without bounds yet are never culled.
+
+Run from `src/`:
+
+    python -m benchmarks.frustum_culling --counts 1000 50000
+"""
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+import math_utils
+from benchmarks.registry_layout import time_best
+from entities.components.camera_state import CameraState
+from entities.components.render_state import RenderState
+from entities.components.transform import TRANSFORMS, Transform, TransformStore, transforms_from_arrays
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.systems.render import RenderSystem
+
+
+def random_camera(rng: np.random.Generator) -> npt.NDArray[np.float32]:
+    projection = math_utils.create_perspective_projection(
+        rng.uniform(30.0, 90.0), rng.uniform(0.5, 2.5), rng.uniform(0.05, 1.0), rng.uniform(50.0, 300.0)
+    )
+    eye = rng.uniform(-20, 20, size=3).astype(np.float32)
+    target = eye + rng.normal(size=3).astype(np.float32)
+    view = math_utils.create_look_at(eye, target, math_utils.vec3(0.0, 1.0, 0.0))
+    return (projection @ view).astype(np.float32)
+
+
+def random_boxes(rng: np.random.Generator, count: int) -> Tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]:
+    minimums = rng.uniform(-150, 150, size=(count, 3)).astype(np.float32)
+    maximums = minimums + rng.uniform(0, 20, size=(count, 3)).astype(np.float32)
+    return minimums, maximums
+
+
+def corners_of(minimum: npt.NDArray[np.float32], maximum: npt.NDArray[np.float32]) -> npt.NDArray[np.float64]:
+    bits = (np.arange(8)[:, None] >> np.arange(3)) & 1
+    return np.where(bits, maximum, minimum).astype(np.float64)
+
+
+def in_clip(view_projection: npt.NDArray[np.float32], points: npt.NDArray[np.float64]) -> npt.NDArray[np.bool_]:
+    clip = np.c_[points, np.ones(len(points))] @ view_projection.astype(np.float64).T
+    w = clip[:, 3:]
+    return np.all((clip[:, :3] >= -w) & (clip[:, :3] <= w), axis=1) & (w[:, 0] > 0)
+
+
+def check_planes(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        view_projection = random_camera(rng)
+        planes = math_utils.frustum_planes(view_projection)
+        assert np.allclose(np.linalg.norm(planes[:, :3], axis=1), 1.0, atol=1e-5)
+
+        # points of the clip volume are in front of every plane, points outside behind one
+        ndc = rng.uniform(-1.5, 1.5, size=(2000, 3))
+        world = np.c_[ndc, np.ones(len(ndc))] @ np.linalg.inv(view_projection.astype(np.float64)).T
+        world = world[:, :3] / world[:, 3:]
+        distances = world @ planes[:, :3].T.astype(np.float64) + planes[:, 3]
+        inside = np.all(np.abs(ndc) <= 1.0, axis=1)
+        margin = np.all(np.abs(ndc) <= 0.99, axis=1)
+        assert np.all(distances[margin] > 0.0)
+        assert not np.any(np.all(distances[~inside] > 1e-3, axis=1))
+
+        # the frustum's own corners
+        corners = math_utils.get_frustum_corners_world_space(view_projection, np.identity(4, dtype=np.float32))
+        assert in_clip(view_projection, corners.astype(np.float64) * 0.999 + corners.mean(axis=0) * 0.001).all()
+
+
+def check_kernel(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    count = 3000
+    for _ in range(10):
+        view_projection = random_camera(rng)
+        minimums, maximums = random_boxes(rng, count)
+        # flat boxes, like a plane
+        maximums[::5, 1] = minimums[::5, 1]
+        planes = math_utils.frustum_planes(view_projection)
+        got = math_utils.batch_aabb_in_frustum(planes, minimums, maximums)
+
+        out = np.zeros(count, dtype=np.bool_)
+        assert math_utils.batch_aabb_in_frustum(planes, minimums, maximums, out=out) is out
+        assert np.array_equal(out, got)
+
+        # a box with a corner or a point inside the frustum is never culled
+        samples = rng.uniform(size=(count, 16, 3))
+        for i in range(count):
+            points = np.r_[corners_of(minimums[i], maximums[i]), minimums[i] + samples[i] * (maximums[i] - minimums[i])]
+            if in_clip(view_projection, points).any():
+                assert got[i], i
+
+        # and a box behind any one plane always is
+        bits = (np.arange(8)[:, None] >> np.arange(3)) & 1
+        corners = np.where(bits[None], maximums[:, None], minimums[:, None]).astype(np.float64)
+        distances = corners @ planes[:, :3].T.astype(np.float64) + planes[:, 3]
+        behind = np.any(np.all(distances < -1e-3, axis=1), axis=1)
+        assert not np.any(got[behind])
+        assert got.any() and not got.all()
+
+
+def populate(count: int, seed: int = 0) -> Tuple[List[Tuple[Transform, Visuals]], CameraState]:
+    rng = np.random.default_rng(seed)
+    material = Material()
+    # a street of boxes along z, looked down from one end
+    positions = np.c_[
+        rng.uniform(-30, 30, size=count), rng.uniform(0, 10, size=count), rng.uniform(-500, 500, size=count)
+    ].astype(np.float32)
+    rotations = np.tile(math_utils.quaternion_identity(), (count, 1)).astype(np.float32)
+    transforms = transforms_from_arrays(positions, np.ones((count, 3), dtype=np.float32), rotations)
+    registry = Registry()
+    registry.create_entities(count, transforms, lambda i: Visuals(None, material))  # type: ignore
+    rows = TransformStore.rows(transforms)
+    TRANSFORMS.bounds_minimums[rows] = positions - rng.uniform(0.5, 5.0, size=(count, 3)).astype(np.float32)
+    TRANSFORMS.bounds_maximums[rows] = positions + rng.uniform(0.5, 5.0, size=(count, 3)).astype(np.float32)
+
+    camera_state = CameraState()
+    camera_state.view_projection_matrix = (
+        math_utils.create_perspective_projection(60.0, 16 / 9, 0.1, 400.0)
+        @ math_utils.create_look_at(math_utils.vec3(0.0, 5.0, -100.0), math_utils.vec3(10.0, 5.0, 0.0), math_utils.vec3(0.0, 1.0, 0.0))
+    ).astype(np.float32)
+    return [(t, v) for _, (t, v) in registry.view(Transform, Visuals)], camera_state
+
+
+def per_entity(render_state: RenderState, camera_state: CameraState, visible: List[Tuple[Transform, Visuals]]) -> List[Tuple[Transform, Visuals]]:
+    planes = math_utils.frustum_planes(camera_state.view_projection_matrix)
+    drawn = []
+    for transform, visuals in visible:
+        minimum = TRANSFORMS.bounds_minimums[transform.row]
+        maximum = TRANSFORMS.bounds_maximums[transform.row]
+        for plane in planes:
+            furthest = np.where(plane[:3] >= 0.0, maximum, minimum)
+            if furthest @ plane[:3] + plane[3] < 0.0:
+                break
+        else:
+            drawn.append((transform, visuals))
+    return drawn
+
+
+def check_cull(seed: int) -> None:
+    visible, camera_state = populate(2000, seed)
+    render_state = RenderState()
+    drawn, culled = RenderSystem._cull(render_state, camera_state, visible)
+    assert drawn == per_entity(render_state, camera_state, visible)
+    assert 0 < render_state.culling_culled < len(visible)
+    assert render_state.culling_drawn == len(drawn) and render_state.culling_tested == len(visible)
+    rows = TransformStore.rows(t for t, _ in visible)
+    drawn_rows = set(TransformStore.rows(t for t, _ in drawn).tolist())
+    assert all(culled[row] == (row not in drawn_rows) for row in rows.tolist())
+
+    # boxes not known yet are drawn
+    TRANSFORMS.bounds_minimums[rows[::2]] = np.inf
+    TRANSFORMS.bounds_maximums[rows[::2]] = -np.inf
+    drawn, culled = RenderSystem._cull(render_state, camera_state, visible)
+    assert not culled[rows[::2]].any() and all(pair in drawn for pair in visible[::2])
+
+    # frozen, the camera moving away changes nothing, until unfrozen
+    render_state.freeze_culling_frustum = True
+    before = RenderSystem._cull(render_state, camera_state, visible)[0]
+    camera_state.view_projection_matrix = random_camera(np.random.default_rng(seed))
+    assert RenderSystem._cull(render_state, camera_state, visible)[0] == before
+    render_state.freeze_culling_frustum = False
+    RenderSystem._cull(render_state, camera_state, visible)
+    assert render_state.frozen_view_projection is None
+
+    render_state.frustum_culling = False
+    drawn, culled = RenderSystem._cull(render_state, camera_state, visible)
+    assert drawn == visible and not culled.any() and render_state.culling_culled == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check_planes(seed)
+        check_kernel(seed)
+        check_cull(seed)
+
+    print(f"{'entities':>10} {'culled':>8} {'per entity (ms)':>16} {'batched (ms)':>13} {'batched speedup':>16}")
+    for count in args.counts:
+        visible, camera_state = populate(count)
+        render_state = RenderState()
+        a = time_best(lambda: per_entity(render_state, camera_state, visible), 3)
+        b = time_best(lambda: RenderSystem._cull(render_state, camera_state, visible), 3)
+        print(f"{count:>10} {render_state.culling_culled:>8} {a * 1000:>16.3f} {b * 1000:>13.3f} {a / b:>15.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Checks the registry's depth-first hierarchy index against its parent / child links while
+entities are created, reparented and removed at random, then times reading subtrees from
+it against walking get_children() recursively.
+
+Run from `src/`:
+
+    python -m benchmarks.hierarchy --counts 1000 50000
+"""
+import argparse
+import random
+
+import numpy as np
+
+from benchmarks.registry_layout import time_best
+from entities.components.transform import Transform
+from entities.registry import Registry
+
+
+def check_index(registry: Registry) -> None:
+    index = registry.hierarchy()
+    alive = set(registry._children)
+    assert len(index) == len(alive) and set(index.entities.tolist()) == alive
+
+    for position, entity in enumerate(index.entities.tolist()):
+        parent = registry.get_parent(entity)
+        assert index.position(entity) == position
+        assert int(index.parent_entities[position]) == (parent or 0)
+        if parent is None:
+            assert index.parents[position] == -1 and index.depths[position] == 0
+        else:
+            assert index.parents[position] == index.position(parent)
+            assert index.depths[position] == index.depths[index.parents[position]] + 1
+
+        expected = set()
+        stack = list(registry.get_children(entity))
+        while stack:
+            child = stack.pop()
+            expected.add(child)
+            stack.extend(registry.get_children(child))
+        assert set(index.descendants(entity).tolist()) == expected
+
+    for depth, level in enumerate(index.levels()):
+        assert (index.depths[level] == depth).all()
+
+
+def fuzz(steps: int, seed: int) -> None:
+    rng = random.Random(seed)
+    registry = Registry()
+    entities = [registry.create_entity() for _ in range(20)]
+
+    for step in range(steps):
+        roll = rng.random()
+        if roll < 0.3:
+            entities.extend(registry.create_entities(rng.randint(1, 5), parent=rng.choice(entities) if rng.random() < 0.7 else None))
+        elif roll < 0.45 and len(entities) > 10:
+            entity = entities.pop(rng.randrange(len(entities)))
+            registry.remove_entity(entity)
+        else:
+            child, parent = rng.choice(entities), rng.choice(entities + [None])
+            ancestor = parent
+            while ancestor is not None and ancestor != child:
+                ancestor = registry.get_parent(ancestor)
+            if ancestor is None:
+                registry.set_parent(child, parent)
+
+        # flush after a few changes at a time, so updates see a mix of them
+        if rng.random() < 0.3:
+            check_index(registry)
+    check_index(registry)
+
+
+def build_tree(count: int, fanout: int) -> tuple[Registry, int]:
+    registry = Registry()
+    root = registry.create_entity()
+    registry.add_components(root, Transform())
+    level = [root]
+    created = 1
+    while created < count:
+        next_level = []
+        for parent in level:
+            take = min(fanout, count - created)
+            if take <= 0:
+                break
+            next_level.extend(registry.create_entities(take, [Transform() for _ in range(take)], parent=parent))
+            created += take
+        level = next_level
+    return registry, root
+
+
+def descendants_recursive(registry: Registry, entity: int) -> list[int]:
+    results = []
+    for child in registry.get_children(entity):
+        results.append(child)
+        results.extend(descendants_recursive(registry, child))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--fuzz-steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    fuzz(args.fuzz_steps, seed=1)
+
+    print(f"{'entities':>10} {'recursive (ms)':>15} {'index (ms)':>11} {'reparent (ms)':>14}")
+    for count in args.counts:
+        registry, root = build_tree(count, args.fanout)
+        assert len(registry.get_descendants(root)) == len(descendants_recursive(registry, root)) == count - 1
+
+        recursive = time_best(lambda: descendants_recursive(registry, root), 5)
+        index = time_best(lambda: registry.get_descendants(root).tolist(), 5)
+
+        # move one mid-level subtree back and forth, then read through the index again
+        subtree = next(iter(registry.get_children(next(iter(registry.get_children(root))))))
+        old_parent = registry.get_parent(subtree)
+        def reparent() -> None:
+            registry.set_parent(subtree, root)
+            registry.hierarchy()
+            registry.set_parent(subtree, old_parent)
+            registry.hierarchy()
+        reparent_time = time_best(reparent, 5) / 2
+        assert np.array_equal(np.sort(registry.get_descendants(root)), np.sort(descendants_recursive(registry, root)))
+
+        print(f"{count:>10} {recursive * 1000:>15.3f} {index * 1000:>11.3f} {reparent_time * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Draws a street of buildings sharing one cube mesh and one material with RenderSystem, in a
+hidden window, with and without instancing: one draw call per group of entities sharing a mesh
+and a material, against one per entity. Checks both give the same image and the same
+segmentation ids, that the segmentation pass still draws the classes in order, and times
+whole frames of the main and segmentation passes.
+
+Run from `src/`, with a display for the hidden window:
+
+    python -m benchmarks.instancing --counts 1000 5000
+"""
+import argparse
+import time
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+from OpenGL import GL
+
+import math_utils
+from engine.application import Application
+from entities.components.bounds_state import BoundsState
+from entities.components.camera_state import CameraState
+from entities.components.render_state import RenderState
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform, transforms_from_arrays
+from entities.components.visuals.assets import AssetsState, AssetStatus
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.systems.assets import AssetSystem
+from entities.systems.render import RenderSystem
+from entities.systems.transform_inheritance import TransformInheritanceSystem
+from meshes.volumes.cube import generate_cube
+
+SIZE = (640, 360)
+
+
+def populate(count: int, seed: int = 0) -> Registry:
+    rng = np.random.default_rng(seed)
+    registry = Registry()
+    RenderSystem.track_classes(registry)
+    registry.track_changes(Transform, Visuals)
+
+    assets_state = AssetsState()
+    camera_state = CameraState(camera_far=1000.0)
+    camera_state.camera_position = math_utils.vec3(0.0, 20.0, -520.0)
+    camera_state.view_matrix = math_utils.create_look_at(
+        camera_state.camera_position, math_utils.vec3(0.0, 0.0, 0.0), math_utils.vec3(0.0, 1.0, 0.0)
+    )
+    camera_state.projection_matrix = math_utils.create_perspective_projection(60.0, SIZE[0] / SIZE[1], 0.1, 1000.0)
+    camera_state.view_projection_matrix = camera_state.projection_matrix @ camera_state.view_matrix
+    registry.add_components(
+        registry.create_entity(), assets_state, camera_state, RenderState(show_bounding_boxes=True), BoundsState()
+    )
+
+    vertices, indices = generate_cube(size=1.0)
+    cube = AssetSystem.create_immediate_mesh(assets_state, vertices, indices)
+    AssetSystem.update(registry)
+    assert cube.status == AssetStatus.Ready
+    material = Material(albedo=math_utils.vec3(0.5, 0.4, 0.3), roughness=math_utils.float1(0.9))
+
+    # buildings both sides of a street along z
+    side = rng.choice((-1.0, 1.0), size=count)
+    heights = rng.uniform(5.0, 40.0, size=count)
+    positions = np.c_[side * rng.uniform(15.0, 25.0, size=count), heights / 2, rng.uniform(-500, 500, size=count)]
+    scales = np.c_[rng.uniform(4.0, 10.0, size=count), heights, rng.uniform(4.0, 10.0, size=count)]
+    rotations = np.tile(math_utils.quaternion_identity(), (count, 1))
+    transforms = transforms_from_arrays(positions.astype(np.float32), scales.astype(np.float32), rotations.astype(np.float32))
+    registry.create_entities(count, transforms, lambda i: Visuals(cube, material), lambda i: Building())
+    TransformInheritanceSystem.update(registry)
+    return registry
+
+
+def draw(render_system: RenderSystem, registry: Registry, instancing: bool) -> Tuple[npt.NDArray, npt.NDArray, int]:
+    render_state = registry.get_resource(RenderState)
+    assert render_state is not None
+    render_state.instancing = instancing
+    render_system.update(registry, SIZE, 0.0, 1 / 60)
+
+    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, render_system.resolve_fbo)
+    GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0)
+    image = GL.glReadPixels(0, 0, SIZE[0], SIZE[1], GL.GL_RGBA, GL.GL_FLOAT)
+    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, render_system.segmentation_fbo)
+    ids = GL.glReadPixels(0, 0, SIZE[0], SIZE[1], GL.GL_RED_INTEGER, GL.GL_UNSIGNED_INT)
+    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+    return np.asarray(image), np.asarray(ids), render_state.draw_calls
+
+
+def check_class_order(render_system: RenderSystem) -> None:
+    # vehicles on two cube meshes, and buildings on the first in the same places as the vehicles
+    # on the second. equal depths keep the class drawn first, so the vehicles' ids must win
+    registry = populate(0)
+    assets_state = registry.get_resource(AssetsState)
+    assert assets_state is not None
+    vertices, indices = generate_cube(size=1.0)
+    first, second = (AssetSystem.create_immediate_mesh(assets_state, vertices, indices) for _ in range(2))
+    AssetSystem.update(registry)
+    material = Material()
+    rotations = np.tile(math_utils.quaternion_identity(), (8, 1)).astype(np.float32)
+    scales = np.full((8, 3), 8.0, dtype=np.float32)
+    positions = np.c_[np.linspace(-60.0, 60.0, 8), np.full(8, 4.0), np.full(8, -400.0)].astype(np.float32)
+    for i in range(8):
+        mesh = first if i % 2 == 0 else second
+        registry.create_entities(1, transforms_from_arrays(positions[i:i + 1], scales[i:i + 1], rotations[i:i + 1]),
+                                 lambda _: Visuals(mesh, material), lambda _: Vehicle())
+    registry.create_entities(4, transforms_from_arrays(positions[1::2], scales[1::2], rotations[1::2]),
+                             lambda _: Visuals(first, material), lambda _: Building())
+    TransformInheritanceSystem.update(registry)
+
+    ids = draw(render_system, registry, True)[1]
+    expected_ids = draw(render_system, registry, False)[1]
+    assert np.array_equal(ids, expected_ids)
+    vehicles = {e for e, _ in registry.view(Vehicle)}
+    assert {e for e in np.unique(ids).tolist() if e} == vehicles
+
+
+def time_frames(render_system: RenderSystem, registry: Registry, instancing: bool, frames: int) -> float:
+    render_state = registry.get_resource(RenderState)
+    assert render_state is not None
+    render_state.instancing = instancing
+    best = float("inf")
+    for _ in range(frames):
+        start = time.perf_counter()
+        render_system.update(registry, SIZE, 0.0, 1 / 60)
+        GL.glFinish()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 5000], help="buildings")
+    parser.add_argument("--frames", type=int, default=10)
+    args = parser.parse_args()
+
+    Application(SIZE[0], SIZE[1], visible=False)
+    render_system = RenderSystem()
+
+    registry = populate(300)
+    image, ids, calls = draw(render_system, registry, True)
+    expected_image, expected_ids, expected_calls = draw(render_system, registry, False)
+    assert np.array_equal(ids, expected_ids) and len(np.unique(ids)) > 10
+    assert np.array_equal(image, expected_image)
+    assert calls == 1 and expected_calls == registry.get_resource(RenderState).culling_drawn  # type: ignore
+    check_class_order(render_system)
+
+    print(f"{'buildings':>10} {'calls':>6} {'per entity (ms)':>16} {'calls':>6} {'instanced (ms)':>15} {'speedup':>8}")
+    for count in args.counts:
+        registry = populate(count)
+        per_entity_calls = draw(render_system, registry, False)[2]
+        instanced_calls = draw(render_system, registry, True)[2]
+        a = time_frames(render_system, registry, False, args.frames)
+        b = time_frames(render_system, registry, True, args.frames)
+        print(f"{count:>10} {per_entity_calls:>6} {a * 1000:>16.2f} {instanced_calls:>6} {b * 1000:>15.2f} {a / b:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
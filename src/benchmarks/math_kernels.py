@@ -0,0 +1,136 @@
+"""
+Checks every batched kernel in math_utils against its scalar counterpart, row by row, on
+random inputs and the edge cases of each (zero vectors, unnormalized and opposite quaternions,
+nearly parallel slerps, gimbal lock), with and without `out=` and with `out` aliasing an
+input. Then times one scalar call per row against one batched call.
+
+Run from `src/`:
+
+    python -m benchmarks.math_kernels --counts 1000 50000
+"""
+import argparse
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+import math_utils
+from benchmarks.registry_layout import time_best
+
+
+def random_quaternions(rng: np.random.Generator, count: int) -> npt.NDArray[np.float32]:
+    q = rng.normal(size=(count, 4))
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+
+
+def inputs(count: int, seed: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, 3)).astype(np.float32) * 10
+    vectors[::11] = 0.0
+    q0 = random_quaternions(rng, count)
+    q1 = random_quaternions(rng, count)
+    # opposite hemispheres, nearly parallel and identical pairs
+    q1[1::5] = -q1[1::5]
+    q1[2::5] = (q0[2::5] + rng.normal(scale=1e-3, size=(len(q0[2::5]), 4))).astype(np.float32)
+    q1[3::5] = q0[3::5]
+    unnormalized = (q0 * rng.uniform(0.5, 2.0, size=(count, 1))).astype(np.float32)
+    euler = rng.uniform(-180, 180, size=(count, 3)).astype(np.float32)
+    # gimbal lock
+    euler[::7, 1] = 90.0
+    locked = math_utils.batch_quaternion_from_euler(euler)
+    return {
+        "vectors": vectors, "q0": q0, "q1": q1, "unnormalized": unnormalized,
+        "fractions": rng.uniform(0, 1, size=count).astype(np.float32),
+        "angles": rng.uniform(-720, 720, size=count).astype(np.float32),
+        "euler": euler, "euler_q": locked,
+    }
+
+
+def scalar_out(fn: Callable[..., None], shape: Tuple[int, ...]) -> Callable[..., npt.NDArray[np.float32]]:
+    # the scalar functions that write into `out` instead of returning
+    def call(*args: Any) -> npt.NDArray[np.float32]:
+        out = np.empty(shape, dtype=np.float32)
+        fn(*args, out)
+        return out
+    return call
+
+
+# name -> (scalar, batched, input names, tolerance; 0 for bit for bit)
+KERNELS: Dict[str, Tuple[Callable[..., Any], Callable[..., Any], Tuple[str, ...], float]] = {
+    "normalize": (math_utils.normalize, math_utils.batch_normalize, ("vectors", ), 1e-6),
+    "quaternion_mul": (
+        scalar_out(math_utils.quaternion_mul_out, (4, )), math_utils.batch_quaternion_mul, ("q0", "q1"), 0.0
+    ),
+    "rotate_vector": (
+        scalar_out(math_utils.rotate_vector_by_quaternion_out, (3, )), math_utils.batch_rotate_vector_by_quaternion,
+        ("vectors", "q0"), 0.0
+    ),
+    "slerp": (math_utils.quaternion_slerp, math_utils.batch_quaternion_slerp, ("q0", "q1", "fractions"), 1e-5),
+    "axis_angle": (
+        math_utils.quaternion_from_axis_angle, math_utils.batch_quaternion_from_axis_angle, ("vectors", "angles"), 1e-6
+    ),
+    "from_euler": (math_utils.quaternion_from_euler, math_utils.batch_quaternion_from_euler, ("euler", ), 1e-6),
+    "to_euler": (math_utils.quaternion_to_euler, math_utils.batch_quaternion_to_euler, ("euler_q", ), 1e-3),
+    "matrix": (math_utils.quaternion_matrix, math_utils.batch_quaternion_matrix, ("unnormalized", ), 1e-6),
+}
+
+
+def same(a: npt.NDArray[Any], b: npt.NDArray[Any], tolerance: float) -> bool:
+    if tolerance == 0.0:
+        return np.array_equal(a, b)
+    return np.allclose(a, b, rtol=0.0, atol=tolerance)
+
+
+def check(seed: int) -> None:
+    data = inputs(300, seed)
+    for name, (scalar, batched, names, tolerance) in KERNELS.items():
+        args = [data[n] for n in names]
+        count = len(args[0])
+        expected = np.array([scalar(*(a[i] for a in args)) for i in range(count)], dtype=np.float32)
+        # axis-angle is undefined for zero axes
+        valid = np.linalg.norm(data["vectors"], axis=1) > 0 if "vectors" in names and name == "axis_angle" else slice(None)
+
+        got = batched(*args)
+        assert got.dtype == np.float32 and got.shape == expected.shape, name
+        assert same(got[valid], expected[valid], tolerance), name
+
+        out = np.full(expected.shape, np.nan, dtype=np.float32)
+        assert batched(*args, out=out) is out, name
+        assert same(out[valid], expected[valid], tolerance), name
+
+        # writing over the first input
+        if args[0].shape == expected.shape:
+            aliased = args[0].copy()
+            batched(aliased, *args[1:], out=aliased)
+            assert same(aliased[valid], expected[valid], tolerance), name
+
+    # round trips
+    euler_q = data["euler_q"]
+    back = math_utils.batch_quaternion_from_euler(math_utils.batch_quaternion_to_euler(euler_q))
+    assert np.allclose(np.abs(np.einsum("ij,ij->i", back, euler_q)), 1.0, atol=1e-5)
+    ends = math_utils.batch_quaternion_slerp(data["q0"], data["q1"], 1.0)
+    assert np.allclose(np.abs(np.einsum("ij,ij->i", ends, math_utils.batch_normalize(data["q1"]))), 1.0, atol=1e-5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check(seed)
+
+    print(f"{'rows':>10} {'kernel':<16} {'scalar (ms)':>12} {'batched (ms)':>13} {'speedup':>8}")
+    for count in args.counts:
+        data = inputs(count, 0)
+        for name, (scalar, batched, names, _) in KERNELS.items():
+            kernel_args = [data[n] for n in names]
+            rows = list(zip(*kernel_args))
+            out = np.empty_like(batched(*kernel_args))
+            a = time_best(lambda: [scalar(*row) for row in rows], 3)
+            b = time_best(lambda: batched(*kernel_args, out=out), 3)
+            print(f"{count:>10} {name:<16} {a * 1000:>12.3f} {b * 1000:>13.3f} {a / b:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares building model matrices one entity at a time, as RenderSystem did before its first
+draw call, against one math_utils.batch_transformation_matrix() call on the transform store's
+columns, and the segmentation pass building its own matrices against reusing those. Also
+checks that the batched kernel gives the same matrices as update_transformation_matrix, bit
+for bit, including for quaternions that need renormalizing.
+
+Run from `src/`:
+
+    python -m benchmarks.model_matrices --counts 1000 20000
+"""
+import argparse
+from typing import List
+
+import numpy as np
+
+import math_utils
+from benchmarks.registry_layout import time_best
+from entities.components.transform import TRANSFORMS, Transform, TransformStore, transforms_from_arrays
+from entities.registry import Registry
+
+
+def populate(count: int, seed: int = 0) -> Registry:
+    rng = np.random.default_rng(seed)
+    rotations = rng.normal(size=(count, 4)).astype(np.float32)
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    transforms = transforms_from_arrays(
+        rng.uniform(-100, 100, size=(count, 3)).astype(np.float32),
+        rng.uniform(0.5, 2.0, size=(count, 3)).astype(np.float32),
+        rotations,
+    )
+    for transform in transforms:
+        transform.world.set(transform.local)
+    registry = Registry()
+    registry.create_entities(count, transforms)
+    return registry
+
+
+def per_entity(registry: Registry) -> None:
+    for entity, (transform, ) in registry.view(Transform):
+        math_utils.update_transformation_matrix(
+            transform.world.position, transform.world.rotation, transform.world.scale,
+            transform.matrix_cache
+        )
+
+
+def batched(registry: Registry) -> None:
+    rows = TransformStore.rows(transform for _, (transform, ) in registry.view(Transform))
+    TRANSFORMS.matrices[rows] = math_utils.batch_transformation_matrix(
+        TRANSFORMS.world_positions[rows], TRANSFORMS.world_rotations[rows], TRANSFORMS.world_scales[rows]
+    )
+
+
+def id_pass_built(transforms: List[Transform]) -> None:
+    for transform in transforms:
+        math_utils.create_transformation_matrix(transform.world.position, transform.world.rotation, transform.world.scale)
+
+
+def id_pass_shared(transforms: List[Transform]) -> None:
+    for transform in transforms:
+        transform.matrix_cache
+
+
+def check(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    count = 500
+    positions = rng.uniform(-1000, 1000, size=(count, 3)).astype(np.float32)
+    scales = rng.uniform(-3, 3, size=(count, 3)).astype(np.float32)
+    # unnormalized, nearly normalized and zero quaternions
+    rotations = rng.normal(size=(count, 4)).astype(np.float32)
+    rotations[::3] /= np.linalg.norm(rotations[::3], axis=1, keepdims=True)
+    rotations[1::7] = 0.0
+
+    expected = np.empty((count, 4, 4), dtype=np.float32)
+    for i in range(count):
+        math_utils.update_transformation_matrix(positions[i], rotations[i], scales[i], expected[i])
+    assert np.array_equal(math_utils.batch_transformation_matrix(positions, rotations, scales), expected)
+
+    out = np.full((count, 4, 4), np.nan, dtype=np.float32)
+    assert math_utils.batch_transformation_matrix(positions, rotations, scales, out=out) is out
+    assert np.array_equal(out, expected)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 20000])
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check(seed)
+
+    print(f"{'entities':>10} {'case':<10} {'per entity (ms)':>16} {'batched (ms)':>13} {'speedup':>8}")
+    for count in args.counts:
+        registry = populate(count)
+        transforms = [transform for _, (transform, ) in registry.view(Transform)]
+
+        per_entity(registry)
+        expected = TRANSFORMS.matrices[TransformStore.rows(transforms)].copy()
+        batched(registry)
+        assert np.array_equal(TRANSFORMS.matrices[TransformStore.rows(transforms)], expected)
+
+        for name, a_fn, b_fn in (
+            ("matrices", lambda: per_entity(registry), lambda: batched(registry)),
+            ("id pass", lambda: id_pass_built(transforms), lambda: id_pass_shared(transforms)),
+        ):
+            a = time_best(a_fn, 3)
+            b = time_best(b_fn, 3)
+            print(f"{count:>10} {name:<10} {a * 1000:>16.3f} {b * 1000:>13.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Checks which registry operations fire component observers and in what batches, then times
+creating and removing a scene's worth of Visuals with and without the asset system's
+reference counting observing them, with the observed run's time spent flushing observers.
+The Transforms are made before timing, so row allocation and recycling don't count.
+
+Run from `src/`:
+
+    python -m benchmarks.observers --counts 1000 50000
+"""
+import argparse
+import time
+
+from entities.components.disabled import Disabled
+from entities.components.street_scene.building import Building
+from entities.components.transform import Transform
+from entities.components.visuals.assets import AssetsState, Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.systems.assets import AssetSystem
+
+
+def check_events() -> None:
+    registry = Registry()
+    log = []
+    registry.observe(
+        Transform,
+        on_add=lambda r, batch: log.append(("add", [e for e, _ in batch])),
+        on_remove=lambda r, batch: log.append(("remove", [e for e, _ in batch])),
+        on_replace=lambda r, batch: log.append(("replace", [e for e, _, _ in batch])),
+    )
+
+    a, b, c = registry.create_entities(3, lambda i: Transform())
+    d = registry.create_entity()
+    registry.add_components(d, Transform(), Building())
+    # moving between archetypes is not an event
+    registry.add_components(a, Building())
+    registry.set_enabled(b, False)
+    registry.remove_components(a, Building)
+    registry.flush_observers()
+    assert log == [("add", [a, b, c, d])], log
+
+    log.clear()
+    registry.add_components(a, Transform())
+    registry.restructure_entities([b, c], added=[{Transform: Transform()}, {Transform: Transform()}])
+    registry.remove_components(c, Transform)
+    registry.restructure_entities([d], removed=[Transform], added=[{Transform: Transform()}])
+    registry.remove_entity(b)
+    registry.flush_observers()
+    assert log == [("replace", [a, b, c]), ("remove", [c, d]), ("add", [d]), ("remove", [b])], log
+
+    # hooks run in order, and what they cause is flushed too
+    log.clear()
+    registry.observe(Disabled, on_add=lambda r, batch: [r.add_components(e, Transform()) for e, _ in batch])
+    registry.set_enabled(c, False)
+    registry.flush_observers()
+    assert log == [("add", [c])], log
+
+
+def check_ref_counts() -> None:
+    registry = Registry()
+    assets_state = AssetsState()
+    registry.insert_resource(assets_state)
+    AssetSystem.observe(registry)
+
+    mesh_a, mesh_b = Mesh(id=1), Mesh(id=2)
+    shared = Material()
+    entities = registry.create_entities(10, lambda i: Transform(), lambda i: Visuals(mesh_a, shared))
+    registry.flush_observers()
+    assert assets_state.ref_counts[mesh_a] == 10 and assets_state.material_holds[shared][0] == 10
+
+    visuals = registry.get_components(entities[0], Visuals)[0]  # type: ignore
+    AssetSystem.set_mesh(assets_state, visuals, mesh_b)
+    registry.add_components(entities[1], Visuals(mesh_b, Material()))
+    for entity in entities[2:]:
+        registry.remove_entity(entity)
+    registry.flush_observers()
+    assert assets_state.ref_counts == {mesh_b: 2} and mesh_a in assets_state.unreferenced, assets_state.ref_counts
+    assert assets_state.material_holds[shared][0] == 1
+
+    registry.remove_entity(entities[0])
+    registry.remove_entity(entities[1])
+    registry.flush_observers()
+    assert not assets_state.ref_counts and not assets_state.visuals_holds and not assets_state.material_holds
+
+
+def churn(count: int, observed: bool) -> tuple[float, float]:
+    # the transforms are made before timing and outlive it, so neither run pays for allocating
+    # or recycling TransformStore rows. returns the whole time and the time flushing observers
+    registry = Registry()
+    if observed:
+        registry.insert_resource(AssetsState())
+        AssetSystem.observe(registry)
+    mesh = Mesh(id=1)
+    material = Material()
+    transforms = [Transform() for _ in range(count)]
+
+    start = time.perf_counter()
+    entities = registry.create_entities(count, lambda i: transforms[i], lambda i: Visuals(mesh, material), lambda i: Building())
+    flush_start = time.perf_counter()
+    registry.flush_observers()
+    flushing = time.perf_counter() - flush_start
+    for entity in entities:
+        registry.remove_entity(entity)
+    flush_start = time.perf_counter()
+    registry.flush_observers()
+    end = time.perf_counter()
+    return end - start, flushing + end - flush_start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    args = parser.parse_args()
+
+    check_events()
+    check_ref_counts()
+
+    print(f"{'entities':>10} {'unobserved (ms)':>16} {'observed (ms)':>14} {'flushing (ms)':>14} {'overhead':>9}")
+    for count in args.counts:
+        # alternated, so neither run always comes first
+        runs = [churn(count, observed) for _ in range(3) for observed in (False, True)]
+        plain = min(total for total, _ in runs[0::2])
+        observed = min(total for total, _ in runs[1::2])
+        flushing = min(flush for _, flush in runs[1::2])
+        print(f"{count:>10} {plain * 1000:>16.2f} {observed * 1000:>14.2f} {flushing * 1000:>14.2f} {observed / plain:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
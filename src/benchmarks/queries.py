@@ -0,0 +1,153 @@
+"""
+Compares cached filtered queries against filtering view() results in Python, on the loops
+RenderSystem runs every frame: batching visible meshes, and collecting the entities the
+segmentation pass tells apart. Also checks that query results follow entities being
+enabled, disabled, restructured and created into new archetypes.
+
+Run from `src/`:
+
+    python -m benchmarks.queries --counts 1000 50000 --disabled 0.3
+"""
+import argparse
+import random
+from typing import Any, List
+
+from benchmarks.registry_layout import time_best
+from entities.components.disabled import Disabled
+from entities.components.entity_flags import EntityFlags
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.environment import Environment
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform
+from entities.components.visuals.assets import Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.query import Query
+from entities.registry import Registry
+
+VISIBLE = Query(Transform, Visuals, without=(Disabled, ))
+CLASSIFIED = Query(Transform, any_of=(Vehicle, Building, Environment), without=(Disabled, ))
+TAGS = (Building, Environment, Vehicle)
+
+
+def populate(count: int, disabled: float, seed: int = 0) -> tuple[Registry, List[int]]:
+    rng = random.Random(seed)
+    registry = Registry()
+    mesh = Mesh(id=1)
+    material = Material()
+    entities = []
+    for tag in TAGS:
+        n = count // len(TAGS)
+        entities += registry.create_entities(
+            n, lambda i: EntityFlags(name=f"Entity {i}"), lambda i: Transform(), lambda i: Visuals(mesh, material), lambda i: tag()
+        )
+    # some plain props without a tag
+    entities += registry.create_entities(count // 4, lambda i: Transform(), lambda i: Visuals(mesh, material))
+    for entity in entities:
+        if rng.random() < disabled:
+            registry.set_enabled(entity, False)
+    return registry, entities
+
+
+def expected(registry: Registry, required: tuple, any_of: tuple = ()) -> set[int]:
+    return {
+        entity for entity, components in registry.view_all()
+        if all(t in components for t in required) and Disabled not in components
+        and (not any_of or any(t in components for t in any_of))
+    }
+
+
+def visible_filtered(registry: Registry) -> int:
+    # the batching loop as it was: visit everything, skip what is hidden
+    count = 0
+    for entity, (transform, visuals) in registry.view(Transform, Visuals):
+        if not registry.is_enabled(entity):
+            continue
+        count += 1
+    return count
+
+
+def visible_query(registry: Registry) -> int:
+    count = 0
+    for entity, (transform, visuals) in registry.query(VISIBLE):
+        count += 1
+    return count
+
+
+def classified_views(registry: Registry) -> int:
+    # one view per tag, then the per-entity check
+    classified: List[Any] = []
+    for tag in TAGS:
+        for entity, _ in registry.view(tag):
+            if registry.get_components(entity, Transform) is not None and registry.is_enabled(entity):
+                classified.append(entity)
+    return len(classified)
+
+
+def classified_query(registry: Registry) -> int:
+    return sum(1 for _ in registry.query(CLASSIFIED))
+
+
+def check(seed: int) -> None:
+    rng = random.Random(seed)
+    registry, entities = populate(300, 0.3, seed)
+    # build the caches first, so everything below has to keep them up to date
+    list(registry.query(VISIBLE))
+    list(registry.query(CLASSIFIED))
+
+    class Marker:
+        pass
+
+    for step in range(400):
+        entity = rng.choice(entities)
+        roll = rng.random()
+        if roll < 0.4:
+            registry.set_enabled(entity, not registry.is_enabled(entity))
+        elif roll < 0.6:
+            # lands in archetypes that didn't exist when the queries were cached
+            registry.add_components(entity, Marker())
+        elif roll < 0.7:
+            registry.remove_components(entity, Visuals)
+        elif roll < 0.8:
+            registry.add_components(entity, rng.choice(TAGS)())
+        elif roll < 0.9:
+            registry.remove_entity(entity)
+            entities.remove(entity)
+        else:
+            entities += registry.create_entities(3, lambda i: Transform(), lambda i: rng.choice(TAGS)())
+
+        if step % 20 == 0:
+            assert {e for e, _ in registry.query(VISIBLE)} == expected(registry, (Transform, Visuals))
+            assert {e for e, _ in registry.query(CLASSIFIED)} == expected(registry, (Transform, ), TAGS)
+
+    # an equal query built later shares the cache entry
+    assert Query(Visuals, Transform, without=(Disabled, )) != VISIBLE
+    assert Query(Transform, Visuals, without=[Disabled]) == VISIBLE
+    assert {e for e, _ in registry.query(Query(Transform, Visuals, without=[Disabled]))} == expected(registry, (Transform, Visuals))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    parser.add_argument("--disabled", type=float, default=0.3, help="fraction of entities that are disabled")
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check(seed)
+
+    print(f"{'entities':>10} {'case':<12} {'filtered (ms)':>14} {'query (ms)':>11} {'speedup':>8}")
+    for count in args.counts:
+        registry, _ = populate(count, args.disabled)
+        assert visible_filtered(registry) == visible_query(registry)
+        assert classified_views(registry) == classified_query(registry)
+        for name, filtered, query in (
+            ("visible", visible_filtered, visible_query),
+            ("classified", classified_views, classified_query),
+        ):
+            a = time_best(lambda: filtered(registry), 5)
+            b = time_best(lambda: query(registry), 5)
+            print(f"{count:>10} {name:<12} {a * 1000:>14.3f} {b * 1000:>11.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Compares the archetype-backed Registry against the old dict-of-dicts layout
+on the access patterns RenderSystem and TransformInheritanceSystem use every frame,
+and on creating and disposing entities while many queries are cached.
+
+Run from `src/`:
+
+    python -m benchmarks.registry_layout --counts 1000 10000 50000
+"""
+import argparse
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, Set, Tuple, Type
+
+from entities.components.disabled import Disabled
+from entities.components.entity_flags import EntityFlags
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.environment import Environment
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform
+from entities.components.visuals.assets import Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.query import Query
+from entities.registry import Registry
+
+
+class DictRegistry:
+    """
+    The previous Registry storage: one dict per component type plus one per entity,
+    with queries cached as entity sets. Kept here only as a baseline.
+    """
+    def __init__(self) -> None:
+        self._next_id = 0
+        self._components: Dict[Type[Any], Dict[int, Any]] = {}
+        self._entity_components: Dict[int, Dict[Type[Any], Any]] = {}
+        self._parents: Dict[int, int] = {}
+        self._children: Dict[int, Set[int]] = {}
+        self._query_cache: Dict[Tuple[Type[Any], ...], Set[int]] = {}
+
+    def create_entity(self) -> int:
+        entity = self._next_id
+        self._next_id += 1
+        self._entity_components[entity] = {}
+        self._children[entity] = set()
+        return entity
+
+    def add_components(self, entity: int, *components: Any) -> None:
+        for c in components:
+            comp_type = type(c)
+            if comp_type not in self._components:
+                self._components[comp_type] = {}
+            self._components[comp_type][entity] = c
+            self._entity_components[entity][comp_type] = c
+
+        entity_comps = self._entity_components[entity]
+        for query_types, cached_set in self._query_cache.items():
+            if entity not in cached_set and all(qt in entity_comps for qt in query_types):
+                cached_set.add(entity)
+
+    def remove_entity(self, entity: int) -> None:
+        parent = self._parents.pop(entity, None)
+        if parent is not None:
+            self._children[parent].discard(entity)
+        self._children.pop(entity, None)
+        for comp_type in self._entity_components.pop(entity, {}):
+            self._components[comp_type].pop(entity, None)
+        for cached_set in self._query_cache.values():
+            cached_set.discard(entity)
+
+    def _get_or_build_cache(self, comp_types: Tuple[Type[Any], ...]) -> Set[int]:
+        if comp_types in self._query_cache:
+            return self._query_cache[comp_types]
+        stores = sorted((self._components.get(ct, {}) for ct in comp_types), key=len)
+        common = set(stores[0].keys())
+        for store in stores[1:]:
+            common &= store.keys()
+        self._query_cache[comp_types] = common
+        return common
+
+    def get_components_of_type(self, comp_type: Type[Any]) -> Dict[int, Any]:
+        return self._components.get(comp_type, {})
+
+    def view(self, *comp_types: Type[Any]):
+        cached_entities = self._get_or_build_cache(comp_types)
+        stores = [self._components[ct] for ct in comp_types]
+        if len(comp_types) == 2:
+            s0, s1 = stores
+            for e in cached_entities:
+                yield e, (s0[e], s1[e])
+        else:
+            for e in cached_entities:
+                yield e, tuple(store[e] for store in stores)
+
+    def get_singleton(self, *comp_types: Type[Any]):
+        cached_entities = self._get_or_build_cache(comp_types)
+        try:
+            lowest_entity = min(cached_entities)
+        except ValueError:
+            return None
+        return lowest_entity, tuple(self._components[ct][lowest_entity] for ct in comp_types)
+
+    def set_parent(self, child: int, new_parent: int) -> None:
+        self._parents[child] = new_parent
+        self._children[new_parent].add(child)
+
+    def get_parent(self, entity: int) -> int | None:
+        return self._parents.get(entity)
+
+    def get_children(self, entity: int) -> Set[int]:
+        return self._children.get(entity, set())
+
+
+def populate(registry: Any, count: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    mesh = Mesh(id=1)
+    material = Material()
+
+    root = registry.create_entity()
+    registry.add_components(root, EntityFlags(name="Street scene"), Transform())
+
+    for i in range(count):
+        entity = registry.create_entity()
+        kind = rng.random()
+        tag: Any = Building() if kind < 0.6 else (Environment() if kind < 0.8 else Vehicle())
+        registry.add_components(entity, EntityFlags(name=f"Entity {i}"), Transform(), Visuals(mesh, material), tag)
+        registry.set_parent(entity, root)
+
+
+VISIBLE = Query(Transform, Visuals, without=(Disabled, ))
+
+
+def render_batching(registry: Any) -> int:
+    # mirrors the batching loop of RenderSystem.update. nothing is disabled in the old layout
+    rows = registry.query(VISIBLE) if isinstance(registry, Registry) else registry.view(Transform, Visuals)
+    count = 0
+    for _, (transform, visuals) in rows:
+        count += 1
+    return count
+
+
+def transform_walk(registry: Any) -> int:
+    # mirrors the traversal of TransformInheritanceSystem.update, minus the math
+    transforms = dict(registry.get_components_of_type(Transform).items())
+    stack = [e for e in transforms if registry.get_parent(e) is None or registry.get_parent(e) not in transforms]
+    count = 0
+    while stack:
+        entity = stack.pop()
+        _ = transforms[entity]
+        count += 1
+        for child in registry.get_children(entity):
+            if child in transforms:
+                stack.append(child)
+    return count
+
+
+CHURN_TYPES = (EntityFlags, Transform, Visuals, Building, Environment, Vehicle)
+
+
+def scene_churn(registry: Any, count: int = 500) -> int:
+    # mirrors SceneGeneratorSystem regenerating part of the street after systems have
+    # made a pile of different queries
+    for r in (1, 2, 3):
+        for query in itertools.combinations(CHURN_TYPES, r):
+            for _ in registry.view(*query):
+                break
+
+    mesh = Mesh(id=1)
+    material = Material()
+    created = []
+    for i in range(count):
+        entity = registry.create_entity()
+        registry.add_components(entity, EntityFlags(name=f"Churn {i}"), Transform(), Visuals(mesh, material), Building())
+        created.append(entity)
+    for entity in created:
+        registry.remove_entity(entity)
+    return len(created)
+
+
+def time_best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entities':>10} {'case':<16} {'dict (ms)':>11} {'archetype (ms)':>15} {'speedup':>8}")
+    for count in args.counts:
+        layouts = {}
+        populate_times = {}
+        for name, factory in (("dict", DictRegistry), ("archetype", Registry)):
+            start = time.perf_counter()
+            registry = factory()
+            populate(registry, count)
+            populate_times[name] = time.perf_counter() - start
+            layouts[name] = registry
+
+        cases: Dict[str, Tuple[float, float]] = {
+            "populate": (populate_times["dict"], populate_times["archetype"]),
+        }
+        for case_name, fn in (
+            ("render batching", render_batching),
+            ("transform walk", transform_walk),
+            ("scene churn", scene_churn),
+        ):
+            assert fn(layouts["dict"]) == fn(layouts["archetype"])
+            cases[case_name] = (
+                time_best(lambda: fn(layouts["dict"]), args.repeat),
+                time_best(lambda: fn(layouts["archetype"]), args.repeat),
+            )
+
+        for case_name, (t_dict, t_arch) in cases.items():
+            print(f"{count:>10} {case_name:<16} {t_dict * 1000:>11.2f} {t_arch * 1000:>15.2f} {t_dict / t_arch:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
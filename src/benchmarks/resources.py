@@ -0,0 +1,104 @@
+"""
+Measures the singleton lookups systems do once per frame: get_singleton on the old
+dict-of-dicts layout and on the archetype Registry, against get_resource.
+
+Run from `src/`:
+
+    python -m benchmarks.resources --counts 1000 50000
+"""
+import argparse
+from typing import Any, Callable, List, Type
+
+from benchmarks.registry_layout import DictRegistry, populate, time_best
+from entities.components.camera import Camera
+from entities.components.camera_state import CameraState
+from entities.components.disposal import Disposal
+from entities.components.entity_flags import EntityFlags
+from entities.components.render_state import RenderState
+from entities.components.spawner_state import SpawnerState
+from entities.components.transform import Transform
+from entities.components.ui.gizmo_state import GizmoState
+from entities.components.ui.icon_render_state import IconRenderState
+from entities.components.ui.ui_state import UiState
+from entities.components.visuals.assets import AssetsState
+from entities.components.visuals.material import Material
+from entities.registry import Registry
+
+# one entry per lookup made by the systems in a frame, in Game.render order
+FRAME_LOOKUPS: List[Type[Any]] = [
+    RenderState,                                                # Game.render
+    AssetsState,                                                # AssetSystem
+    SpawnerState,                                               # SpawnerSystem
+    AssetsState,
+    AssetsState,                                                # FunctionSurfaceSystem
+    GizmoState, UiState, AssetsState,                           # GradientDescentSurfaceSystem
+    UiState, AssetsState, SpawnerState, RenderState,            # UiSystem
+    IconRenderState, Disposal, CameraState, GizmoState,
+    CameraState, GizmoState,                                    # CameraSystem
+    RenderState, CameraState,                                   # RenderSystem
+    GizmoState, UiState, CameraState,                           # GizmoSystem
+    IconRenderState, RenderState, UiState, CameraState,         # IconRenderSystem
+    RenderState,                                                # BoundingBoxRenderSystem
+    Disposal,                                                   # DisposalSystem
+]
+
+
+def populate_with_admin(registry: Any, count: int) -> None:
+    populate(registry, count)
+
+    camera_state_entity = registry.create_entity()
+    registry.add_components(camera_state_entity, EntityFlags(is_internal=True), CameraState())
+    registry.add_components(
+        registry.create_entity(),
+        EntityFlags(is_internal=True),
+        Disposal(), UiState(preview_entity=0, selection_child_entity=0, default_material=Material()), AssetsState(), SpawnerState(), RenderState(), IconRenderState(), GizmoState(),
+    )
+    registry.add_components(registry.create_entity(), EntityFlags(name="Camera 1"), Transform(), Camera())
+
+
+def frame_singletons(registry: Any) -> Callable[[], None]:
+    get_singleton = registry.get_singleton
+
+    def run() -> None:
+        for comp_type in FRAME_LOOKUPS:
+            get_singleton(comp_type)
+    return run
+
+
+def frame_resources(registry: Registry) -> Callable[[], None]:
+    get_resource = registry.get_resource
+
+    def run() -> None:
+        for comp_type in FRAME_LOOKUPS:
+            get_resource(comp_type)
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 50_000])
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{len(FRAME_LOOKUPS)} lookups per frame, {args.frames} frames per sample")
+    print(f"{'entities':>10} {'dict singleton (us/frame)':>26} {'singleton (us/frame)':>21} {'resource (us/frame)':>20}")
+    for count in args.counts:
+        dict_registry = DictRegistry()
+        populate_with_admin(dict_registry, count)
+        registry = Registry()
+        populate_with_admin(registry, count)
+
+        for comp_type in FRAME_LOOKUPS:
+            assert registry.get_resource(comp_type) is registry.get_singleton(comp_type)[1][0]  # type: ignore
+
+        timings = []
+        for run in (frame_singletons(dict_registry), frame_singletons(registry), frame_resources(registry)):
+            frames = args.frames
+            timings.append(time_best(lambda: [run() for _ in range(frames)], args.repeat) / frames)
+
+        print(f"{count:>10} {timings[0] * 1e6:>26.2f} {timings[1] * 1e6:>21.2f} {timings[2] * 1e6:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Compares view_children() / view_descendants() against walking get_children() /
+get_descendants() and probing every child with get_components(), the way the scene animator
+and gradient descent systems collected their vehicles and optimizers. Each of `--scenes`
+scenes holds `count / scenes` children, a third of them matching. Also checks the cached
+members against a fresh walk after reparenting, restructuring, creating and removing
+entities, including between iterations.
+
+Run from `src/`:
+
+    python -m benchmarks.scoped_views --counts 1000 50000 --scenes 20
+"""
+import argparse
+import random
+from typing import Any, List, Tuple
+
+from benchmarks.registry_layout import time_best
+from entities.components.entity_flags import EntityFlags
+from entities.components.gd.optimizer_state import OptimizerState
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform
+from entities.registry import Registry
+
+
+def populate(count: int, scenes: int) -> Tuple[Registry, List[int]]:
+    registry = Registry()
+    roots = []
+    per_scene = max(3, count // scenes)
+    for i in range(scenes):
+        root = registry.create_entity()
+        registry.add_components(root, EntityFlags(name=f"Scene {i}"), Transform())
+        registry.create_entities(per_scene // 3, lambda i: Transform(), lambda i: Vehicle(), parent=root)
+        registry.create_entities(per_scene // 3, lambda i: Transform(), lambda i: Building(), parent=root)
+        registry.create_entities(per_scene - 2 * (per_scene // 3), lambda i: Transform(), parent=root)
+        roots.append(root)
+    return registry, roots
+
+
+def children_probed(registry: Registry, roots: List[int]) -> int:
+    count = 0
+    for root in roots:
+        for child in registry.get_children(root):
+            r = registry.get_components(child, Transform, Vehicle)
+            if r:
+                count += 1
+    return count
+
+
+def children_viewed(registry: Registry, roots: List[int]) -> int:
+    count = 0
+    for root in roots:
+        for child, (transform, vehicle) in registry.view_children(root, Transform, Vehicle):
+            count += 1
+    return count
+
+
+def descendants_probed(registry: Registry, roots: List[int]) -> int:
+    count = 0
+    for root in roots:
+        for child in registry.get_descendants(root).tolist():
+            r = registry.get_components(child, Transform, Vehicle)
+            if r:
+                count += 1
+    return count
+
+
+def descendants_viewed(registry: Registry, roots: List[int]) -> int:
+    count = 0
+    for root in roots:
+        for child, (transform, vehicle) in registry.view_descendants(root, Transform, Vehicle):
+            count += 1
+    return count
+
+
+def expected(registry: Registry, root: int, comp_types: Tuple[Any, ...], descendants: bool) -> List[Tuple[int, Tuple[Any, ...]]]:
+    candidates = registry.get_descendants(root).tolist() if descendants else list(registry.get_children(root))
+    results = []
+    for entity in candidates:
+        components = registry.get_components(entity, *comp_types)
+        if components is not None:
+            results.append((entity, components))
+    return results
+
+
+def check(seed: int) -> None:
+    rng = random.Random(seed)
+    registry, roots = populate(120, 4)
+    entities = [e for root in roots for e in registry.get_descendants(root).tolist()]
+    scopes = [(Transform, Vehicle), (Vehicle, ), (Transform, OptimizerState), ()]
+
+    def compare() -> None:
+        for root in roots:
+            for comp_types in scopes:
+                for descendants in (False, True):
+                    view = registry.view_descendants if descendants else registry.view_children
+                    got = list(view(root, *comp_types))
+                    want = expected(registry, root, comp_types, descendants)
+                    if descendants:
+                        assert [e for e, _ in got] == [e for e, _ in want]
+                    assert {e: tuple(map(id, c)) for e, c in got} == {e: tuple(map(id, c)) for e, c in want}
+
+    for step in range(500):
+        if step % 10 == 0:
+            compare()
+
+        entity = rng.choice(entities)
+        roll = rng.random()
+        if roll < 0.2:
+            # nests scenes under scenes and entities under entities
+            parent = rng.choice(roots + entities + [None])
+            if parent is not None and parent in registry.get_descendants(entity).tolist():
+                continue
+            if parent != entity:
+                registry.set_parent(entity, parent)
+        elif roll < 0.35:
+            registry.add_components(entity, rng.choice((Vehicle(), OptimizerState(), Building())))
+        elif roll < 0.5:
+            registry.remove_components(entity, rng.choice((Vehicle, OptimizerState, Transform)))
+        elif roll < 0.6:
+            chosen = rng.sample(entities, 5)
+            registry.restructure_entities(chosen, (Building, ), [{Vehicle: Vehicle()} for _ in chosen])
+        elif roll < 0.7:
+            # replaced in place: the cached members stay, the yielded component is the new one
+            registry.add_components(entity, Transform())
+        elif roll < 0.8:
+            registry.remove_entity(entity)
+            entities.remove(entity)
+        elif roll < 0.9:
+            parent = rng.choice(roots + entities)
+            entities += registry.create_entities(3, lambda i: Transform(), lambda i: Vehicle(), parent=parent)
+        else:
+            # restructuring while iterating only skips what stopped matching
+            root = rng.choice(roots)
+            for child, (vehicle, ) in registry.view_descendants(root, Vehicle):
+                if rng.random() < 0.3:
+                    registry.remove_components(child, Vehicle)
+                else:
+                    assert registry.get_components(child, Vehicle) == (vehicle, )
+    compare()
+
+    # removed roots have nothing below them
+    root = roots.pop()
+    registry.remove_entity(root)
+    assert list(registry.view_children(root, Transform)) == []
+    assert list(registry.view_descendants(root, Transform)) == []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    parser.add_argument("--scenes", type=int, default=20)
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check(seed)
+
+    print(f"{'entities':>10} {'case':<12} {'probed (ms)':>12} {'view (ms)':>10} {'speedup':>8}")
+    for count in args.counts:
+        registry, roots = populate(count, args.scenes)
+        for name, probed, viewed in (
+            ("children", children_probed, children_viewed),
+            ("descendants", descendants_probed, descendants_viewed),
+        ):
+            assert probed(registry, roots) == viewed(registry, roots)
+            a = time_best(lambda: probed(registry, roots), 5)
+            b = time_best(lambda: viewed(registry, roots), 5)
+            print(f"{count:>10} {name:<12} {a * 1000:>12.3f} {b * 1000:>10.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
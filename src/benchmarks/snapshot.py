@@ -0,0 +1,134 @@
+"""
+Times saving and loading a street-like world of N entities (buildings and vehicles under
+one generator) through entities.snapshot, and checks the loaded world matches. Also checks
+that a snapshot naming a class that is not a component or asset type is refused, without
+creating it.
+
+Run from `src/`:
+
+    python -m benchmarks.snapshot --counts 10000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+
+from entities.components.entity_flags import EntityFlags
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform, transforms_from_arrays
+from entities.components.visuals.assets import Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.snapshot import load_snapshot, save_snapshot
+from math_utils import vec3
+
+
+def build_world(count: int, mesh: Mesh) -> tuple[Registry, int]:
+    rng = np.random.default_rng(0)
+    registry = Registry()
+    root = registry.create_entity()
+    registry.add_components(root, EntityFlags(name="Street scene"), Transform())
+
+    material = Material(albedo=vec3(0.5, 0.4, 0.3))
+    buildings = count * 3 // 4
+    registry.create_entities(
+        buildings,
+        lambda i: EntityFlags(name=f"Building {i}"),
+        transforms_from_arrays(rng.uniform(-500, 500, (buildings, 3)), rng.uniform(5, 40, (buildings, 3))),
+        lambda i: Visuals(mesh, material),
+        lambda i: Building(),
+        parent=root
+    )
+
+    vehicles = count - buildings
+    registry.create_entities(
+        vehicles,
+        lambda i: EntityFlags(name=f"Vehicle {i}"),
+        transforms_from_arrays(rng.uniform(-500, 500, (vehicles, 3))),
+        lambda i: Vehicle(target_speed=float(i % 20), current_speed=float(i % 20), direction=vec3(0, 0, 1)),
+        parent=root
+    )
+    return registry, root
+
+
+class Untrusted:
+    created = 0
+
+    def __setstate__(self, state: Any) -> None:
+        Untrusted.created += 1
+
+
+def check_untrusted(directory: str) -> None:
+    registry = Registry()
+    registry.create_entities(2, [EntityFlags(name="a"), EntityFlags(name=Untrusted())])  # type: ignore
+    path = os.path.join(directory, "untrusted.snapshot")
+    save_snapshot(registry, path)
+    try:
+        load_snapshot(Registry(), path)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("loaded a snapshot naming a class that is not a component")
+    assert Untrusted.created == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        check_untrusted(directory)
+
+    mesh = Mesh(id=7, filepath="assets/cube.obj")
+    meshes = {mesh.filepath: mesh}
+
+    def encode_ref(value: Any) -> Any:
+        return value.filepath if isinstance(value, Mesh) else None
+
+    print(f"{'entities':>10} {'save (ms)':>10} {'load (ms)':>10} {'size (MB)':>10}")
+    for count in args.counts:
+        registry, root = build_world(count, mesh)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "world.snapshot")
+
+            start = time.perf_counter()
+            saved = save_snapshot(registry, path, encode_ref=encode_ref)
+            save_time = time.perf_counter() - start
+
+            loaded_registry = Registry()
+            start = time.perf_counter()
+            handles = load_snapshot(loaded_registry, path, decode_ref=meshes.__getitem__)
+            load_time = time.perf_counter() - start
+            size = os.path.getsize(path)
+
+            # == the loaded world must match ==
+            assert saved == len(handles) == count + 1
+            (loaded_root, ) = [e for e in handles if loaded_registry.get_parent(e) is None]
+            assert len(loaded_registry.get_children(loaded_root)) == count
+
+            originals = {f.name: (t, v) for _, (f, t, v) in registry.view(EntityFlags, Transform, Vehicle)}
+            for _, (f, t, v) in loaded_registry.view(EntityFlags, Transform, Vehicle):
+                t0, v0 = originals.pop(f.name)  # type: ignore
+                assert (t.local.position == t0.local.position).all() and v.current_speed == v0.current_speed
+                assert type(v.current_speed) is float and v.lane_id == v0.lane_id
+            assert not originals
+
+            materials = {id(v.material) for _, (v, ) in loaded_registry.view(Visuals)}
+            assert len(materials) == 1 and all(v.mesh is mesh for _, (v, ) in loaded_registry.view(Visuals))
+
+            # loaded arrays are copy-on-write views of the file
+            (_, (transform, _)) = next(loaded_registry.view(Transform, Building))  # type: ignore
+            transform.local.position += 1.0
+            del transform, loaded_registry, handles
+        print(f"{count:>10} {save_time * 1000:>10.1f} {load_time * 1000:>10.1f} {size / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
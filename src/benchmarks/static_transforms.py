@@ -0,0 +1,155 @@
+"""
+Times one frame of moving `--moving` vehicles (each with model-node children) through a
+street of static entities, with and without the registry's change journal
+(Registry.track_changes): TransformInheritanceSystem plus rebuilding the model matrices of
+whatever moved, like RenderSystem. With the journal, the frame should cost about the same
+however many static entities there are. With few static entities the moving ones make up most
+of the table, and views scan instead (Registry JOURNAL_SCAN_RATIO), so both columns match there:
+looking up a journal of more than about an eighth of the rows was measured slower than the scan
+(0.93x at 1000 static / 100 moving). Also checks journaled change views against a scan of
+the tick columns while entities are created, removed, reparented, restructured and marked.
+
+Run from `src/`:
+
+    python -m benchmarks.static_transforms --counts 1000 20000 100000 --moving 100
+"""
+import argparse
+import random
+from typing import Any, List, Set, Tuple
+
+import math_utils
+from entities import registry as registry_module
+from benchmarks.registry_layout import time_best
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import TRANSFORMS, Transform, TransformStore
+from entities.registry import Registry
+from entities.systems.transform_inheritance import TransformInheritanceSystem
+
+
+class MatrixBuild:
+    """
+    RenderSystem's model matrix step, without the Visuals.
+    """
+    @staticmethod
+    def update(registry: Registry) -> int:
+        with registry.change_scope(MatrixBuild) as since:
+            rows = TransformStore.rows(t for _, (t, ) in registry.view(Transform, changed=(Transform, ), since=since))
+            if len(rows):
+                TRANSFORMS.matrices[rows] = math_utils.batch_transformation_matrix(
+                    TRANSFORMS.world_positions[rows], TRANSFORMS.world_rotations[rows], TRANSFORMS.world_scales[rows]
+                )
+            return len(rows)
+
+
+def populate(static: int, moving: int, journal: bool) -> Tuple[Registry, List[int]]:
+    registry = Registry()
+    if journal:
+        registry.track_changes(Transform)
+    street = registry.create_entity()
+    registry.add_components(street, Transform())
+    registry.create_entities(static, lambda i: Transform(), lambda i: Building(), parent=street)
+    vehicles = registry.create_entities(moving, lambda i: Transform(), lambda i: Vehicle(), parent=street)
+    for vehicle in vehicles:
+        registry.create_entities(5, lambda i: Transform(), parent=vehicle)
+    # settles everything created above
+    TransformInheritanceSystem.update(registry)
+    MatrixBuild.update(registry)
+    return registry, vehicles
+
+
+def frame(registry: Registry, vehicles: List[int]) -> None:
+    for vehicle in vehicles:
+        (transform, ) = registry.get_components(vehicle, Transform)  # type: ignore
+        transform.local.position[2] += 0.1
+        registry.mark_changed(vehicle, Transform)
+    TransformInheritanceSystem.update(registry)
+    assert MatrixBuild.update(registry) == 6 * len(vehicles)
+
+
+def scanned(registry: Registry, comp_types: Tuple[Any, ...], changed: Tuple[Any, ...], added: Tuple[Any, ...], since: int) -> Set[int]:
+    results = set()
+    for archetype in registry.archetypes():
+        if not set(comp_types) <= archetype.types:
+            continue
+        for row, entity in enumerate(archetype.entities):
+            if any(archetype.changed_ticks[t][row] > since for t in changed if t in archetype.types) \
+                    or any(archetype.added_ticks[t][row] > since for t in added if t in archetype.types):
+                results.add(entity)
+    return results
+
+
+def check(seed: int) -> None:
+    rng = random.Random(seed)
+    registry = Registry()
+    entities = registry.create_entities(100, lambda i: Transform())
+    # the journal starts late: views from before it still scan
+    registry.track_changes(Transform, Vehicle)
+    entities += registry.create_entities(50, lambda i: Transform(), lambda i: Vehicle())
+    scopes: List[str] = ["a", "b", "c"]
+    ticks: List[int] = [0]
+
+    for step in range(800):
+        entity = rng.choice(entities)
+        roll = rng.random()
+        if roll < 0.2:
+            registry.mark_changed(entity, rng.choice((Transform, Vehicle, Building)))
+        elif roll < 0.3:
+            registry.add_components(entity, rng.choice((Transform(), Vehicle(), Building())))
+        elif roll < 0.4:
+            registry.remove_components(entity, rng.choice((Transform, Vehicle, Building)))
+        elif roll < 0.5:
+            chosen = rng.sample(entities, 5)
+            registry.restructure_entities(chosen, (Building, ), [{Vehicle: Vehicle()} for _ in chosen])
+        elif roll < 0.6:
+            parent = rng.choice(entities + [None])
+            if parent is None or (parent != entity and parent not in registry.get_descendants(entity).tolist()):
+                registry.set_parent(entity, parent)
+        elif roll < 0.65:
+            registry.remove_entity(entity)
+            entities.remove(entity)
+        elif roll < 0.75:
+            entities += registry.create_entities(3, lambda i: Transform(), parent=rng.choice(entities))
+        else:
+            # some scopes run often, one rarely, holding back pruning
+            scope = rng.choice(scopes[:2]) if rng.random() < 0.95 else scopes[2]
+            with registry.change_scope(scope) as since:
+                for comp_types, changed, added in (
+                    ((Transform, ), (Transform, ), ()), ((Vehicle, ), (), (Vehicle, )),
+                    ((Transform, Vehicle), (Transform, Vehicle), ()), ((Transform, ), (Building, ), ()),
+                ):
+                    got = [e for e, _ in registry.view(*comp_types, changed=changed, added=added, since=since)]
+                    assert len(got) == len(set(got))
+                    assert set(got) == scanned(registry, comp_types, changed, added, since)
+            ticks.append(registry.tick)
+
+        if step % 50 == 0:
+            since = rng.choice(ticks)
+            got = {e for e, _ in registry.view(Transform, changed=(Transform, ), since=since)}
+            assert got == scanned(registry, (Transform, ), (Transform, ), (), since)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 20000, 100000], help="static entities")
+    parser.add_argument("--moving", type=int, default=100)
+    args = parser.parse_args()
+
+    # with a ratio of 0 views always take the journal, however much of the table it holds
+    for ratio in (registry_module.JOURNAL_SCAN_RATIO, 0):
+        registry_module.JOURNAL_SCAN_RATIO = ratio
+        for seed in range(5):
+            check(seed)
+
+    print(f"{'static':>10} {'moving':>7} {'scan (ms)':>10} {'journal (ms)':>13} {'speedup':>8}")
+    for count in args.counts:
+        timings = []
+        for journal in (False, True):
+            registry, vehicles = populate(count, args.moving, journal)
+            timings.append(time_best(lambda: frame(registry, vehicles), 10))
+        a, b = timings
+        print(f"{count:>10} {args.moving:>7} {a * 1000:>10.3f} {b * 1000:>13.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
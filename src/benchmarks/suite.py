@@ -0,0 +1,317 @@
+"""
+Microbenchmarks for the Registry core on a street-like scene, swept over entity counts.
+Needs no window or GL context. Results are written as JSON; `compare` lines up two result
+files and exits non-zero when a case got slower than the threshold, so it can gate
+changes to the ECS core.
+
+The scene mix has the archetypes SceneGeneratorSystem spawns, all under one street root:
+buildings, environment pieces like the road and sidewalks, and vehicles, each a root with
+the parts of its model (as SpawnerSystem instantiates them) as children. The shares are
+made up, more buildings than the generator's defaults, as the street grows to N entities.
+Every DISABLED_EVERY-th building is disabled, as the inspector's toggle does, so `view 5`
+has rows: (EntityFlags, Transform, Visuals, Building, Disabled).
+
+Run from `src/`:
+
+    python -m benchmarks.suite run --counts 1000 10000 100000 --out before.json
+    python -m benchmarks.suite run --counts 1000 10000 100000 --out after.json
+    python -m benchmarks.suite compare before.json after.json --threshold 0.15
+
+Add 1000000 to --counts for the full sweep; it takes a few minutes.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from entities.components.disabled import Disabled
+from entities.components.disposal import Disposal
+from entities.components.entity_flags import EntityFlags
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.environment import Environment
+from entities.components.street_scene.scene_generator_state import SceneGeneratorState
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform
+from entities.components.visuals.assets import Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.systems.disposal import DisposalSystem
+
+MESH = Mesh(id=1)
+MATERIAL = Material()
+PARTS_PER_VEHICLE = 3
+# every this many buildings one is disabled, as the inspector does
+DISABLED_EVERY = 10
+
+# kind -> (share of the scene, component factory)
+SCENE_MIX: Dict[str, Tuple[float, Callable[[int], Tuple[Any, ...]]]] = {
+    "building": (0.75, lambda i: (EntityFlags(name=f"Building {i}"), Transform(), Visuals(MESH, MATERIAL), Building())),
+    "environment": (0.05, lambda i: (EntityFlags(name=f"Sidewalk {i}"), Transform(), Visuals(MESH, MATERIAL), Environment())),
+    "vehicle": (0.05, lambda i: (EntityFlags(name=f"Vehicle {i}"), Transform(), Vehicle())),
+    "vehicle part": (0.15, lambda i: (EntityFlags(name=f"Part {i}"), Transform(), Visuals(MESH, MATERIAL))),
+}
+
+VIEWS = [
+    (Transform, ),
+    (Transform, Visuals),
+    (EntityFlags, Transform, Visuals),
+    (EntityFlags, Transform, Visuals, Building),
+    (EntityFlags, Transform, Visuals, Building, Disabled),
+]
+
+
+# == scene ==
+
+def kind_counts(count: int) -> Dict[str, int]:
+    counts = {kind: int(count * share) for kind, (share, _) in SCENE_MIX.items()}
+    counts["vehicle part"] = counts["vehicle"] * PARTS_PER_VEHICLE
+    counts["building"] += count - sum(counts.values())
+    return counts
+
+
+def build_scene(count: int) -> Tuple[Registry, int, Dict[str, List[int]]]:
+    """
+    The scene mix in bulk, for cases that only time what happens to it afterwards.
+    """
+    registry = Registry()
+    registry.add_components(registry.create_entity(), EntityFlags(is_internal=True), Disposal())
+    root = registry.create_entity()
+    registry.add_components(root, EntityFlags(name="Street scene"), Transform(), SceneGeneratorState())
+
+    entities: Dict[str, List[int]] = {}
+    for kind, n in kind_counts(count).items():
+        factory = SCENE_MIX[kind][1]
+        if kind == "vehicle part":
+            parts: List[int] = []
+            for v, vehicle in enumerate(entities["vehicle"]):
+                columns = zip(*(factory(v * PARTS_PER_VEHICLE + p) for p in range(PARTS_PER_VEHICLE)))
+                parts += registry.create_entities(PARTS_PER_VEHICLE, *columns, parent=vehicle)
+            entities[kind] = parts
+        elif n:
+            entities[kind] = registry.create_entities(n, *zip(*(factory(i) for i in range(n))), parent=root)
+        else:
+            entities[kind] = []
+    for building in entities["building"][::DISABLED_EVERY]:
+        registry.set_enabled(building, False)
+    return registry, root, entities
+
+
+def scene_plan(count: int) -> List[Tuple[str, Tuple[Any, ...]]]:
+    plan = []
+    for kind, n in kind_counts(count).items():
+        factory = SCENE_MIX[kind][1]
+        plan += [(kind, factory(i)) for i in range(n)]
+    return plan
+
+
+# == cases ==
+# each case sets up, then returns (timed function, number of operations it performs)
+
+Case = Callable[[int, random.Random], Tuple[Callable[[], Any], int]]
+
+
+def case_create_entity(count: int, rng: random.Random):
+    registry = Registry()
+    return (lambda: [registry.create_entity() for _ in range(count)]), count
+
+
+def case_add_components(count: int, rng: random.Random):
+    registry = Registry()
+    entities = [registry.create_entity() for _ in range(count)]
+    plan = scene_plan(count)
+    rng.shuffle(plan)
+
+    def run():
+        add = registry.add_components
+        for entity, (_, components) in zip(entities, plan):
+            add(entity, *components)
+    return run, count
+
+
+def case_view(types: Tuple[type, ...]) -> Case:
+    def case(count: int, rng: random.Random):
+        registry, _, _ = build_scene(count)
+        rows = sum(1 for _ in registry.view(*types))
+        def run():
+            for _ in registry.view(*types):
+                pass
+        return run, max(rows, 1)
+    return case
+
+
+def case_get_components(count: int, rng: random.Random):
+    registry, _, entities = build_scene(count)
+    pool = [e for kind in ("building", "environment", "vehicle part") for e in entities[kind]]
+    lookups = [rng.choice(pool) for _ in range(min(count, 100_000))]
+
+    def run():
+        get = registry.get_components
+        for entity in lookups:
+            get(entity, Transform, Visuals)
+    return run, len(lookups)
+
+
+def case_get_singleton(count: int, rng: random.Random):
+    registry, _, _ = build_scene(count)
+    calls = 10_000
+
+    def run():
+        for _ in range(calls):
+            registry.get_singleton(SceneGeneratorState)
+    return run, calls
+
+
+def case_set_parent(count: int, rng: random.Random):
+    registry, root, entities = build_scene(count)
+    blocks = registry.create_entities(16, lambda i: Transform(), parent=root)
+    moves = [(e, rng.choice(blocks)) for e in entities["building"] + entities["environment"]]
+
+    def run():
+        set_parent = registry.set_parent
+        for child, parent in moves:
+            set_parent(child, parent)
+    return run, max(len(moves), 1)
+
+
+def case_remove_entity(count: int, rng: random.Random):
+    registry, _, entities = build_scene(count)
+    order = [e for kind in entities.values() for e in kind]
+    rng.shuffle(order)
+
+    def run():
+        remove = registry.remove_entity
+        for entity in order:
+            remove(entity)
+    return run, len(order)
+
+
+def case_disposal(count: int, rng: random.Random):
+    registry, root, _ = build_scene(count)
+    disposal = registry.get_resource(Disposal)
+
+    def run():
+        disposal.entities_to_dispose.add(root)  # type: ignore
+        DisposalSystem.update(registry)
+        assert not registry.is_alive(root)
+    return run, count + 1
+
+
+CASES: Dict[str, Case] = {
+    "create_entity": case_create_entity,
+    "add_components": case_add_components,
+    **{f"view {len(types)}": case_view(types) for types in VIEWS},
+    "get_components": case_get_components,
+    "get_singleton": case_get_singleton,
+    "set_parent": case_set_parent,
+    "remove_entity": case_remove_entity,
+    "disposal": case_disposal,
+}
+
+
+def measure(case: Case, count: int, repeat: int, seed: int) -> Tuple[float, int]:
+    # destructive cases need a fresh setup per repetition; setup is never timed
+    best = float("inf")
+    ops = 0
+    for r in range(repeat):
+        run, ops = case(count, random.Random(seed + r))
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best, ops
+
+
+# == commands ==
+
+def run_command(args: argparse.Namespace) -> None:
+    cases = args.cases or list(CASES)
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise SystemExit(f"Unknown cases: {', '.join(sorted(unknown))}. Known: {', '.join(CASES)}")
+
+    results = []
+    print(f"{'entities':>10} {'case':<16} {'total (ms)':>12} {'per op (ns)':>12}")
+    for count in args.counts:
+        # big sweeps take long enough without repeating
+        repeat = args.repeat if count <= 100_000 else 1
+        for name in cases:
+            seconds, ops = measure(CASES[name], count, repeat, args.seed)
+            per_op = seconds / ops * 1e9
+            results.append({"case": name, "count": count, "seconds": seconds, "ops": ops, "per_op_ns": per_op})
+            print(f"{count:>10} {name:<16} {seconds * 1000:>12.3f} {per_op:>12.1f}")
+
+    if args.out:
+        meta = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        }
+        with open(args.out, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1)
+        print(f"wrote {len(results)} results to {args.out}")
+
+
+def compare_command(args: argparse.Namespace) -> None:
+    def load(path: str) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        with open(path) as f:
+            return {(r["case"], r["count"]): r for r in json.load(f)["results"]}
+
+    before, after = load(args.before), load(args.after)
+    shared = [key for key in before if key in after]
+    if not shared:
+        raise SystemExit("The two runs have no (case, count) in common")
+
+    regressions = 0
+    print(f"{'entities':>10} {'case':<16} {'before (ns)':>12} {'after (ns)':>12} {'ratio':>7}")
+    for key in sorted(shared, key=lambda k: (k[1], list(CASES).index(k[0]) if k[0] in CASES else len(CASES))):
+        a, b = before[key]["per_op_ns"], after[key]["per_op_ns"]
+        ratio = b / a
+        flag = ""
+        if ratio > 1.0 + args.threshold:
+            flag = "  slower"
+            regressions += 1
+        elif ratio < 1.0 - args.threshold:
+            flag = "  faster"
+        print(f"{key[1]:>10} {key[0]:<16} {a:>12.1f} {b:>12.1f} {ratio:>6.2f}x{flag}")
+
+    for key in sorted(set(before) ^ set(after)):
+        print(f"only in {'before' if key in before else 'after'}: {key[0]} @ {key[1]}")
+
+    if regressions:
+        print(f"{regressions} case(s) slower by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite")
+    run.add_argument("--counts", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    run.add_argument("--cases", nargs="+", help=f"subset of: {', '.join(CASES)}")
+    run.add_argument("--repeat", type=int, default=5, help="best of this many runs, for counts up to 100k")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--out", help="write results to this JSON file")
+    run.set_defaults(handler=run_command)
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--threshold", type=float, default=0.15, help="relative slowdown that counts as a regression")
+    compare.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
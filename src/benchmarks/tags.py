@@ -0,0 +1,178 @@
+"""
+Compares classifying entities through the registry's tag bitset against probing each one
+with get_components(), as the segmentation export did: once per visible id for the labels,
+and once per visible id for the segmentation map, which also masked the whole frame per id.
+Also checks that the bitset follows entities through creation, removal, slot reuse and
+every way of adding and removing components.
+
+Run from `src/`:
+
+    python -m benchmarks.tags --counts 1000 50000 --visible 200
+"""
+import argparse
+import random
+from typing import List
+
+import numpy as np
+import numpy.typing as npt
+
+from benchmarks.registry_layout import time_best
+from entities.components.street_scene.building import Building
+from entities.components.street_scene.environment import Environment
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.transform import Transform
+from entities.registry import Registry
+
+TAGS = (Vehicle, Building, Environment)
+COLORS = np.array([[0, 0, 0], [255, 0, 0], [0, 255, 0]], dtype=np.uint8)
+WIDTH, HEIGHT = 1280, 720
+
+
+def populate(count: int, seed: int = 0) -> tuple[Registry, List[int]]:
+    registry = Registry()
+    registry.track_tags(*TAGS)
+    entities = []
+    for tag in TAGS:
+        entities += registry.create_entities(count // 4, lambda i: Transform(), lambda i: tag())
+    entities += registry.create_entities(count // 4, lambda i: Transform())
+    random.Random(seed).shuffle(entities)
+    return registry, entities
+
+
+def id_buffer(entities: List[int], visible: int, seed: int = 0) -> npt.NDArray[np.uint32]:
+    # a frame of overlapping rectangles, one per visible entity, on background
+    rng = np.random.default_rng(seed)
+    ids = np.zeros((HEIGHT, WIDTH), dtype=np.uint32)
+    for entity in rng.choice(entities, visible, replace=False).tolist():
+        x, y = rng.integers(0, WIDTH - 40), rng.integers(0, HEIGHT - 40)
+        w, h = rng.integers(10, 200), rng.integers(10, 200)
+        ids[y:y + h, x:x + w] = entity
+    return ids
+
+
+def classify_probes(registry: Registry, entity_id: int) -> int:
+    if registry.get_components(entity_id, Vehicle):
+        return 1
+    if registry.get_components(entity_id, Building):
+        return 2
+    return 0
+
+
+def classify_bits(registry: Registry, entity_ids: npt.NDArray[np.integer]) -> npt.NDArray[np.int64]:
+    bits = registry.tag_bits(entity_ids)
+    class_ids = np.zeros(len(bits), dtype=np.int64)
+    class_ids[(bits & registry.tag_mask(Building)) != 0] = 2
+    class_ids[(bits & registry.tag_mask(Vehicle)) != 0] = 1
+    return class_ids
+
+
+def segmentation_probes(registry: Registry, ids: npt.NDArray[np.uint32]) -> npt.NDArray[np.uint8]:
+    seg_rgb = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for entity_id in np.unique(ids):
+        if entity_id == 0:
+            continue
+        seg_rgb[ids == entity_id] = COLORS[classify_probes(registry, int(entity_id))]
+    return seg_rgb
+
+
+def segmentation_bits(registry: Registry, ids: npt.NDArray[np.uint32]) -> npt.NDArray[np.uint8]:
+    visible_ids, pixel_ids = np.unique(ids, return_inverse=True)
+    return COLORS[classify_bits(registry, visible_ids)[pixel_ids.reshape(ids.shape)]]
+
+
+def expected_bits(registry: Registry, entity: int) -> int:
+    location = registry._location(entity)
+    if location is None:
+        return 0
+    return sum(registry.tag_mask(t) for t in TAGS if t in location[0].types)
+
+
+def check(seed: int) -> None:
+    rng = random.Random(seed)
+    registry = Registry()
+    # tracking starts with entities already around
+    entities = registry.create_entities(50, lambda i: Transform(), lambda i: Building())
+    entities += registry.create_entities(50, lambda i: Transform())
+    registry.track_tags(*TAGS)
+    registry.track_tags(Building)
+    stale: List[int] = []
+
+    for step in range(600):
+        roll = rng.random()
+        entity = rng.choice(entities)
+        if roll < 0.2:
+            registry.add_components(entity, rng.choice(TAGS)())
+        elif roll < 0.35:
+            registry.remove_components(entity, rng.choice(TAGS))
+        elif roll < 0.45:
+            chosen = rng.sample(entities, 10)
+            tag = rng.choice(TAGS)
+            registry.restructure_entities(chosen, (rng.choice(TAGS), ), [{tag: tag()} for _ in chosen])
+        elif roll < 0.55:
+            registry.restructure_entities(rng.sample(entities, 10), (rng.choice(TAGS), ))
+        elif roll < 0.7:
+            registry.remove_entity(entity)
+            entities.remove(entity)
+            stale.append(entity)
+        elif roll < 0.85:
+            # reuses freed slots, so stale handles share slots with live ones
+            entities += registry.create_entities(5, lambda i: Transform(), lambda i: rng.choice(TAGS)())
+        else:
+            entity = registry.create_entity()
+            registry.add_components(entity, Vehicle())
+            entities.append(entity)
+
+        if step % 25 == 0:
+            handles = entities + stale
+            bits = registry.tag_bits(handles).tolist()
+            assert bits == [expected_bits(registry, e) for e in handles]
+            assert all(b == 0 for b in registry.tag_bits(stale).tolist())
+            for tag in TAGS:
+                live = {e for e in entities if tag in registry._location(e)[0].types}  # type: ignore
+                assert set(registry.tagged(tag).tolist()) == live
+            buildings_only = {
+                e for e in entities
+                if Building in registry._location(e)[0].types and Vehicle not in registry._location(e)[0].types  # type: ignore
+            }
+            assert set(registry.tagged(Building, without=(Vehicle, )).tolist()) == buildings_only
+
+    # a type given twice is still one bit
+    assert registry.tag_mask(Building, Building) == registry.tag_mask(Building)
+    assert registry.tag_mask(Building, Vehicle, Building) == registry.tag_mask(Building) | registry.tag_mask(Vehicle)
+
+    try:
+        registry.tag_mask(Transform)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("untracked types have no tag bits")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    parser.add_argument("--visible", type=int, default=200, help="entities visible in the synthetic frame")
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check(seed)
+
+    print(f"{'entities':>10} {'case':<14} {'probes (ms)':>12} {'bitset (ms)':>12} {'speedup':>8}")
+    for count in args.counts:
+        registry, entities = populate(count)
+        ids = id_buffer(entities, min(args.visible, len(entities)))
+        handles = np.array(entities, dtype=np.int64)
+        assert classify_bits(registry, handles).tolist() == [classify_probes(registry, e) for e in entities]
+        assert np.array_equal(segmentation_probes(registry, ids), segmentation_bits(registry, ids))
+
+        for name, probes, bits in (
+            ("classify all", lambda: [classify_probes(registry, e) for e in entities], lambda: classify_bits(registry, handles)),
+            ("segmentation", lambda: segmentation_probes(registry, ids), lambda: segmentation_bits(registry, ids)),
+        ):
+            a = time_best(probes, 3)
+            b = time_best(bits, 3)
+            print(f"{count:>10} {name:<14} {a * 1000:>12.3f} {b * 1000:>12.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Compares TransformInheritanceSystem, which composes every parent-child pair of a hierarchy
+level in one NumPy call, against the per-entity walk it replaced. Hierarchies are vehicles
+with spawned model-node children (the street scene), deep chains and wide fans; every run
+marks all roots changed. Also checks that both produce the same world transforms, bit for
+bit, on random hierarchies with non-inheriting transforms, entities without a Transform in
+the middle and random dirty subsets.
+
+Run from `src/`:
+
+    python -m benchmarks.transform_inheritance --counts 1000 50000
+"""
+import argparse
+import random
+from typing import List, Tuple
+
+import numpy as np
+
+import math_utils
+from benchmarks.registry_layout import time_best
+from entities.components.transform import TRANSFORMS, Transform, TransformData
+from entities.registry import Registry
+from entities.systems.transform_inheritance import TransformInheritanceSystem
+
+
+class PerEntityInheritance:
+    """
+    TransformInheritanceSystem as it was: each dirty subtree walked one entity at a time.
+    """
+    @staticmethod
+    def update(registry: Registry):
+        with registry.change_scope(PerEntityInheritance) as since:
+            dirty = [entity for entity, _ in registry.view(Transform, changed=(Transform, ), since=since)]
+            if not dirty:
+                return
+
+            scaled_pos_scratch = np.zeros(3, dtype=np.float32)
+            hierarchy = registry.hierarchy()
+            transforms = registry.get_components_of_type(Transform)
+            done: set[int] = set()
+
+            for start in sorted(hierarchy.position(entity) for entity in dirty):
+                if start in done:
+                    continue
+                end = int(hierarchy.ends[start])
+                entities = hierarchy.entities[start:end].tolist()
+                parents = hierarchy.parent_entities[start:end].tolist()
+                ends = hierarchy.ends[start:end].tolist()
+
+                i = 0
+                while i < len(entities):
+                    entity = entities[i]
+                    transform = transforms.get(entity)
+                    if transform is None:
+                        i = ends[i] - start
+                        continue
+                    done.add(start + i)
+                    i += 1
+
+                    parent = parents[i - 1]
+                    parent_transform = transforms.get(parent) if parent != 0 else None
+                    local = transform.local
+                    world = transform.world
+
+                    if transform.inherit and parent_transform is not None:
+                        parent_world = parent_transform.world
+                        math_utils.quaternion_mul_out(parent_world.rotation, local.rotation, world.rotation)
+                        np.multiply(parent_world.scale, local.scale, out=world.scale)
+                        np.multiply(local.position, parent_world.scale, out=scaled_pos_scratch)
+                        math_utils.rotate_vector_by_quaternion_out(scaled_pos_scratch, parent_world.rotation, world.position)
+                        world.position += parent_world.position
+                    else:
+                        world.position[:] = local.position
+                        world.rotation[:] = local.rotation
+                        world.scale[:] = local.scale
+
+                    registry.mark_changed(entity, Transform)
+
+
+def random_transform(rng: random.Random) -> Transform:
+    rotation = np.array([rng.gauss(0, 1) for _ in range(4)], dtype=np.float32)
+    return Transform(local=TransformData(
+        position=math_utils.vec3(rng.uniform(-10, 10), rng.uniform(-10, 10), rng.uniform(-10, 10)),
+        rotation=rotation / np.linalg.norm(rotation),
+        scale=math_utils.vec3(rng.uniform(0.5, 2), rng.uniform(0.5, 2), rng.uniform(0.5, 2)),
+    ))
+
+
+def populate(shape: str, count: int, seed: int = 0) -> Tuple[Registry, List[int]]:
+    rng = random.Random(seed)
+    registry = Registry()
+    roots: List[int] = []
+    created = 0
+    if shape == "vehicles":
+        # a vehicle, its model root and a handful of nodes, wheels under some of them
+        while created < count:
+            vehicle = registry.create_entity()
+            registry.add_components(vehicle, random_transform(rng))
+            (model, ) = registry.create_entities(1, lambda i: random_transform(rng), parent=vehicle)
+            nodes = registry.create_entities(6, lambda i: random_transform(rng), parent=model)
+            for node in nodes[:2]:
+                registry.create_entities(2, lambda i: random_transform(rng), parent=node)
+            roots.append(vehicle)
+            created += 12
+    elif shape == "deep":
+        # chains of 50
+        while created < count:
+            parent = registry.create_entity()
+            registry.add_components(parent, random_transform(rng))
+            roots.append(parent)
+            for _ in range(49):
+                (parent, ) = registry.create_entities(1, lambda i: random_transform(rng), parent=parent)
+            created += 50
+    else:
+        root = registry.create_entity()
+        registry.add_components(root, random_transform(rng))
+        registry.create_entities(count - 1, lambda i: random_transform(rng), parent=root)
+        roots.append(root)
+    return registry, roots
+
+
+def world_rows(registry: Registry) -> np.ndarray:
+    entities = sorted(registry.get_components_of_type(Transform))
+    rows = np.array([registry.get_components_of_type(Transform)[e].row for e in entities], dtype=np.int64)
+    return np.concatenate([
+        TRANSFORMS.world_positions[rows], TRANSFORMS.world_rotations[rows], TRANSFORMS.world_scales[rows]
+    ], axis=1)
+
+
+def check(seed: int) -> None:
+    rng = random.Random(seed)
+    registries = []
+    for _ in range(2):
+        build = random.Random(seed)
+        registry = Registry()
+        entities: List[int] = []
+        for _ in range(400):
+            parent = build.choice(entities) if entities and build.random() < 0.8 else None
+            (entity, ) = registry.create_entities(1, parent=parent)
+            roll = build.random()
+            if roll < 0.85:
+                transform = random_transform(build)
+                transform.inherit = roll > 0.1
+                registry.add_components(entity, transform)
+            entities.append(entity)
+        registries.append((registry, entities))
+
+    (batched, entities), (walked, _) = registries
+    for step in range(20):
+        chosen = rng.sample(entities, rng.randint(1, 40)) if step else entities
+        for registry in (batched, walked):
+            for entity in chosen:
+                transform = registry.get_components(entity, Transform)
+                if transform is not None:
+                    transform[0].local.position += 1.0
+                    registry.mark_changed(entity, Transform)
+        TransformInheritanceSystem.update(batched)
+        PerEntityInheritance.update(walked)
+        assert np.array_equal(world_rows(batched), world_rows(walked))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check(seed)
+
+    print(f"{'entities':>10} {'shape':<10} {'per entity (ms)':>16} {'levels (ms)':>12} {'speedup':>8}")
+    for count in args.counts:
+        for shape in ("vehicles", "deep", "wide"):
+            timings = []
+            results = []
+            for system in (PerEntityInheritance, TransformInheritanceSystem):
+                registry, roots = populate(shape, count)
+
+                def run() -> None:
+                    for root in roots:
+                        registry.mark_changed(root, Transform)
+                    system.update(registry)
+
+                timings.append(time_best(run, 3))
+                results.append(world_rows(registry))
+            assert np.array_equal(results[0], results[1])
+            a, b = timings
+            print(f"{count:>10} {shape:<10} {a * 1000:>16.3f} {b * 1000:>12.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
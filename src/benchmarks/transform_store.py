@@ -0,0 +1,165 @@
+"""
+Compares working on transforms one object at a time, through the Transform views, against
+working on the TransformStore columns: translating every local position, and building every
+matrix from the local position, rotation and scale. Also checks that the views follow their row
+through growth of the store, batched row reuse, deepcopy and the columnar snapshot encoding.
+
+Run from `src/`:
+
+    python -m benchmarks.transform_store --counts 1000 50000
+"""
+import argparse
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import numpy.typing as npt
+
+import math_utils
+from benchmarks.registry_layout import time_best
+from entities.components.transform import RESET_BATCH, TRANSFORMS, Transform, TransformData, TransformStore, transforms_from_arrays
+
+
+def populate(count: int, seed: int = 0) -> List[Transform]:
+    rng = np.random.default_rng(seed)
+    rotations = rng.normal(size=(count, 4)).astype(np.float32)
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    return transforms_from_arrays(
+        rng.uniform(-100, 100, size=(count, 3)).astype(np.float32),
+        rng.uniform(0.5, 2.0, size=(count, 3)).astype(np.float32),
+        rotations,
+    )
+
+
+def translate_objects(transforms: List[Transform], offset: npt.NDArray[np.float32]) -> None:
+    for transform in transforms:
+        transform.local.position += offset
+
+
+def translate_columns(rows: npt.NDArray[np.int64], offset: npt.NDArray[np.float32]) -> None:
+    TRANSFORMS.local_positions[rows] += offset
+
+
+def matrices_objects(transforms: List[Transform]) -> None:
+    for transform in transforms:
+        local = transform.local
+        math_utils.update_transformation_matrix(local.position, local.rotation, local.scale, transform.matrix_cache)
+
+
+def matrices_columns(rows: npt.NDArray[np.int64]) -> None:
+    # same layout as update_transformation_matrix: scaled rotation, translation in the last column
+    x, y, z, w = TRANSFORMS.local_rotations[rows].T
+    scale = TRANSFORMS.local_scales[rows]
+    matrices = np.zeros((len(rows), 4, 4), dtype=np.float32)
+    matrices[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    matrices[:, 0, 1] = 2 * (x * y - w * z)
+    matrices[:, 0, 2] = 2 * (x * z + w * y)
+    matrices[:, 1, 0] = 2 * (x * y + w * z)
+    matrices[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    matrices[:, 1, 2] = 2 * (y * z - w * x)
+    matrices[:, 2, 0] = 2 * (x * z - w * y)
+    matrices[:, 2, 1] = 2 * (y * z + w * x)
+    matrices[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    matrices[:, :3, :3] *= scale[:, None, :]
+    matrices[:, :3, 3] = TRANSFORMS.local_positions[rows]
+    matrices[:, 3, 3] = 1.0
+    TRANSFORMS.matrices[rows] = matrices
+
+
+def check() -> None:
+    transform = Transform(local=TransformData(position=math_utils.vec3(1.0, 2.0, 3.0)), inherit=False)
+    assert np.array_equal(TRANSFORMS.local_positions[transform.row], [1.0, 2.0, 3.0])
+    assert not transform.inherit and np.array_equal(transform.world.rotation, math_utils.quaternion_identity())
+
+    # in place and assigned writes both land in the store
+    transform.local.position += 1.0
+    transform.local.scale = math_utils.vec3(2.0, 2.0, 2.0)
+    transform.matrix_cache[0, 3] = 5.0
+    assert np.array_equal(TRANSFORMS.local_positions[transform.row], [2.0, 3.0, 4.0])
+    assert np.array_equal(TRANSFORMS.local_scales[transform.row], [2.0, 2.0, 2.0])
+    assert TRANSFORMS.matrices[transform.row, 0, 3] == 5.0
+
+    # the store grows under existing transforms
+    capacity = TRANSFORMS.capacity
+    others = populate(capacity + 1)
+    assert TRANSFORMS.capacity > capacity
+    assert np.array_equal(transform.local.position, [2.0, 3.0, 4.0])
+    assert len({t.row for t in others + [transform]}) == len(others) + 1
+
+    # copies get a row of their own
+    copied = copy.deepcopy(transform)
+    assert copied.row != transform.row and not copied.inherit
+    copied.local.position[:] = 0.0
+    assert np.array_equal(transform.local.position, [2.0, 3.0, 4.0])
+    assert np.array_equal(copied.matrix_cache, transform.matrix_cache)
+
+    # released rows come back as identity transforms, once a batch of them is queued
+    copies = [copy.deepcopy(transform) for _ in range(RESET_BATCH)]
+    released = {c.row for c in copies}
+    del copies
+    reused = [t for t in (Transform() for _ in range(RESET_BATCH)) if t.row in released]
+    assert reused and all(t.inherit for t in reused)
+    assert all(np.array_equal(t.local.position, [0.0, 0.0, 0.0]) for t in reused)
+    assert all(np.array_equal(t.local.scale, [1.0, 1.0, 1.0]) for t in reused)
+    assert all(np.array_equal(t.matrix_cache, np.eye(4)) for t in reused)
+
+    # a view keeps its transform, and so its row
+    view = Transform(local=TransformData(position=math_utils.vec3(7.0, 7.0, 7.0))).local
+    fresh = [Transform() for _ in range(10)]
+    assert np.array_equal(view.position, [7.0, 7.0, 7.0]) and view._row not in {t.row for t in fresh}
+
+    # threads making and dropping transforms, and growing the store, never share out a row
+    def churn(seed: int) -> List[Transform]:
+        rng = np.random.default_rng(seed)
+        kept: List[Transform] = []
+        for _ in range(3000):
+            kept.append(Transform())
+            if rng.random() < 0.4:
+                kept.pop(int(rng.integers(len(kept))))
+            if rng.random() < 0.01:
+                kept += transforms_from_arrays(np.zeros((50, 3), dtype=np.float32))
+        return kept
+    with ThreadPoolExecutor(4) as pool:
+        alive = [t for kept in pool.map(churn, range(8)) for t in kept]
+    assert len({t.row for t in alive}) == len(alive)
+
+    # snapshots go through the columns
+    loaded = Transform.from_columns(Transform.to_columns(others[:100]))
+    for a, b in zip(others[:100], loaded):
+        assert a.row != b.row
+        for name in ("local_positions", "local_rotations", "local_scales", "world_positions", "matrices", "inherits"):
+            assert np.array_equal(getattr(TRANSFORMS, name)[a.row], getattr(TRANSFORMS, name)[b.row])
+
+    # the column kernel builds the same matrices as the per-object one
+    rows = TransformStore.rows(others)
+    matrices_objects(others)
+    expected = TRANSFORMS.matrices[rows].copy()
+    TRANSFORMS.matrices[rows] = 0.0
+    matrices_columns(rows)
+    assert np.allclose(TRANSFORMS.matrices[rows], expected, atol=1e-4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    args = parser.parse_args()
+
+    check()
+
+    offset = math_utils.vec3(0.1, 0.0, -0.1)
+    print(f"{'transforms':>10} {'case':<12} {'objects (ms)':>13} {'columns (ms)':>13} {'speedup':>8}")
+    for count in args.counts:
+        transforms = populate(count)
+        rows = TransformStore.rows(transforms)
+        for name, objects, columns in (
+            ("translate", lambda: translate_objects(transforms, offset), lambda: translate_columns(rows, offset)),
+            ("matrices", lambda: matrices_objects(transforms), lambda: matrices_columns(rows)),
+        ):
+            a = time_best(objects, 3)
+            b = time_best(columns, 3)
+            print(f"{count:>10} {name:<12} {a * 1000:>13.3f} {b * 1000:>13.3f} {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Compares keeping world-space boxes around drawn entities one entity at a time (transforming
+the eight corners of the mesh's box) against BoundsSystem's batched pass over the same
+entities, and against the batched pass over the `--moving` fraction that moved, which is
+what a frame does. Also checks math_utils.batch_transform_aabb against transformed corners,
+mesh bounds against their vertices, and that entities whose mesh is still loading get their
+box once it is ready.
+
+Run from `src/`:
+
+    python -m benchmarks.world_bounds --counts 1000 50000 --moving 0.01
+"""
+import argparse
+import itertools
+from typing import List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+import math_utils
+from benchmarks.registry_layout import time_best
+from entities.components.bounds_state import BoundsState
+from entities.components.transform import TRANSFORMS, Transform, TransformStore, transforms_from_arrays
+from entities.components.visuals.assets import AssetStatus, Mesh
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+from entities.systems.assets import _calculate_bounds
+from entities.systems.bounds import BoundsSystem
+
+
+def random_matrices(rng: np.random.Generator, count: int) -> npt.NDArray[np.float32]:
+    rotations = rng.normal(size=(count, 4)).astype(np.float32)
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    scales = rng.uniform(-3, 3, size=(count, 3)).astype(np.float32)
+    positions = rng.uniform(-100, 100, size=(count, 3)).astype(np.float32)
+    return math_utils.batch_transformation_matrix(positions, rotations, scales)
+
+
+def random_mesh(rng: np.random.Generator, mesh_id: int) -> Tuple[Mesh, npt.NDArray[np.float32]]:
+    positions = (rng.normal(size=(200, 3)) * rng.uniform(0.1, 5.0, size=3) + rng.uniform(-2, 2, size=3)).astype(np.float32)
+    return Mesh(id=mesh_id, status=AssetStatus.Ready, bounds=_calculate_bounds(positions)), positions
+
+
+def populate(count: int, seed: int = 0) -> Tuple[Registry, List[Tuple[Transform, Visuals]]]:
+    rng = np.random.default_rng(seed)
+    meshes = [random_mesh(rng, i)[0] for i in range(8)]
+    material = Material()
+    rotations = rng.normal(size=(count, 4)).astype(np.float32)
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    transforms = transforms_from_arrays(
+        rng.uniform(-100, 100, size=(count, 3)).astype(np.float32),
+        rng.uniform(0.5, 2.0, size=(count, 3)).astype(np.float32),
+        rotations,
+    )
+    registry = Registry()
+    registry.insert_resource(BoundsState())
+    registry.create_entities(count, transforms, lambda i: Visuals(meshes[i % len(meshes)], material))
+    rows = TransformStore.rows(transforms)
+    TRANSFORMS.matrices[rows] = math_utils.batch_transformation_matrix(
+        TRANSFORMS.local_positions[rows], TRANSFORMS.local_rotations[rows], TRANSFORMS.local_scales[rows]
+    )
+    return registry, [(t, v) for _, (t, v) in registry.view(Transform, Visuals)]
+
+
+def per_entity(drawn: List[Tuple[Transform, Visuals]]) -> None:
+    for transform, visuals in drawn:
+        bounds = visuals.mesh.bounds
+        corners = np.array(list(itertools.product(*zip(bounds.minimum, bounds.maximum))))  # type: ignore
+        matrix = transform.matrix_cache
+        world = corners @ matrix[:3, :3].T + matrix[:3, 3]
+        TRANSFORMS.bounds_minimums[transform.row] = world.min(axis=0)
+        TRANSFORMS.bounds_maximums[transform.row] = world.max(axis=0)
+
+
+def check_kernel(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    count = 500
+    matrices = random_matrices(rng, count)
+    minimums = rng.uniform(-5, 0, size=(count, 3)).astype(np.float32)
+    maximums = minimums + rng.uniform(0, 5, size=(count, 3)).astype(np.float32)
+    # flat boxes, like a plane
+    maximums[::7, 1] = minimums[::7, 1]
+
+    got_min, got_max = math_utils.batch_transform_aabb(matrices, minimums, maximums)
+    for i in range(count):
+        corners = np.array(list(itertools.product(*zip(minimums[i], maximums[i]))), dtype=np.float64)
+        world = corners @ matrices[i, :3, :3].T.astype(np.float64) + matrices[i, :3, 3]
+        assert np.allclose(got_min[i], world.min(axis=0), atol=1e-4), i
+        assert np.allclose(got_max[i], world.max(axis=0), atol=1e-4), i
+
+    out = (np.full((count, 3), np.nan, dtype=np.float32), np.full((count, 3), np.nan, dtype=np.float32))
+    assert math_utils.batch_transform_aabb(matrices, minimums, maximums, out=out) is out
+    assert np.array_equal(out[0], got_min) and np.array_equal(out[1], got_max)
+
+    # mesh bounds hold every vertex, in the box and in the sphere
+    for mesh_id in range(20):
+        mesh, positions = random_mesh(rng, mesh_id)
+        bounds = mesh.bounds
+        assert bounds is not None
+        assert np.all(positions >= bounds.minimum) and np.all(positions <= bounds.maximum)
+        assert np.all(np.linalg.norm(positions - bounds.center, axis=1) <= bounds.radius * (1 + 1e-6))
+    assert _calculate_bounds(np.zeros((0, 3), dtype=np.float32)) is None
+
+
+def check_loading(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    registry, drawn = populate(50, seed)
+    loading = Mesh(id=100, status=AssetStatus.Loading)
+    failing = Mesh(id=101, status=AssetStatus.Loading)
+    for transform, visuals in drawn[:10]:
+        visuals.mesh = loading
+    for transform, visuals in drawn[10:15]:
+        visuals.mesh = failing
+    state = registry.get_resource(BoundsState)
+    assert state is not None
+
+    BoundsSystem.update(registry, drawn)
+    rows = TransformStore.rows(t for t, _ in drawn)
+    assert np.all(np.isinf(TRANSFORMS.bounds_minimums[rows[:15]])) and len(state.pending) == 15
+    assert np.all(np.isfinite(TRANSFORMS.bounds_minimums[rows[15:]]))
+
+    # one frame later the meshes are done, nothing moved
+    loading.bounds = random_mesh(rng, 100)[0].bounds
+    loading.status = AssetStatus.Ready
+    failing.status = AssetStatus.Failed
+    BoundsSystem.update(registry, [])
+    assert not state.pending
+    assert np.all(np.isfinite(TRANSFORMS.bounds_minimums[rows[:10]]))
+    assert np.all(np.isinf(TRANSFORMS.bounds_minimums[rows[10:15]]))
+
+    expected = (TRANSFORMS.bounds_minimums[rows].copy(), TRANSFORMS.bounds_maximums[rows].copy())
+    per_entity(drawn[:10] + drawn[15:])
+    kept = np.r_[0:10, 15:50]
+    assert np.allclose(TRANSFORMS.bounds_minimums[rows[kept]], expected[0][kept], atol=1e-4)
+    assert np.allclose(TRANSFORMS.bounds_maximums[rows[kept]], expected[1][kept], atol=1e-4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 50000])
+    parser.add_argument("--moving", type=float, default=0.01, help="fraction of entities moved per frame")
+    args = parser.parse_args()
+
+    for seed in range(5):
+        check_kernel(seed)
+        check_loading(seed)
+
+    print(f"{'entities':>10} {'per entity (ms)':>16} {'batched (ms)':>13} {'moved only (ms)':>16} {'batched speedup':>16}")
+    for count in args.counts:
+        registry, drawn = populate(count)
+        moved = drawn[::max(1, int(1 / args.moving))]
+        a = time_best(lambda: per_entity(drawn), 3)
+        b = time_best(lambda: BoundsSystem.update(registry, drawn), 3)
+        c = time_best(lambda: BoundsSystem.update(registry, moved), 3)
+        print(f"{count:>10} {a * 1000:>16.3f} {b * 1000:>13.3f} {c * 1000:>16.3f} {a / b:>15.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ class Application:
 
     has_broken_opengl = platform.system() == "Darwin"
 
-    def __init__(self, initial_window_width, initial_window_height):
+    def __init__(self, initial_window_width, initial_window_height, visible: bool = True):
         self.current_window_width = initial_window_width
         self.current_window_height = initial_window_height
 
@@ -31,6 +31,8 @@ class Application:
         glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
 
         glfw.window_hint(glfw.RESIZABLE, True)
+        # hidden windows still give a full GL context, for rendering without showing anything
+        glfw.window_hint(glfw.VISIBLE, visible)
         glfw.window_hint(glfw.DOUBLEBUFFER, True)
         glfw.window_hint(glfw.SRGB_CAPABLE, True)
 
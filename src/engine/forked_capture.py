@@ -0,0 +1,172 @@
+"""
+Captures many variants of one world in parallel by forking worker processes off a loaded
+registry, so assets are read and processed once rather than once per process.
+
+The loading process never creates a GL context: it runs the GL-free part of the first
+frames until every asset is processed, keeping vertex and texel data as CPU arrays
+(AssetsState.defer_uploads). Each variant is then captured by a forked child, which
+inherits the registry and those arrays copy-on-write, opens its own hidden window, uploads
+and renders. Variants don't affect each other, since each starts from the loaded world.
+
+Forking needs os.fork(), so this is not available on Windows.
+"""
+import gc
+import os
+import random
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+from engine.game import Game
+from entities.components.render_state import RenderState
+from entities.components.spawner_state import SpawnerState
+from entities.components.street_scene.scene_animator_state import SceneAnimatorState
+from entities.components.street_scene.scene_generator_state import SceneGeneratorState
+from entities.components.visuals.assets import AssetsState
+from entities.registry import Registry
+from entities.systems.assets import AssetSystem
+from entities.systems.command_buffer import CommandBufferSystem
+from entities.systems.disposal import DisposalSystem
+from entities.systems.spawner import SpawnerSystem
+from entities.systems.street_scene.scene_generator import SceneGeneratorSystem
+
+# called in each worker with the registry and the variant index, before capturing starts
+VariantSetup = Callable[[Registry, int], None]
+
+
+def prepare_world(world_path: str | None = None, timeout: float = 120.0) -> Registry:
+    """
+    Loads `world_path`, or generates the street scene, without a GL context and waits for
+    every asset it uses to be processed.
+    """
+    registry = Game.create_registry(world_path, defer_uploads=True)
+    assets_state = registry.get_resource(AssetsState)
+    spawner_state = registry.get_resource(SpawnerState)
+    if assets_state is None or spawner_state is None:
+        raise RuntimeError("prepare_world is missing AssetsState / SpawnerState singletons")
+
+    deadline = time.monotonic() + timeout
+    while True:
+        # the GL-free part of a frame and its sync point
+        SceneGeneratorSystem.update(registry)
+        SpawnerSystem.update(registry)
+        CommandBufferSystem.update(registry)
+        DisposalSystem.update(registry)
+        registry.flush_observers()
+        AssetSystem.update(registry)
+        AssetSystem.collect(registry)
+
+        if AssetSystem.is_settled(assets_state) and not spawner_state.pending_spawns:
+            return registry
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Assets of the world were not processed within {timeout}s")
+        time.sleep(0.01)
+
+
+def regenerate_street(registry: Registry, variant: int) -> None:
+    """
+    A VariantSetup that regenerates every street scene from the variant's seed and animates
+    its vehicles. Models are already loaded, so this only spawns entities.
+    """
+    for _, (generator_state, animator_state) in registry.view(SceneGeneratorState, SceneAnimatorState):
+        generator_state.should_generate = True
+        animator_state.animate_vehicles = True
+
+
+def capture_variants(
+    registry: Registry, variants: int, frames: int, out_dir: str = "dataset",
+    size: tuple[int, int] = (1280, 720), workers: int | None = None,
+    setup: VariantSetup | None = None, warmup_frames: int = 2
+) -> List[int]:
+    """
+    Captures `frames` frames of each of `variants` variants of `registry` into
+    `out_dir`/variant_NNN, running up to `workers` forked processes at once. `registry`
+    should come from prepare_world(). Returns the variants whose worker failed.
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Forked capture needs os.fork(), which this platform does not have")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # keeps the collector from touching, and so copying, every inherited object
+    gc.collect()
+    gc.freeze()
+
+    pending = list(range(variants))
+    running: dict[int, int] = {}
+    failed: List[int] = []
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                variant = pending.pop(0)
+                # or buffered output would be printed again by every child
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    _run_worker(registry, variant, frames, out_dir, size, setup, warmup_frames)
+                running[pid] = variant
+
+            pid, status = os.wait()
+            variant = running.pop(pid)
+            if os.waitstatus_to_exitcode(status) != 0:
+                failed.append(variant)
+    finally:
+        gc.unfreeze()
+    return sorted(failed)
+
+
+def _run_worker(
+    registry: Registry, variant: int, frames: int, out_dir: str, size: tuple[int, int],
+    setup: VariantSetup | None, warmup_frames: int
+) -> None:
+    # never returns: a forked child must not unwind into the parent's code
+    code = 1
+    try:
+        _capture_variant(registry, variant, frames, out_dir, size, setup, warmup_frames)
+        code = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _capture_variant(
+    registry: Registry, variant: int, frames: int, out_dir: str, size: tuple[int, int],
+    setup: VariantSetup | None, warmup_frames: int
+) -> None:
+    started = time.perf_counter()
+    assets_state = registry.get_resource(AssetsState)
+    render_state = registry.get_resource(RenderState)
+    if assets_state is None or render_state is None:
+        raise RuntimeError("Capture worker is missing AssetsState / RenderState singletons")
+
+    AssetSystem.after_fork(assets_state)
+    random.seed(variant)
+    np.random.seed(variant)
+
+    game = Game(size[0], size[1], registry=registry, visible=False)
+    AssetSystem.upload_deferred(assets_state)
+    ready = time.perf_counter()
+
+    if setup is not None:
+        setup(registry, variant)
+    for _ in range(warmup_frames):
+        game.render()
+
+    render_state.dataset_path = str(Path(out_dir) / f"variant_{variant:03d}")
+    render_state.capture_frames_remaining = frames
+    render_state.is_first_frame_of_capture = True
+    while render_state.capture_frames_remaining > 0:
+        game.render()
+
+    print(
+        f"[capture] variant {variant}: ready in {(ready - started) * 1000:.0f} ms, "
+        f"{frames} frames in {time.perf_counter() - ready:.2f} s"
+    )
@@ -4,9 +4,16 @@ from imgui_bundle import imgui
 import numpy as np
 
 from engine.application import Application
+from engine.scheduler import Hierarchy, Scheduler
+from entities.components.bounds_state import BoundsState
 from entities.components.camera import Camera
+from entities.components.command_buffer import CommandBuffer
+from entities.components.disabled import Disabled
 from entities.components.disposal import Disposal
 from entities.components.entity_flags import EntityFlags
+from entities.components.scheduler_state import SchedulerState
+from entities.components.simulation_state import SimulationState
+from entities.components.snapshot_state import SnapshotState
 from entities.components.spawner_state import SpawnerState
 from entities.components.visuals.assets import AssetsState
 from entities.components.ui.icon_render_state import IconRenderState
@@ -19,11 +26,19 @@ from entities.components.visuals.visuals import Visuals
 from entities.components.camera_state import CameraState
 from entities.components.street_scene.scene_animator_state import SceneAnimatorState
 from entities.components.street_scene.scene_generator_state import SceneGeneratorState
+from entities.components.street_scene.vehicle import Vehicle
+from entities.components.gd.optimizer_state import OptimizerState
+from entities.components.gd.surface import GradientDescentSurface
+from entities.components.surface_function import SurfaceFunction
+from entities.components.point_light import PointLight
 from entities.registry import Registry
+from entities.systems.command_buffer import CommandBufferSystem
 from entities.systems.disposal import DisposalSystem
+from entities.systems.snapshot import SnapshotSystem
 from entities.systems.function_surface import FunctionSurfaceSystem
 from entities.systems.gradient_descent import GradientDescentSurfaceSystem
 from entities.systems.render import RenderSystem
+from entities.systems.simulation import SimulationSystem
 from entities.systems.assets import AssetSystem
 from entities.systems.spawner import SpawnerSystem
 from entities.systems.ui.system import UiSystem
@@ -40,19 +55,41 @@ from entities.components.visuals.material import Material
 
 
 class Game(Application):
-    def __init__(self, initial_window_width, initial_window_height):
-        super().__init__(initial_window_width, initial_window_height)
+    def __init__(
+        self, initial_window_width, initial_window_height, world_path: str | None = None,
+        registry: Registry | None = None, visible: bool = True
+    ):
+        super().__init__(initial_window_width, initial_window_height, visible)
 
         self.last_update = None
         self._capture_sim_time = 0
 
-        self.registry = Registry()
+        # a registry handed in is used as is, e.g. one a forked capture worker inherited
+        self.registry = registry if registry is not None else Game.create_registry(world_path)
 
         # unorthodox system with OpenGL state that we need to make an instance of
         self.render_system = RenderSystem()
 
+        # systems that run once per frame, and ones that run once per simulation tick
+        self.scheduler = Scheduler()
+        self.simulation_scheduler = Scheduler()
+        self._schedule_systems()
+
+    @staticmethod
+    def create_registry(world_path: str | None = None, defer_uploads: bool = False) -> Registry:
+        """
+        A registry with everything the systems need, either loaded from `world_path` or set up
+        to generate the street scene. Needs no GL context if `defer_uploads` is set.
+        """
+        registry = Registry()
+        # GPU objects are freed once no Visuals references them
+        AssetSystem.observe(registry)
+        RenderSystem.track_classes(registry)
+        # the transform and render systems only look at what changed since their last run
+        registry.track_changes(Transform, Visuals)
+
         # == singleton components & entities required for above systems ==
-        assets_state = AssetsState()
+        assets_state = AssetsState(defer_uploads=defer_uploads)
         spawner_state = SpawnerState()
 
         # == material setup ==
@@ -72,38 +109,40 @@ class Game(Application):
         )
 
         # preview entity for adding meshes
-        preview_entity = self.registry.create_entity()
-        self.registry.add_components(
+        preview_entity = registry.create_entity()
+        registry.add_components(
             preview_entity,
             EntityFlags(is_internal=True),
             Transform(local=TransformData(position=vec3(0.0, 0.0, 0.0))),
             Visuals(
                 AssetSystem.create_immediate_mesh(assets_state, np.array([], dtype=np.float32), np.array([], dtype=np.uint32)),
-                material=mat_preview, enabled=False, is_internal=True
-            )
+                material=mat_preview, is_internal=True
+            ),
+            Disabled()
         )
         # cheap trick: this is a singleton as a child of the selected entity,
         # so that DisposalSystem can do the work of getting rid of dangling IDs for us.
         # this would instead be a tagging component if we had to implement selecting
         # multiple entities, but we just need 1.
-        selection_child_entity = self.registry.create_entity()
-        self.registry.add_components(
+        selection_child_entity = registry.create_entity()
+        registry.add_components(
             selection_child_entity,
             EntityFlags(is_internal=True, dispose_alongside_parent=False),
         )
         # similar trick to the above for camera & camera control state
-        camera_state_entity = self.registry.create_entity()
-        self.registry.add_components(
+        camera_state_entity = registry.create_entity()
+        registry.add_components(
             camera_state_entity,
             EntityFlags(is_internal=True, dispose_alongside_parent=False),
             CameraState(),
         )
         # admin entity for overarching singletons
-        self.registry.add_components(
-            self.registry.create_entity(),
+        registry.add_components(
+            registry.create_entity(),
             EntityFlags(is_internal=True),
 
             Disposal(),
+            CommandBuffer(),
 
             UiState(
                 preview_entity=preview_entity,
@@ -113,13 +152,22 @@ class Game(Application):
             assets_state,
             spawner_state,
             RenderState(),
+            BoundsState(),
             IconRenderState(),
             GizmoState(),
+            SchedulerState(),
+            SimulationState(),
+            SnapshotState(),
         )
 
+        if world_path is not None:
+            # a saved world brings its own camera, lights and scene
+            SnapshotSystem.load_world(registry, world_path)
+            return registry
+
         # camera entity
-        c = self.registry.create_entity()
-        self.registry.add_components(
+        c = registry.create_entity()
+        registry.add_components(
             c,
             EntityFlags(name="Camera 1"),
             Transform(local=TransformData(
@@ -130,8 +178,8 @@ class Game(Application):
         )
 
         # light entity
-        l1 = self.registry.create_entity()
-        self.registry.add_components(
+        l1 = registry.create_entity()
+        registry.add_components(
             l1,
             EntityFlags(name="Light"),
             DirectionalLight(
@@ -141,8 +189,8 @@ class Game(Application):
         )
 
         # street scene
-        s = self.registry.create_entity()
-        self.registry.add_components(
+        s = registry.create_entity()
+        registry.add_components(
             s,
             EntityFlags(name="Street scene", is_internal=False),
             Transform(),
@@ -150,6 +198,8 @@ class Game(Application):
             SceneAnimatorState()
         )
 
+        return registry
+
     def render(self):
         # == preparation ==
         now = self.get_time()
@@ -157,14 +207,12 @@ class Game(Application):
             self.last_update = now
         dt = now - self.last_update
 
-        # cheap hack: retrieve RenderState to check for capture
-        render_state = None
-        for _, (rs,) in self.registry.view(RenderState):
-            render_state = rs
-            break
+        # retrieve RenderState to check for capture
+        render_state = self.registry.get_resource(RenderState)
+        capturing = render_state is not None and render_state.capture_frames_remaining > 0
 
         effective_now = now
-        if render_state and render_state.capture_frames_remaining > 0:
+        if capturing:
             dt = render_state.capture_fixed_dt
 
             if self._capture_sim_time is None:
@@ -183,25 +231,110 @@ class Game(Application):
         self.imgui_renderer.process_inputs()
         imgui.new_frame()
 
-        GizmoSystem.update(self.registry, window_size)
-        SpawnerSystem.update(self.registry)
-        SceneGeneratorSystem.update(self.registry)
-        SceneAnimatorSystem.update(self.registry, dt)
-        GradientDescentSurfaceSystem.update(self.registry, effective_now, dt)
-        FunctionSurfaceSystem.update(self.registry, effective_now, dt)
-        TransformInheritanceSystem.update(self.registry)
-        CameraSystem.update(self.registry, window_size, effective_now, dt)
-        UiSystem.update(self.registry, effective_now, dt)
-        AssetSystem.update(self.registry)
-        self.render_system.update(self.registry, window_size, effective_now, dt)
-        BoundingBoxRenderSystem.update(self.registry)
-        IconRenderSystem.update(self.registry, window_size)
+        # the simulation runs in fixed ticks, as many as fit the frame's time. a capture frame's time
+        # is fixed too, so captures don't depend on how fast frames are drawn.
+        scheduler_state = self.registry.get_resource(SchedulerState)
+        simulation = self.registry.get_resource(SimulationState)
+        if simulation is not None:
+            if scheduler_state is not None:
+                simulation.schedule.parallel = scheduler_state.parallel
+            for _ in range(SimulationSystem.advance(simulation, dt, capped=not capturing)):
+                SimulationSystem.begin_tick(self.registry, simulation)
+                self.simulation_scheduler.run(simulation.schedule, simulation.time, simulation.tick_duration)
+                SimulationSystem.end_tick(self.registry, simulation)
+
+        self.scheduler.run(scheduler_state, window_size, effective_now, dt)
 
         imgui.render()
         self.imgui_renderer.render(imgui.get_draw_data())
 
-        # == disposal ==
+        # == sync point ==
+        # structural changes recorded during the frame land here, then disposal
+        CommandBufferSystem.update(self.registry)
         DisposalSystem.update(self.registry)
+        SnapshotSystem.update(self.registry)
+        # observers see the frame's structural changes, then unreferenced GPU objects go
+        self.registry.flush_observers()
+        AssetSystem.collect(self.registry)
 
         # == wrapup ==
         self.last_update = now
+
+    def _schedule_systems(self):
+        # systems run in this order, except that ones whose reads / writes don't conflict
+        # may overlap on worker threads. imgui and OpenGL only work from the main thread.
+        # making a Transform allocates a row of the store, which may grow it: systems creating
+        # them write Transform, or leave that to their command buffer, which is applied at the
+        # sync point.
+        registry = self.registry
+        add = self.scheduler.add
+
+        add(
+            "Gizmo", lambda window_size, now, dt: GizmoSystem.update(registry, window_size),
+            reads=(UiState, CameraState, Hierarchy), writes=(GizmoState, Transform), main_thread=True
+        )
+        add(
+            "Spawner", lambda window_size, now, dt: SpawnerSystem.update(registry),
+            writes=(SpawnerState, AssetsState, CommandBuffer)
+        )
+        add(
+            "Scene generator", lambda window_size, now, dt: SceneGeneratorSystem.update(registry),
+            reads=(EntityFlags, Hierarchy),
+            writes=(SceneGeneratorState, Disposal, SpawnerState, AssetsState, CommandBuffer)
+        )
+        # catches up with what moved outside the simulation, e.g. dragged by the gizmo
+        add(
+            "Transform inheritance", lambda window_size, now, dt: TransformInheritanceSystem.update(registry),
+            reads=(Hierarchy, ), writes=(Transform, )
+        )
+        add(
+            "Camera", lambda window_size, now, dt: CameraSystem.update(registry, window_size, now, dt),
+            reads=(GizmoState, ), writes=(Transform, Camera, CameraState, Hierarchy), main_thread=True
+        )
+        # the ui can touch anything
+        add(
+            "UI", lambda window_size, now, dt: UiSystem.update(registry, now, dt),
+            main_thread=True, exclusive=True
+        )
+        add(
+            "Assets", lambda window_size, now, dt: AssetSystem.update(registry),
+            writes=(AssetsState, ), main_thread=True
+        )
+        add(
+            "Render", lambda window_size, now, dt: self.render_system.update(registry, window_size, now, dt),
+            reads=(Visuals, Camera, CameraState, PointLight, DirectionalLight, OptimizerState, Vehicle, Hierarchy),
+            writes=(RenderState, BoundsState, Transform), main_thread=True
+        )
+        add(
+            "Bounding boxes", lambda window_size, now, dt: BoundingBoxRenderSystem.update(registry),
+            reads=(RenderState, ), main_thread=True
+        )
+        add(
+            "Icons", lambda window_size, now, dt: IconRenderSystem.update(registry, window_size),
+            reads=(IconRenderState, RenderState, UiState, CameraState, Transform, Camera, PointLight, Hierarchy),
+            main_thread=True
+        )
+
+        # == simulation, once per tick with the simulation's time and the tick's duration ==
+        # at component-type granularity these run one after another: gradient descent shares
+        # Transform with the animator and Visuals / AssetsState with the function surface
+        add = self.simulation_scheduler.add
+        add(
+            "Scene animator", lambda now, dt: SceneAnimatorSystem.update(registry, dt),
+            reads=(SceneGeneratorState, Hierarchy), writes=(SceneAnimatorState, Vehicle, Transform)
+        )
+        add(
+            "Gradient descent", lambda now, dt: GradientDescentSurfaceSystem.update(registry, now, dt),
+            reads=(GizmoState, UiState, Hierarchy),
+            writes=(Transform, Visuals, GradientDescentSurface, OptimizerState, AssetsState)
+        )
+        # only filters on Transform, never reads it
+        add(
+            "Function surface", lambda now, dt: FunctionSurfaceSystem.update(registry, now, dt),
+            writes=(Visuals, SurfaceFunction, AssetsState)
+        )
+        # world transforms of each tick, for drawing in between two of them
+        add(
+            "Transform inheritance", lambda now, dt: TransformInheritanceSystem.update(registry),
+            reads=(Hierarchy, ), writes=(Transform, )
+        )
@@ -0,0 +1,156 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Type
+
+from entities.components.scheduler_state import SchedulerState, SystemTiming
+
+
+class Hierarchy:
+    """
+    Stands for the registry's parent/child links in reads / writes declarations.
+    Systems that call set_parent write it, systems that walk get_children read it.
+    """
+
+
+@dataclass(slots=True, eq=False)
+class ScheduledSystem:
+    name: str
+    run: Callable[..., None]
+    reads: FrozenSet[Type[Any]]
+    writes: FrozenSet[Type[Any]]
+    main_thread: bool
+    exclusive: bool
+    # indices of earlier systems this one has to wait for
+    dependencies: List[int] = field(default_factory=list)
+
+    def conflicts_with(self, other: "ScheduledSystem") -> bool:
+        if self.exclusive or other.exclusive:
+            return True
+        # keeps imgui and GL calls in registration order
+        if self.main_thread and other.main_thread:
+            return True
+        return not self.writes.isdisjoint(other.reads | other.writes) or not self.reads.isdisjoint(other.writes)
+
+
+class Scheduler:
+    """
+    Runs systems each frame in registration order, except that systems whose declared
+    component access does not conflict may run at the same time on a thread pool.
+
+    Systems running on the pool must not restructure the registry (create, add, remove,
+    reparent); they record into a CommandBuffer instead. Systems that touch imgui or
+    OpenGL must be registered with main_thread=True.
+    """
+    def __init__(self, max_workers: int = 4):
+        self._systems: List[ScheduledSystem] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="system")
+
+    def add(
+        self, name: str, run: Callable[..., None],
+        reads: Iterable[Type[Any]] = (), writes: Iterable[Type[Any]] = (),
+        main_thread: bool = False, exclusive: bool = False
+    ) -> None:
+        """
+        Registers a system. `run` is called with the arguments given to run().
+        An exclusive system runs alone, after everything registered before it.
+        """
+        system = ScheduledSystem(name, run, frozenset(reads), frozenset(writes), main_thread, exclusive)
+        system.dependencies = [i for i, earlier in enumerate(self._systems) if system.conflicts_with(earlier)]
+        self._systems.append(system)
+
+    def run(self, state: SchedulerState | None, *args: Any) -> None:
+        systems = self._systems
+        parallel = state is None or state.parallel
+
+        waiting_on = [len(s.dependencies) for s in systems]
+        dependents: List[List[int]] = [[] for _ in systems]
+        for i, system in enumerate(systems):
+            for d in system.dependencies:
+                dependents[d].append(i)
+
+        starts = [0.0] * len(systems)
+        ends = [0.0] * len(systems)
+        ready = [i for i, n in enumerate(waiting_on) if n == 0]
+        running: Dict[Future, int] = {}
+        frame_start = time.perf_counter()
+
+        def timed(i: int) -> None:
+            starts[i] = time.perf_counter()
+            try:
+                systems[i].run(*args)
+            finally:
+                ends[i] = time.perf_counter()
+
+        def finish(i: int) -> None:
+            for d in dependents[i]:
+                waiting_on[d] -= 1
+                if waiting_on[d] == 0:
+                    ready.append(d)
+
+        try:
+            finished = 0
+            while finished < len(systems):
+                # hand everything that can go to the pool first, then do main thread work
+                main_ready = []
+                for i in ready:
+                    if parallel and not systems[i].main_thread:
+                        running[self._executor.submit(timed, i)] = i
+                    else:
+                        main_ready.append(i)
+                ready.clear()
+
+                if main_ready:
+                    main_ready.sort()
+                    i = main_ready.pop(0)
+                    ready.extend(main_ready)
+                    timed(i)
+                    finish(i)
+                    finished += 1
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    future.result()
+                    finish(i)
+                    finished += 1
+        finally:
+            # never leave a system running into the next frame, even when one failed
+            wait(running)
+
+        if state is not None:
+            Scheduler._record_stats(state, systems, starts, ends, frame_start, time.perf_counter())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _record_stats(
+        state: SchedulerState, systems: List[ScheduledSystem],
+        starts: List[float], ends: List[float], frame_start: float, frame_end: float
+    ) -> None:
+        state.timings = [
+            SystemTiming(s.name, starts[i] - frame_start, ends[i] - starts[i], s.main_thread)
+            for i, s in enumerate(systems)
+        ]
+        state.frame_time = frame_end - frame_start
+
+        # longest chain of dependent systems by measured duration.
+        # systems are registered after their dependencies, so one pass in order is enough.
+        path_time = [0.0] * len(systems)
+        previous: List[int | None] = [None] * len(systems)
+        for i, system in enumerate(systems):
+            best = None
+            for d in system.dependencies:
+                if best is None or path_time[d] > path_time[best]:
+                    best = d
+            previous[i] = best
+            path_time[i] = (path_time[best] if best is not None else 0.0) + (ends[i] - starts[i])
+
+        path = []
+        last: int | None = max(range(len(systems)), key=path_time.__getitem__) if systems else None
+        while last is not None:
+            path.append(systems[last].name)
+            last = previous[last]
+        state.critical_path = path[::-1]
@@ -0,0 +1,79 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, Type
+
+
+class Archetype:
+    """
+    A table of every entity that has exactly the component set `types`.
+    Rows are packed: removing an entity moves the last row into its place.
+    Every column has two parallel tick columns recording when each component
+    was added and when it was last marked changed.
+    """
+    __slots__ = ("types", "entities", "columns", "added_ticks", "changed_ticks", "add_edges", "remove_edges", "tag_bits")
+
+    def __init__(self, types: FrozenSet[Type[Any]], order: Iterable[Type[Any]] = ()) -> None:
+        self.types = types
+        self.entities: List[int] = []
+
+        # columns keep the order components were first added in, so that
+        # things like the inspector list them in a stable order
+        self.columns: Dict[Type[Any], List[Any]] = {t: [] for t in order}
+        for t in types:
+            if t not in self.columns:
+                self.columns[t] = []
+
+        self.added_ticks: Dict[Type[Any], List[int]] = {t: [] for t in self.columns}
+        self.changed_ticks: Dict[Type[Any], List[int]] = {t: [] for t in self.columns}
+
+        # cached transitions to neighbouring archetypes, keyed by the set of types added / removed
+        self.add_edges: Dict[FrozenSet[Type[Any]], "Archetype"] = {}
+        self.remove_edges: Dict[FrozenSet[Type[Any]], "Archetype"] = {}
+
+        # bits of the tracked tag types in `types`, see Registry.track_tags()
+        self.tag_bits = 0
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def append(self, entity: int, components: Dict[Type[Any], Any], tick: int, source: "Archetype | None" = None, source_row: int = 0) -> int:
+        """
+        Appends a row. Components that also exist in `source` keep their ticks from
+        `source_row`, all others are stamped as added and changed at `tick`.
+        """
+        row = len(self.entities)
+        self.entities.append(entity)
+        added_ticks = self.added_ticks
+        changed_ticks = self.changed_ticks
+        for comp_type, column in self.columns.items():
+            column.append(components[comp_type])
+            if source is not None and comp_type in source.types:
+                added_ticks[comp_type].append(source.added_ticks[comp_type][source_row])
+                changed_ticks[comp_type].append(source.changed_ticks[comp_type][source_row])
+            else:
+                added_ticks[comp_type].append(tick)
+                changed_ticks[comp_type].append(tick)
+        return row
+
+    def swap_remove(self, row: int) -> int | None:
+        """
+        Removes `row` and returns the entity that was moved into it, if any.
+        """
+        last = len(self.entities) - 1
+        if row == last:
+            self.entities.pop()
+            for comp_type, column in self.columns.items():
+                column.pop()
+                self.added_ticks[comp_type].pop()
+                self.changed_ticks[comp_type].pop()
+            return None
+
+        moved = self.entities[last]
+        self.entities[row] = moved
+        self.entities.pop()
+        for comp_type, column in self.columns.items():
+            for values in (column, self.added_ticks[comp_type], self.changed_ticks[comp_type]):
+                values[row] = values[last]
+                values.pop()
+        return moved
+
+    def row_components(self, row: int) -> Dict[Type[Any], Any]:
+        return {comp_type: column[row] for comp_type, column in self.columns.items()}
@@ -0,0 +1,13 @@
+from dataclasses import dataclass, field
+
+from entities.components.transform import Transform
+from entities.components.visuals.visuals import Visuals
+
+
+@dataclass(slots=True, eq=False)
+class BoundsState:
+    # store row -> drawn entity whose mesh is still loading, given its box once it is ready
+    pending: dict[int, tuple[Transform, Visuals]] = field(default_factory=dict)
+
+    # == stats of the last frame ==
+    boxes_updated: int = 0
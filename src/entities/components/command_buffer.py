@@ -0,0 +1,42 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence, Type
+
+
+@dataclass(slots=True, eq=False)
+class CreateEntities:
+    # reserved handles, one per entity to create
+    entities: list[int]
+    # same meaning as the columns of Registry.create_entities
+    columns: tuple[Sequence[Any] | Callable[[int], Any], ...] = ()
+    parent: int | None = None
+
+
+@dataclass(slots=True, eq=False)
+class AddComponents:
+    entity: int
+    components: tuple[Any, ...]
+
+
+@dataclass(slots=True, eq=False)
+class RemoveComponents:
+    entity: int
+    comp_types: tuple[Type[Any], ...]
+
+
+@dataclass(slots=True, eq=False)
+class SetParent:
+    child: int
+    parent: int | None
+
+
+Command = CreateEntities | AddComponents | RemoveComponents | SetParent
+
+
+@dataclass(slots=True, eq=False)
+class CommandBuffer:
+    """
+    Structural registry changes recorded during a frame and applied together by
+    CommandBufferSystem at the sync point, so systems never restructure the
+    registry while something is iterating it.
+    """
+    commands: list[Command] = field(default_factory=list)
@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+
+# tag: the entity is hidden from queries that exclude it, see Registry.set_enabled()
+@dataclass(slots=True, eq=False)
+class Disabled:
+    pass
@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 import numpy as np
+import numpy.typing as npt
 
 
 class GlobalDrawMode(Enum):
@@ -31,6 +32,25 @@ class RenderState:
     is_first_frame_of_capture: bool = False
     capture_frames_remaining: int = 0
     capture_fixed_dt: float = 1.0 / 30.0
+    # cleared at the start of every capture
+    dataset_path: str = "dataset"
 
     show_bounding_boxes: bool = False
     bounding_boxes: list[BoundingBox] = field(default_factory=list)
+
+    # == frustum culling ==
+    frustum_culling: bool = True
+    # keeps culling against the view-projection matrix of the frame it was set, and draws that
+    # frustum, to look at what is culled from elsewhere
+    freeze_culling_frustum: bool = False
+    frozen_view_projection: npt.NDArray[np.float32] | None = None
+    # stats of the last frame, entities with Visuals that are not Disabled
+    culling_tested: int = 0
+    culling_culled: int = 0
+    culling_drawn: int = 0
+
+    # == instancing ==
+    # entities sharing a mesh and a material are drawn with one call, else one call each
+    instancing: bool = True
+    # calls the main pass made last frame
+    draw_calls: int = 0
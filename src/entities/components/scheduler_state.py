@@ -0,0 +1,22 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True, eq=False)
+class SystemTiming:
+    name: str
+    # seconds since the start of the frame
+    start: float
+    duration: float
+    main_thread: bool
+
+
+@dataclass(slots=True, eq=False)
+class SchedulerState:
+    # when False every system runs on the main thread, in registration order
+    parallel: bool = True
+
+    # == stats of the last frame ==
+    timings: list[SystemTiming] = field(default_factory=list)
+    # names of the chain of dependent systems that bounded the frame
+    critical_path: list[str] = field(default_factory=list)
+    frame_time: float = 0.0
@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field
+
+from entities.components.scheduler_state import SchedulerState
+
+
+@dataclass(slots=True, eq=False)
+class SimulationState:
+    # simulation systems run this many ticks per second of game time, however fast frames are drawn
+    tick_rate: float = 60.0
+    # a frame that would need more ticks than this drops the rest of its time, so slow frames
+    # slow the simulation down instead of making the next frame slower still. not applied to captures.
+    max_ticks_per_frame: int = 8
+    # draw what the simulation moves part way between its last two ticks, else at the last tick
+    interpolate: bool = True
+
+    # == runtime ==
+    # game time not simulated yet, less than one tick
+    accumulator: float = 0.0
+    # how far between the last two ticks frames are drawn, [0, 1]
+    alpha: float = 1.0
+    ticks: int = 0
+    time: float = 0.0
+    # registry tick when the running tick started
+    tick_start: int = 0
+    # entities whose Transform the last tick changed
+    moved: list[int] = field(default_factory=list)
+
+    # == stats of the last frame ==
+    ticks_last_frame: int = 0
+    # systems of the last tick
+    schedule: SchedulerState = field(default_factory=SchedulerState)
+
+    @property
+    def tick_duration(self) -> float:
+        return 1.0 / self.tick_rate
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, eq=False)
+class SnapshotState:
+    path_input: str = "world.snapshot"
+
+    # requests, handled by SnapshotSystem at the end of the frame
+    save_path: str | None = None
+    load_path: str | None = None
+
+    last_message: str | None = None
@@ -1,13 +1,14 @@
 from dataclasses import dataclass, field
 
-from entities.components.transform import Transform
+from entities.components.transform import TransformData
 from entities.components.visuals.assets import ModelAsset
 
 
 @dataclass(slots=True, eq=False)
 class SpawnRequest:
     model: ModelAsset
-    root_transform: Transform
+    # plain data: the spawned entities' Transforms are only made when the command buffer is applied
+    root_transform: TransformData
     parent_entity: int | None = None
 
 
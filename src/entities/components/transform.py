@@ -1,4 +1,7 @@
+from collections import deque
 from dataclasses import dataclass, field
+import threading
+from typing import Any, Dict, Iterable, List, Sequence
 from math_utils import vec3, quaternion_identity
 
 import numpy as np
@@ -11,21 +14,301 @@ class TransformData:
     rotation: npt.NDArray[np.float32] = field(default_factory=lambda: quaternion_identity())
     scale: npt.NDArray[np.float32] = field(default_factory=lambda: vec3(1.0, 1.0, 1.0))
 
+_IDENTITY_ROTATION = quaternion_identity()
+_IDENTITY_MATRIX = np.eye(4, dtype=np.float32)
+# released rows are reset and reused this many at a time
+RESET_BATCH = 256
+
+
+class TransformStore:
+    """
+    The data of every Transform, one row each, in contiguous columns: (N, 3) positions and
+    scales, (N, 4) rotations and (N, 4, 4) matrices, for the local and world transforms, and
+    the world transforms as they were when the last simulation tick started (`previous_*`,
+    see SimulationSystem). `bounds_minimums` / `bounds_maximums` are the world-space boxes
+    around what is drawn with each transform's matrix, empty (inf / -inf) for rows nothing is
+    drawn with (see BoundsSystem).
+    Batched kernels can work on whole columns (or the rows of some transforms, see `rows()`);
+    Transform and its `local` / `world` hand out views into single rows.
+
+    Columns are reallocated as the store grows, so arrays taken from them must not be kept
+    around: copy what needs to outlive the frame. Rows of Transforms that are garbage collected
+    are reused; TransformDataViews keep their Transform, and so its row, alive.
+
+    Rows can be allocated from any thread. Released rows are queued, since garbage collection
+    can release them on any thread, even one that is allocating, and reset and reused in
+    batches of RESET_BATCH, or when the store would otherwise grow. Writes to the columns are not guarded: systems touching them declare Transform.
+    """
+    __slots__ = (
+        "local_positions", "local_rotations", "local_scales",
+        "world_positions", "world_rotations", "world_scales",
+        "previous_positions", "previous_rotations", "previous_scales",
+        "matrices", "bounds_minimums", "bounds_maximums", "inherits", "_free", "_released", "_lock", "size"
+    )
+
+    def __init__(self, capacity: int = 1024):
+        self.local_positions = np.zeros((0, 3), dtype=np.float32)
+        self.local_rotations = np.zeros((0, 4), dtype=np.float32)
+        self.local_scales = np.zeros((0, 3), dtype=np.float32)
+        self.world_positions = np.zeros((0, 3), dtype=np.float32)
+        self.world_rotations = np.zeros((0, 4), dtype=np.float32)
+        self.world_scales = np.zeros((0, 3), dtype=np.float32)
+        self.previous_positions = np.zeros((0, 3), dtype=np.float32)
+        self.previous_rotations = np.zeros((0, 4), dtype=np.float32)
+        self.previous_scales = np.zeros((0, 3), dtype=np.float32)
+        self.matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.bounds_minimums = np.zeros((0, 3), dtype=np.float32)
+        self.bounds_maximums = np.zeros((0, 3), dtype=np.float32)
+        self.inherits = np.zeros(0, dtype=np.bool_)
+        # freed rows, already identity transforms, reused before the store grows
+        self._free: List[int] = []
+        # released since the last allocation. appending to a deque needs no lock
+        self._released: deque[int] = deque()
+        self._lock = threading.Lock()
+        # rows ever handed out: everything past this is unused
+        self.size = 0
+        self._grow(capacity)
+
+    def __len__(self) -> int:
+        return self.size - len(self._free) - len(self._released)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.inherits)
+
+    def _grow(self, capacity: int) -> None:
+        old = self.capacity
+        for name in (
+            "local_positions", "local_rotations", "local_scales", "world_positions", "world_rotations", "world_scales",
+            "previous_positions", "previous_rotations", "previous_scales", "matrices",
+            "bounds_minimums", "bounds_maximums", "inherits"
+        ):
+            column = getattr(self, name)
+            grown = np.empty((capacity, *column.shape[1:]), dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        self._reset(slice(old, capacity))
+
+    def _reset(self, rows: Any) -> None:
+        # identity transforms
+        self.local_positions[rows] = 0.0
+        self.local_rotations[rows] = _IDENTITY_ROTATION
+        self.local_scales[rows] = 1.0
+        self.world_positions[rows] = 0.0
+        self.world_rotations[rows] = _IDENTITY_ROTATION
+        self.world_scales[rows] = 1.0
+        self.previous_positions[rows] = 0.0
+        self.previous_rotations[rows] = _IDENTITY_ROTATION
+        self.previous_scales[rows] = 1.0
+        self.matrices[rows] = _IDENTITY_MATRIX
+        self.bounds_minimums[rows] = np.inf
+        self.bounds_maximums[rows] = -np.inf
+        self.inherits[rows] = True
+
+    def _reuse_released(self) -> None:
+        # resets released rows all at once and frees them: one row at a time, the column writes
+        # cost several times the rest of an allocation
+        released = []
+        while self._released:
+            released.append(self._released.popleft())
+        if released:
+            self._reset(np.array(released, dtype=np.int64))
+            self._free += released
+
+    def allocate(self, count: int = 1) -> List[int]:
+        """
+        Hands out `count` rows set to identity transforms.
+        """
+        with self._lock:
+            # released rows wait for a batch, or for the store to run out of rows
+            if len(self._released) >= RESET_BATCH or self.size + count - len(self._free) > self.capacity:
+                self._reuse_released()
+            reused = self._free[len(self._free) - min(count, len(self._free)):]
+            del self._free[len(self._free) - len(reused):]
+            fresh = count - len(reused)
+            if self.size + fresh > self.capacity:
+                self._grow(max(self.size + fresh, 2 * self.capacity))
+            rows = reused + list(range(self.size, self.size + fresh))
+            self.size += fresh
+            return rows
+
+    def release(self, row: int) -> None:
+        self._released.append(row)
+
+    @staticmethod
+    def rows(transforms: Iterable["Transform"]) -> npt.NDArray[np.int64]:
+        """
+        The rows of `transforms`, for indexing the columns.
+        """
+        return np.fromiter((t.row for t in transforms), dtype=np.int64)
+
+
+TRANSFORMS = TransformStore()
+
+
+class TransformDataView:
+    """
+    The local or world part of a Transform, with the same fields as TransformData. Reading a
+    field gives a view into the store, so it can be modified in place; assigning copies in.
+    Holds the Transform, so its row isn't reused while the view is around.
+    """
+    __slots__ = ("_transform", "_world")
+
+    def __init__(self, transform: "Transform", world: bool):
+        self._transform = transform
+        self._world = world
+
+    @property
+    def _row(self) -> int:
+        return self._transform.row
+
+    @property
+    def position(self) -> npt.NDArray[np.float32]:
+        return (TRANSFORMS.world_positions if self._world else TRANSFORMS.local_positions)[self._row]
+
+    @position.setter
+    def position(self, value: npt.ArrayLike) -> None:
+        (TRANSFORMS.world_positions if self._world else TRANSFORMS.local_positions)[self._row] = value
+
+    @property
+    def rotation(self) -> npt.NDArray[np.float32]:
+        return (TRANSFORMS.world_rotations if self._world else TRANSFORMS.local_rotations)[self._row]
+
+    @rotation.setter
+    def rotation(self, value: npt.ArrayLike) -> None:
+        (TRANSFORMS.world_rotations if self._world else TRANSFORMS.local_rotations)[self._row] = value
+
+    @property
+    def scale(self) -> npt.NDArray[np.float32]:
+        return (TRANSFORMS.world_scales if self._world else TRANSFORMS.local_scales)[self._row]
+
+    @scale.setter
+    def scale(self, value: npt.ArrayLike) -> None:
+        (TRANSFORMS.world_scales if self._world else TRANSFORMS.local_scales)[self._row] = value
+
+    def set(self, data: "TransformData | TransformDataView") -> None:
+        self.position = data.position
+        self.rotation = data.rotation
+        self.scale = data.scale
+
+    def __repr__(self) -> str:
+        return f"TransformDataView(position={self.position!r}, rotation={self.rotation!r}, scale={self.scale!r})"
+
 
-@dataclass(slots=True, eq=False)
 class Transform:
-    local: TransformData = field(default_factory=lambda: TransformData(
-        position=vec3(0.0, 0.0, 0.0),
-        rotation=quaternion_identity(),
-        scale=vec3(1.0, 1.0, 1.0)
-    ))
+    """
+    A handle to one row of TRANSFORMS. Same fields as before the store existed: `local` and
+    `world` are TransformDataViews, `matrix_cache` a view of the row's matrix.
+    """
+    __slots__ = ("row", "__weakref__")
+
+    def __init__(
+        self, local: TransformData | None = None, world: TransformData | None = None,
+        inherit: bool = True, matrix_cache: npt.NDArray[np.float32] | None = None
+    ):
+        (self.row, ) = TRANSFORMS.allocate()
+        if local is not None:
+            self.local.set(local)
+        if world is not None:
+            self.world.set(world)
+        if not inherit:
+            TRANSFORMS.inherits[self.row] = False
+        if matrix_cache is not None:
+            TRANSFORMS.matrices[self.row] = matrix_cache
+
+    @classmethod
+    def _from_rows(cls, rows: Sequence[int]) -> List["Transform"]:
+        # skips __init__, for rows that were just allocated and filled in
+        transforms = []
+        for row in rows:
+            transform = cls.__new__(cls)
+            transform.row = row
+            transforms.append(transform)
+        return transforms
+
+    def __del__(self):
+        try:
+            TRANSFORMS.release(self.row)
+        except (AttributeError, NameError, TypeError):
+            # half constructed, or the module is being torn down
+            pass
+
+    @property
+    def local(self) -> TransformDataView:
+        # made on every access: a view kept in the Transform would keep it alive through the cycle
+        return TransformDataView(self, False)
+
+    @local.setter
+    def local(self, value: "TransformData | TransformDataView") -> None:
+        TransformDataView(self, False).set(value)
+
+    @property
+    def world(self) -> TransformDataView:
+        return TransformDataView(self, True)
+
+    @world.setter
+    def world(self, value: "TransformData | TransformDataView") -> None:
+        TransformDataView(self, True).set(value)
+
+    @property
+    def inherit(self) -> bool:
+        return bool(TRANSFORMS.inherits[self.row])
+
+    @inherit.setter
+    def inherit(self, value: bool) -> None:
+        TRANSFORMS.inherits[self.row] = value
+
+    @property
+    def matrix_cache(self) -> npt.NDArray[np.float32]:
+        return TRANSFORMS.matrices[self.row]
+
+    @matrix_cache.setter
+    def matrix_cache(self, value: npt.ArrayLike) -> None:
+        TRANSFORMS.matrices[self.row] = value
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "Transform":
+        copied = Transform(self.local, self.world, self.inherit, self.matrix_cache)  # type: ignore
+        memo[id(self)] = copied
+        return copied
+
+    def __repr__(self) -> str:
+        return f"Transform(local={self.local!r}, world={self.world!r}, inherit={self.inherit})"
+
+    # == snapshots ==
+
+    @staticmethod
+    def to_columns(transforms: Sequence["Transform"]) -> Dict[str, npt.NDArray[Any]]:
+        rows = TransformStore.rows(transforms)
+        return {
+            "local_positions": TRANSFORMS.local_positions[rows], "local_rotations": TRANSFORMS.local_rotations[rows],
+            "local_scales": TRANSFORMS.local_scales[rows], "world_positions": TRANSFORMS.world_positions[rows],
+            "world_rotations": TRANSFORMS.world_rotations[rows], "world_scales": TRANSFORMS.world_scales[rows],
+            "matrices": TRANSFORMS.matrices[rows], "inherits": TRANSFORMS.inherits[rows],
+        }
 
-    world: TransformData = field(default_factory=lambda: TransformData(
-        position=vec3(0.0, 0.0, 0.0),
-        rotation=quaternion_identity(),
-        scale=vec3(1.0, 1.0, 1.0)
-    ))
+    @staticmethod
+    def from_columns(columns: Dict[str, npt.NDArray[Any]]) -> List["Transform"]:
+        count = len(columns["inherits"])
+        rows = TRANSFORMS.allocate(count)
+        for name, values in columns.items():
+            getattr(TRANSFORMS, name)[rows] = values
+        return Transform._from_rows(rows)
 
-    inherit: bool = True
 
-    matrix_cache: npt.NDArray[np.float32] = field(default_factory=lambda: np.eye(4, dtype=np.float32))
+def transforms_from_arrays(
+    positions: npt.NDArray[np.float32],
+    scales: npt.NDArray[np.float32] | None = None,
+    rotations: npt.NDArray[np.float32] | None = None,
+) -> list[Transform]:
+    """
+    Builds one Transform per row of `positions` (N, 3), with optional `scales` (N, 3)
+    and `rotations` (N, 4), filling the store's columns in one go.
+    """
+    count = len(positions)
+    rows = TRANSFORMS.allocate(count)
+    TRANSFORMS.local_positions[rows] = np.asarray(positions, dtype=np.float32).reshape(count, 3)
+    if scales is not None:
+        TRANSFORMS.local_scales[rows] = np.asarray(scales, dtype=np.float32).reshape(count, 3)
+    if rotations is not None:
+        TRANSFORMS.local_rotations[rows] = np.asarray(rotations, dtype=np.float32).reshape(count, 4)
+    return Transform._from_rows(rows)
@@ -72,6 +72,7 @@ class MeshResult:
     vertices: npt.NDArray[np.float32] | None = None
     indices: npt.NDArray[np.uint32] | None = None
     error: Exception | None = None
+    bounds: "MeshBounds | None" = None
 
 
 @dataclass(slots=True)
@@ -89,6 +90,16 @@ AssetResult = Union[ModelResult, MeshResult, TextureResult]
 # == asset types ==
 
 
+@dataclass(slots=True, eq=False)
+class MeshBounds:
+    # axis-aligned box around the vertex positions, in model space
+    minimum: npt.NDArray[np.float32]
+    maximum: npt.NDArray[np.float32]
+    # sphere around them, centered on the box
+    center: npt.NDArray[np.float32]
+    radius: float
+
+
 @dataclass(slots=True, eq=False)
 class Mesh:
     id: int
@@ -100,6 +111,8 @@ class Mesh:
     vertex_count: int = 0
     indices_count: int = 0
     has_indices: bool = False
+    # None until the vertex data is processed, and for meshes without vertices
+    bounds: MeshBounds | None = None
 
 
 @dataclass(slots=True, eq=False)
@@ -161,3 +174,30 @@ class AssetsState:
 
     task_queue: queue.Queue[AssetTask] = field(default_factory=queue.Queue)
     result_queue: queue.Queue[AssetResult] = field(default_factory=queue.Queue)
+
+    # source data of meshes made by create_immediate_mesh, so snapshots can store them
+    immediate_mesh_data: dict[int, tuple[npt.NDArray[np.float32], npt.NDArray[np.uint32]]] = field(default_factory=dict)
+    # assets that stand in for a node of a model that has not loaded yet, keyed by model id.
+    # each entry is (node index, field of the node, placeholder Mesh or Texture).
+    pending_model_bindings: dict[int, list[tuple[int, str, "Mesh | Texture"]]] = field(default_factory=dict)
+
+    # == reference counting ==
+    # live references to each mesh / texture: one per Visuals or Material using it, plus
+    # explicit retains. assets whose count drops to zero are freed on the next update.
+    ref_counts: dict["Mesh | Texture", int] = field(default_factory=dict)
+    unreferenced: list["Mesh | Texture"] = field(default_factory=list)
+    # what each attached Visuals / Material was counted as holding, so references are
+    # dropped exactly as they were taken even if the fields were reassigned in between
+    visuals_holds: dict[object, tuple[Mesh, object]] = field(default_factory=dict)
+    material_holds: dict[object, tuple[int, tuple[Texture, ...]]] = field(default_factory=dict)
+    # ids of assets freed before their upload finished; their results are dropped
+    freed_ids: set[int] = field(default_factory=set)
+
+    # == deferred uploads ==
+    # with defer_uploads set, processed results are kept here as CPU arrays instead of being
+    # uploaded, for processes without a GL context (see engine/forked_capture.py). the
+    # assets stay Loading until AssetSystem.upload_deferred() runs with a context current.
+    defer_uploads: bool = False
+    deferred_meshes: dict[int, tuple[npt.NDArray[np.float32], npt.NDArray[np.uint32] | None]] = field(default_factory=dict)
+    # texel data and its format ("RGB", "RGBA" or "L")
+    deferred_textures: dict[int, tuple[npt.NDArray[np.uint8], str]] = field(default_factory=dict)
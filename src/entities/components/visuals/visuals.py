@@ -14,7 +14,6 @@ class DrawMode(Enum):
 class Visuals:
     mesh: Mesh
     material: Material
-    enabled: bool = True
     draw_mode: DrawMode = DrawMode.Normal
 
     # == non-editable properties ==
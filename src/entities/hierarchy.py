@@ -0,0 +1,256 @@
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+
+class HierarchyIndex:
+    """
+    Every entity in depth-first order, parents before their children, so the descendants of
+    the entity at position `p` are exactly positions `p + 1 .. ends[p] - 1`.
+
+    Registry keeps this up to date lazily: parent changes only mark entities dirty, and the
+    next read cuts the old subtrees of dirty entities out of the order and splices their
+    current subtrees back in under their new parents. Entries before the first change are
+    left as they are, apart from the ends of the changed subtrees' ancestors; the rest only
+    shift, so their positions and ends move by array operations and their depths carry over.
+    Only the spliced entities are walked.
+    """
+    __slots__ = ("entities", "parent_entities", "parents", "depths", "ends", "_positions", "_index_mask", "_levels")
+
+    def __init__(self, index_mask: int):
+        self._index_mask = index_mask
+
+        # entity handles in depth-first order
+        self.entities: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        # handle of each entry's parent, 0 for roots (0 is never a live handle)
+        self.parent_entities: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        # position of each entry's parent, -1 for roots
+        self.parents: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        self.depths: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        # exclusive end of each entry's subtree
+        self.ends: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+
+        # position of every entity, indexed by slot
+        self._positions: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        self._levels: List[npt.NDArray[np.int64]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    # == queries ==
+
+    def position(self, entity: int) -> int:
+        """
+        Position of `entity` in depth-first order, or -1 if it isn't alive.
+        """
+        slot = entity & self._index_mask
+        if slot >= len(self._positions):
+            return -1
+        position = int(self._positions[slot])
+        if position < 0 or self.entities[position] != entity:
+            return -1
+        return position
+
+    def _positions_of(self, entities: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        slots = entities & self._index_mask
+        in_range = slots < len(self._positions)
+        positions = np.full(len(entities), -1, dtype=np.int64)
+        positions[in_range] = self._positions[slots[in_range]]
+        found = positions >= 0
+        found[found] = self.entities[positions[found]] == entities[found]
+        positions[~found] = -1
+        return positions
+
+    def subtree(self, entity: int) -> npt.NDArray[np.int64]:
+        """
+        `entity` followed by all of its descendants, parents before children.
+        """
+        position = self.position(entity)
+        if position < 0:
+            return self.entities[:0]
+        return self.entities[position:self.ends[position]]
+
+    def descendants(self, entity: int) -> npt.NDArray[np.int64]:
+        return self.subtree(entity)[1:]
+
+    def levels(self) -> List[npt.NDArray[np.int64]]:
+        """
+        Positions grouped by depth, roots first. Every entry's parent is in the previous level,
+        so anything that flows down the hierarchy can be processed one level at a time.
+        """
+        if self._levels is None:
+            order = np.argsort(self.depths, kind="stable")
+            counts = np.bincount(self.depths) if len(self.depths) else np.empty(0, dtype=np.int64)
+            self._levels = np.split(order, np.cumsum(counts)[:-1]) if len(counts) else []
+        return self._levels
+
+    # == maintenance ==
+
+    def update(self, dirty: Iterable[int], parents: Dict[int, int], children: Dict[int, Set[int]]) -> None:
+        """
+        Brings the index up to date after the entities in `dirty` were created, removed or
+        reparented. `parents` and `children` are the registry's links; an entity is alive
+        when it has an entry in `children`.
+        """
+        dirty = set(dirty)
+        if not dirty:
+            return
+        count = len(self.entities)
+
+        # == the old subtrees of dirty entities, as ranges of positions ==
+        positions = self._positions_of(np.fromiter(dirty, dtype=np.int64, count=len(dirty)))
+        starts: List[int] = []
+        stops: List[int] = []
+        # starts of ranges with other dirty entities in them
+        nested: Set[int] = set()
+        for position in np.sort(positions[positions >= 0]).tolist():
+            if not stops or position >= stops[-1]:
+                starts.append(position)
+                stops.append(int(self.ends[position]))
+            else:
+                nested.add(starts[-1])
+        # entries removed before each range
+        removed_before = list(accumulate((stop - start for start, stop in zip(starts, stops)), initial=0))
+
+        # old position -> change in subtree size, for the ancestors of what is removed and inserted
+        resized: Dict[int, int] = {}
+        for start, stop in zip(starts, stops):
+            self._resize_ancestors(resized, int(self.parents[start]), start - stop)
+
+        # == the topmost dirty entities that are alive, and the dirty entities above others ==
+        topmost: List[int] = []
+        holding: Set[int] = set()
+        for entity in dirty:
+            if entity not in children:
+                continue
+            is_topmost = True
+            ancestor = parents.get(entity)
+            while ancestor is not None:
+                if ancestor in dirty:
+                    holding.add(ancestor)
+                    is_topmost = False
+                ancestor = parents.get(ancestor)
+            if is_topmost:
+                topmost.append(entity)
+
+        # == their current subtrees, as (entities, parent entities, depths, sizes) per parent ==
+        # anything removed above that is still alive is in one of these, or dirty itself.
+        # subtrees without dirty entities in them, before or now, are copied from the old order
+        range_starts = set(starts)
+        blocks: Dict[int, List[Tuple[npt.NDArray[np.int64], ...]]] = {}
+        walks: Dict[int, Tuple[List[int], List[int], List[int], List[int]]] = {}
+        for entity in topmost:
+            parent = parents.get(entity, 0)
+            depth = int(self.depths[self.position(parent)]) + 1 if parent != 0 else 0
+            position = self.position(entity)
+            if position in range_starts and position not in nested and entity not in holding:
+                end = int(self.ends[position])
+                parent_entities = self.parent_entities[position:end].copy()
+                parent_entities[0] = parent
+                blocks.setdefault(parent, []).append((
+                    self.entities[position:end], parent_entities,
+                    self.depths[position:end] + (depth - int(self.depths[position])),
+                    self.ends[position:end] - np.arange(position, end, dtype=np.int64),
+                ))
+            else:
+                HierarchyIndex._walk(entity, parent, depth, children, walks.setdefault(parent, ([], [], [], [])))
+        for parent, walked in walks.items():
+            blocks.setdefault(parent, []).append(HierarchyIndex._walked_block(*walked))
+
+        if not starts and not blocks:
+            return
+
+        # == where each parent's blocks go: after its subtree, once the ranges are gone ==
+        # a parent's subtree can end where its own parent's does: the deeper one goes first
+        spots = []
+        for parent, parent_blocks in blocks.items():
+            position = self.position(parent) if parent != 0 else -1
+            if position >= 0:
+                at = int(self.ends[position]) + resized.get(position, 0) - removed_before[bisect_left(starts, position)]
+            else:
+                at = count - removed_before[-1]
+            spots.append((at, -int(parent_blocks[0][2][0]), parent, position))
+        spots.sort()
+        pieces = [piece for _, _, parent, _ in spots for piece in blocks[parent]]
+        for _, _, parent, position in spots:
+            self._resize_ancestors(resized, position, sum(len(piece[0]) for piece in blocks[parent]))
+
+        # == rebuild what follows the first change, keep what comes before ==
+        first = min(starts[0] if starts else count, spots[0][0] if spots else count)
+        sizes = self.ends[first:] - np.arange(first, count, dtype=np.int64)
+        ends = self.ends[:first].copy()
+        for position, change in resized.items():
+            if position < first:
+                ends[position] += change
+            else:
+                sizes[position - first] += change
+        keep = np.ones(count - first, dtype=np.bool_)
+        for start, stop in zip(starts, stops):
+            keep[start - first:stop - first] = False
+        removed_slots = self.entities[first:][~keep] & self._index_mask
+
+        insert_at = np.repeat(
+            np.array([at - first for at, _, _, _ in spots], dtype=np.int64),
+            [sum(len(piece[0]) for piece in blocks[parent]) for _, _, parent, _ in spots],
+        )
+        inserted = [np.concatenate([piece[i] for piece in pieces]) if pieces else np.empty(0, dtype=np.int64) for i in range(4)]
+        tail = np.insert(self.entities[first:][keep], insert_at, inserted[0])
+        tail_parent_entities = np.insert(self.parent_entities[first:][keep], insert_at, inserted[1])
+        tail_positions = np.arange(first, first + len(tail), dtype=np.int64)
+        self.entities = np.concatenate((self.entities[:first], tail))
+        self.parent_entities = np.concatenate((self.parent_entities[:first], tail_parent_entities))
+        self.depths = np.concatenate((self.depths[:first], np.insert(self.depths[first:][keep], insert_at, inserted[2])))
+        self.ends = np.concatenate((ends, tail_positions + np.insert(sizes[keep], insert_at, inserted[3])))
+        self._levels = None
+
+        # positions by slot, for the removed entries and everything after the first change
+        self._positions[removed_slots] = -1
+        tail_slots = tail & self._index_mask
+        capacity = int(tail_slots.max()) + 1 if len(tail) else 0
+        if len(self._positions) < capacity:
+            grown = np.full(max(capacity, 2 * len(self._positions)), -1, dtype=np.int64)
+            grown[:len(self._positions)] = self._positions
+            self._positions = grown
+        self._positions[tail_slots] = tail_positions
+
+        is_child = tail_parent_entities != 0
+        tail_parents = np.full(len(tail), -1, dtype=np.int64)
+        tail_parents[is_child] = self._positions[tail_parent_entities[is_child] & self._index_mask]
+        self.parents = np.concatenate((self.parents[:first], tail_parents))
+
+    @staticmethod
+    def _walk(
+        entity: int, parent: int, depth: int, children: Dict[int, Set[int]],
+        walked: Tuple[List[int], List[int], List[int], List[int]]
+    ) -> None:
+        # appends the current subtree of `entity`, depth first, to the entities, parent entities,
+        # depths and owners in `walked`. owners are the index of each entry's parent, -1 for `entity`
+        entities, parent_entities, depths, owners = walked
+        stack = [(entity, parent, depth, -1)]
+        while stack:
+            current, current_parent, current_depth, owner = stack.pop()
+            stack.extend((child, current, current_depth + 1, len(entities)) for child in children[current])
+            entities.append(current)
+            parent_entities.append(current_parent)
+            depths.append(current_depth)
+            owners.append(owner)
+
+    @staticmethod
+    def _walked_block(
+        entities: List[int], parent_entities: List[int], depths: List[int], owners: List[int]
+    ) -> Tuple[npt.NDArray[np.int64], ...]:
+        sizes = [1] * len(entities)
+        for i in range(len(entities) - 1, -1, -1):
+            if owners[i] >= 0:
+                sizes[owners[i]] += sizes[i]
+        return tuple(np.array(column, dtype=np.int64) for column in (entities, parent_entities, depths, sizes))
+
+    def _resize_ancestors(self, resized: Dict[int, int], position: int, change: int) -> None:
+        # `position` and its ancestors, by old position
+        parents = self.parents
+        while position >= 0:
+            resized[position] = resized.get(position, 0) + change
+            position = int(parents[position])
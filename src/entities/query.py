@@ -0,0 +1,56 @@
+from typing import Any, FrozenSet, Iterable, Tuple, Type
+
+
+class Query:
+    """
+    Describes a view by component types alone: entities with all of `comp_types` (which are
+    returned) and all of `with_`, none of `without`, and at least one of `any_of` (which are
+    not). Every condition is decided per archetype, so the registry caches which tables match
+    and keeps that up to date as tables are created; iterating never visits an entity that
+    would be filtered out.
+
+    Queries with the same conditions are equal and share one cache entry, but building one
+    per frame still costs a little: systems keep theirs around.
+    """
+    __slots__ = ("comp_types", "with_", "without", "any_of", "required", "_key")
+
+    def __init__(
+        self, *comp_types: Type[Any],
+        with_: Iterable[Type[Any]] = (), without: Iterable[Type[Any]] = (), any_of: Iterable[Type[Any]] = ()
+    ) -> None:
+        self.comp_types: Tuple[Type[Any], ...] = comp_types
+        self.with_: FrozenSet[Type[Any]] = frozenset(with_)
+        self.without: FrozenSet[Type[Any]] = frozenset(without)
+        self.any_of: FrozenSet[Type[Any]] = frozenset(any_of)
+        self.required: FrozenSet[Type[Any]] = frozenset(comp_types) | self.with_
+        if not self.required and not self.any_of:
+            raise ValueError("A query needs at least one component type an entity must have")
+        if not self.required.isdisjoint(self.without):
+            raise ValueError(f"Query both requires and excludes {set(self.required & self.without)}")
+        self._key = (comp_types, self.with_, self.without, self.any_of)
+
+    def matches(self, types: FrozenSet[Type[Any]]) -> bool:
+        return self.required <= types and self.without.isdisjoint(types) \
+            and (not self.any_of or not self.any_of.isdisjoint(types))
+
+    def index_types(self) -> Iterable[Type[Any]]:
+        """
+        Types of which every matching archetype has at least one.
+        """
+        if self.required:
+            return (next(iter(self.required)), )
+        return self.any_of
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Query) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __repr__(self) -> str:
+        parts = [t.__name__ for t in self.comp_types]
+        for name in ("with_", "without", "any_of"):
+            types = getattr(self, name)
+            if types:
+                parts.append(f"{name}=({', '.join(sorted(t.__name__ for t in types))})")
+        return f"Query({', '.join(parts)})"
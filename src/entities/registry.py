@@ -1,4 +1,19 @@
-from typing import Any, Dict, Set, Type, TypeVar, Tuple, Iterator, overload
+import gc
+import threading
+from collections import deque
+from itertools import groupby
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, FrozenSet, Generic, Hashable, Iterable, List, Sequence, Set, Type, TypeVar, Tuple, Iterator, overload
+
+import numpy as np
+import numpy.typing as npt
+
+from entities.archetype import Archetype
+from entities.components.disabled import Disabled
+from entities.hierarchy import HierarchyIndex
+from entities.query import Query
+from entities.tags import TagIndex
 
 T = TypeVar("T")
 T1 = TypeVar("T1")
@@ -7,80 +22,694 @@ T3 = TypeVar("T3")
 T4 = TypeVar("T4")
 T5 = TypeVar("T5")
 
+ComponentTypes = Tuple[Type[Any], ...]
+# observer hooks get the registry and a batch of (entity, component) for "add" / "remove",
+# or (entity, old, new) for "replace"
+ObserverHook = Callable[["Registry", List[Tuple[Any, ...]]], None]
+OBSERVER_EVENTS = ("add", "remove", "replace")
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """
+    Pauses the cyclic garbage collector while building lots of long-lived objects, e.g. the
+    components of a batch of entities. Otherwise it keeps rescanning them as they pile up,
+    which costs more than creating them.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+# entity handles pack a slot index and a generation counter into 32 bits, so they still fit
+# the uint32 segmentation buffer. slot 0 is never handed out, so handle 0 always means "no entity".
+ENTITY_INDEX_BITS = 22
+ENTITY_INDEX_MASK = (1 << ENTITY_INDEX_BITS) - 1
+ENTITY_GENERATION_MASK = (1 << (32 - ENTITY_INDEX_BITS)) - 1
+# freed slots are only reused once this many are queued. generations are 10 bits and wrap,
+# so spreading reuse over more slots keeps an old handle stale for many more cycles.
+MIN_FREE_SLOTS = 1024
+# views look entities up in the change journals only while the journals hold at most one entry
+# per this many rows of the matching archetypes. past that, looking every candidate up costs
+# more than scanning the tick columns.
+JOURNAL_SCAN_RATIO = 8
+
+
+def entity_index(entity: int) -> int:
+    return entity & ENTITY_INDEX_MASK
+
+
+def entity_generation(entity: int) -> int:
+    return entity >> ENTITY_INDEX_BITS
+
+
+class ComponentMapping(Mapping[int, T], Generic[T]):
+    """
+    Read-only entity -> component mapping for a single component type,
+    backed directly by the archetype tables that contain it.
+    """
+    __slots__ = ("_registry", "_comp_type")
+
+    def __init__(self, registry: "Registry", comp_type: Type[T]) -> None:
+        self._registry = registry
+        self._comp_type = comp_type
+
+    def __getitem__(self, entity: int) -> T:
+        location = self._registry._location(entity)
+        if location is None:
+            raise KeyError(entity)
+        archetype, row = location
+        column = archetype.columns.get(self._comp_type)
+        if column is None:
+            raise KeyError(entity)
+        return column[row]
+
+    def __contains__(self, entity: object) -> bool:
+        if not isinstance(entity, int):
+            return False
+        location = self._registry._location(entity)
+        return location is not None and self._comp_type in location[0].types
+
+    def __iter__(self) -> Iterator[int]:
+        for archetype in tuple(self._registry._get_or_build_cache((self._comp_type, ))):
+            yield from archetype.entities
+
+    def __len__(self) -> int:
+        return sum(len(archetype) for archetype in self._registry._get_or_build_cache((self._comp_type, )))
+
+    def items(self) -> Iterator[Tuple[int, T]]:  # type: ignore
+        for archetype in tuple(self._registry._get_or_build_cache((self._comp_type, ))):
+            yield from zip(archetype.entities, archetype.columns[self._comp_type])
+
+    def values(self) -> Iterator[T]:  # type: ignore
+        for archetype in tuple(self._registry._get_or_build_cache((self._comp_type, ))):
+            yield from archetype.columns[self._comp_type]
+
 
 class Registry:
     def __init__(self) -> None:
-        self._next_id: int = 0
-        self._components: Dict[Type[Any], Dict[int, Any]] = {}
-        self._entity_components: Dict[int, Dict[Type[Any], Any]] = {}
+        # entities with the same component set share one archetype table, whose columns are
+        # the packed component pools. the sparse side is indexed by entity slot:
+        # _locations holds (archetype, row) for live slots and _generations the current
+        # generation of every slot, so handles to a recycled slot are detected as stale.
+        self._archetypes: Dict[FrozenSet[Type[Any]], Archetype] = {}
+        self._locations: List[Tuple[Archetype, int] | None] = [None]
+        self._generations: List[int] = [0]
+        # freed slots are reused oldest first, see MIN_FREE_SLOTS
+        self._free_slots: deque[int] = deque()
+        # handles may be reserved from worker threads, see reserve_entities()
+        self._allocation_lock = threading.Lock()
+        self._query_cache_lock = threading.Lock()
 
         self._parents: Dict[int, int] = {}
         self._children: Dict[int, Set[int]] = {}
+        # depth-first index over the links above, caught up on read from the entities whose
+        # links changed since. see hierarchy()
+        self._hierarchy = HierarchyIndex(ENTITY_INDEX_MASK)
+        self._hierarchy_dirty: Set[int] = set()
+        self._hierarchy_lock = threading.Lock()
+        # scoped views: root -> (types, whole subtree?) -> the root's children / descendants
+        # that have those types. a root's entries are dropped whenever anything below it is
+        # created, removed, reparented or changes archetype. see view_children()
+        self._scoped_views: Dict[int, Dict[Tuple[ComponentTypes, bool], List[int]]] = {}
+
+        # query -> list of archetypes matching it. plain views are keyed by their tuple of
+        # types, filtered ones by their Query
+        self._query_cache: Dict[Tuple[Type[Any], ...] | Query, List[Archetype]] = {}
+        # inverted index: component type -> cached queries keyed on it. every query is filed
+        # under one type only, since an archetype without that type can never match it
+        # (queries with just any_of= are filed under each of those).
+        self._queries_by_type: Dict[Type[Any], List[Tuple[Type[Any], ...] | Query]] = {}
+
+        # change detection: components are stamped with the tick they were added / last marked
+        # changed at. tracked systems run inside change_scope(), which remembers their last tick.
+        self._tick: int = 1
+        self._last_run_ticks: Dict[Hashable, int] = {}
+        # change journals of the types passed to track_changes(): every entity whose component
+        # was added or changed after the journal's floor tick, with the latest such tick. views
+        # filtering on journaled types look up these entities instead of scanning every tick.
+        self._journals: Dict[Type[Any], Dict[int, int]] = {}
+        self._journal_floors: Dict[Type[Any], int] = {}
+
+        # observers: component type -> event -> hooks. events are queued per observed type as
+        # they happen and handed to the hooks in batches by flush_observers().
+        self._observers: Dict[Type[Any], Dict[str, List[ObserverHook]]] = {}
+        self._observer_events: Dict[Type[Any], List[Tuple[Any, ...]]] = {}
 
-        self._query_cache: Dict[Tuple[Type[Any], ...], Set[int]] = {}
+        # resources: one instance per type, either standalone or living as a component
+        # on some entity (the admin entity pattern). the owner of the latter is cached
+        # and revalidated on lookup, so repeated lookups don't scan any query.
+        self._resources: Dict[Type[Any], Any] = {}
+        self._resource_owners: Dict[Type[Any], int] = {}
+
+        # per-slot bitset of the tag types passed to track_tags(), derived from archetypes
+        self._tags = TagIndex()
+
+        self._empty_archetype = self._get_or_create_archetype(frozenset())
 
         self._empty_set: Set[int] = frozenset()  # type: ignore
 
+    def _get_or_create_archetype(self, types: FrozenSet[Type[Any]], order: Iterable[Type[Any]] = ()) -> Archetype:
+        archetype = self._archetypes.get(types)
+        if archetype is not None:
+            return archetype
+
+        archetype = Archetype(types, order)
+        archetype.tag_bits = self._tags.bits_of(types)
+        self._archetypes[types] = archetype
+
+        query_cache = self._query_cache
+        for comp_type in types:
+            for key in self._queries_by_type.get(comp_type, ()):
+                if type(key) is tuple:
+                    if types.issuperset(key):
+                        query_cache[key].append(archetype)
+                elif key.matches(types):  # type: ignore
+                    matches = query_cache[key]
+                    if archetype not in matches:
+                        matches.append(archetype)
+
+        return archetype
+
+    def _location(self, entity: int) -> Tuple[Archetype, int] | None:
+        index = entity & ENTITY_INDEX_MASK
+        if index < len(self._generations) and self._generations[index] == entity >> ENTITY_INDEX_BITS:
+            return self._locations[index]
+        return None
+
+    def _move_entity(self, entity: int, source: Archetype, row: int, target: Archetype, components: Dict[Type[Any], Any]) -> None:
+        new_row = target.append(entity, components, self._tick, source, row)
+        moved = source.swap_remove(row)
+        if moved is not None:
+            self._locations[moved & ENTITY_INDEX_MASK] = (source, row)
+        self._locations[entity & ENTITY_INDEX_MASK] = (target, new_row)
+        if target.tag_bits != source.tag_bits:
+            self._tags.set(entity & ENTITY_INDEX_MASK, entity, target.tag_bits)
+        if self._scoped_views:
+            self._drop_scoped_views(entity)
+
+    def _allocate_handle(self) -> int:
+        with self._allocation_lock:
+            if len(self._free_slots) > MIN_FREE_SLOTS:
+                index = self._free_slots.popleft()
+            else:
+                index = len(self._generations)
+                if index > ENTITY_INDEX_MASK:
+                    raise RuntimeError(f"Registry is out of entity slots ({ENTITY_INDEX_MASK} live entities)")
+                self._generations.append(0)
+                self._locations.append(None)
+            return (self._generations[index] << ENTITY_INDEX_BITS) | index
+
+    def _allocate_handles(self, count: int) -> List[int]:
+        with self._allocation_lock:
+            return self._allocate_handles_locked(count)
+
+    def _allocate_handles_locked(self, count: int) -> List[int]:
+        reused = min(count, max(0, len(self._free_slots) - MIN_FREE_SLOTS))
+        fresh = count - reused
+        generations = self._generations
+        start = len(generations)
+        if start + fresh - 1 > ENTITY_INDEX_MASK:
+            raise RuntimeError(f"Registry is out of entity slots ({ENTITY_INDEX_MASK} live entities)")
+
+        handles = [(generations[index] << ENTITY_INDEX_BITS) | index for index in (self._free_slots.popleft() for _ in range(reused))]
+        generations.extend([0] * fresh)
+        self._locations.extend([None] * fresh)
+        handles.extend(range(start, start + fresh))
+        return handles
+
     def create_entity(self) -> int:
-        entity = self._next_id
-        self._next_id += 1
-        self._entity_components[entity] = {}
+        entity = self._allocate_handle()
+        self._locations[entity & ENTITY_INDEX_MASK] = (self._empty_archetype, self._empty_archetype.append(entity, {}, self._tick))
         self._children[entity] = set()
+        self._hierarchy_dirty.add(entity)
         return entity
 
+    def reserve_entities(self, count: int = 1) -> List[int]:
+        """
+        Hands out handles for entities that will be created later, e.g. when a command buffer
+        is applied. Safe to call from any thread. The handles are not alive until passed to
+        create_entities(..., reserved=...).
+        """
+        return self._allocate_handles(count)
+
+    def release_reserved(self, entities: Iterable[int]) -> None:
+        """
+        Gives back reserved handles that will never be created.
+        """
+        with self._allocation_lock:
+            for entity in entities:
+                index = entity & ENTITY_INDEX_MASK
+                if self._generations[index] != entity >> ENTITY_INDEX_BITS or self._locations[index] is not None:
+                    continue
+                self._generations[index] = (self._generations[index] + 1) & ENTITY_GENERATION_MASK
+                self._free_slots.append(index)
+
+    def create_entities(
+        self, count: int, *columns: Sequence[Any] | Callable[[int], Any],
+        parent: int | None = None, reserved: Sequence[int] | None = None
+    ) -> List[int]:
+        """
+        Creates `count` entities at once, straight into the archetype of their component set.
+        Each column is either a sequence of `count` components of one type, or a factory
+        called with the index of each entity. All entities are parented to `parent`, if given.
+        """
+        if parent is not None and self._location(parent) is None:
+            raise ValueError(f"Cannot parent entities to non-existent parent {parent}")
+        if reserved is not None:
+            if len(reserved) != count:
+                raise ValueError(f"{len(reserved)} reserved handles given for {count} entities")
+            for entity in reserved:
+                index = entity & ENTITY_INDEX_MASK
+                if index >= len(self._generations) or self._generations[index] != entity >> ENTITY_INDEX_BITS \
+                        or self._locations[index] is not None:
+                    raise ValueError(f"Entity {entity} is not a pending reserved handle")
+        if count <= 0:
+            return []
+
+        with paused_gc():
+            return self._create_entities(count, columns, parent, reserved)
+
+    def _create_entities(
+        self, count: int, columns: Tuple[Sequence[Any] | Callable[[int], Any], ...],
+        parent: int | None, reserved: Sequence[int] | None
+    ) -> List[int]:
+        column_values: List[List[Any]] = []
+        for column in columns:
+            values = [column(i) for i in range(count)] if callable(column) else list(column)
+            if len(values) != count:
+                raise ValueError(f"Column of {len(values)} components given for {count} entities")
+            column_values.append(values)
+
+        comp_types = [type(values[0]) for values in column_values]
+        types = frozenset(comp_types)
+        if len(types) != len(comp_types):
+            raise ValueError("Each component type can only be given once")
+
+        archetype = self._get_or_create_archetype(types, comp_types)
+        tick = self._tick
+        first_row = len(archetype.entities)
+        entities = list(reserved) if reserved is not None else self._allocate_handles(count)
+
+        archetype.entities.extend(entities)
+        for comp_type, values in zip(comp_types, column_values):
+            archetype.columns[comp_type].extend(values)
+            archetype.added_ticks[comp_type].extend([tick] * count)
+            archetype.changed_ticks[comp_type].extend([tick] * count)
+            if comp_type in self._journals:
+                self._journals[comp_type].update(dict.fromkeys(entities, tick))
+            if comp_type in self._observers:
+                self._observer_events.setdefault(comp_type, []).extend(zip(["add"] * count, entities, values))
+
+        locations = self._locations
+        for row, entity in enumerate(entities, first_row):
+            locations[entity & ENTITY_INDEX_MASK] = (archetype, row)
+            self._children[entity] = set()
+        self._hierarchy_dirty.update(entities)
+        if archetype.tag_bits:
+            self._tags.set_many([entity & ENTITY_INDEX_MASK for entity in entities], entities, archetype.tag_bits)
+
+        if parent is not None:
+            self._parents.update(dict.fromkeys(entities, parent))
+            self._children[parent].update(entities)
+            if self._scoped_views:
+                self._scoped_views.pop(parent, None)
+                self._drop_scoped_views(parent)
+
+        return entities
+
+    def is_alive(self, entity: int) -> bool:
+        """
+        Returns whether the handle refers to a live entity, i.e. it was not removed
+        and its slot has not been recycled since.
+        """
+        return self._location(entity) is not None
+
     # this is entity removal from the perspective of the registry i.e. a bunch of dicts,
     # not logical entity disposal. if used by systems naively, you will get
-    # dangling entity IDs.
+    # dangling entity IDs. those are at least detectable: see is_alive().
     def remove_entity(self, entity: int) -> None:
+        location = self._location(entity)
+        if location is None:
+            return
+
+        if self._scoped_views:
+            self._drop_scoped_views(entity)
+            self._scoped_views.pop(entity, None)
+
         parent = self._parents.pop(entity, None)
         if parent is not None and parent in self._children:
             self._children[parent].discard(entity)
 
         for child in self._children.get(entity, set()):
             self._parents.pop(child, None)
-        self._children.pop(entity, None)
+            self._touch(child)
+        self._hierarchy_dirty.update(self._children.pop(entity, ()))
+        self._hierarchy_dirty.add(entity)
 
-        components = self._entity_components.pop(entity, None)
-        if components is not None:
-            for comp_type in components:
-                self._components[comp_type].pop(entity, None)
+        archetype, row = location
+        if self._observers:
+            for comp_type in archetype.types:
+                if comp_type in self._observers:
+                    self._record(comp_type, ("remove", entity, archetype.columns[comp_type][row]))
+        moved = archetype.swap_remove(row)
+        if moved is not None:
+            self._locations[moved & ENTITY_INDEX_MASK] = (archetype, row)
 
-        for cached_set in self._query_cache.values():
-            cached_set.discard(entity)
+        # bump the generation so every outstanding handle to this slot goes stale
+        index = entity & ENTITY_INDEX_MASK
+        if archetype.tag_bits:
+            self._tags.set(index, 0, 0)
+        self._locations[index] = None
+        self._generations[index] = (self._generations[index] + 1) & ENTITY_GENERATION_MASK
+        self._free_slots.append(index)
 
     def add_components(self, entity: int, *components: Any) -> None:
-        if entity not in self._entity_components:
+        location = self._location(entity)
+        if location is None:
             return
 
-        for c in components:
-            comp_type = type(c)
-            if comp_type not in self._components:
-                self._components[comp_type] = {}
+        archetype, row = location
+        added = {type(c): c for c in components}
+        missing = frozenset(t for t in added if t not in archetype.types)
+        if self._journals:
+            self._journal(added, (entity, ))
+
+        if self._observers:
+            for comp_type, c in added.items():
+                if comp_type in self._observers:
+                    if comp_type in missing:
+                        self._record(comp_type, ("add", entity, c))
+                    else:
+                        self._record(comp_type, ("replace", entity, archetype.columns[comp_type][row], c))
+
+        if not missing:
+            # no structural change, just replace the components in place
+            for comp_type, c in added.items():
+                archetype.columns[comp_type][row] = c
+                archetype.changed_ticks[comp_type][row] = self._tick
+            return
 
-            self._components[comp_type][entity] = c
-            self._entity_components[entity][comp_type] = c
+        target = archetype.add_edges.get(missing)
+        if target is None:
+            target = self._get_or_create_archetype(archetype.types | missing, (*archetype.columns, *added))
+            archetype.add_edges[missing] = target
 
-        entity_comps = self._entity_components[entity]
-        for query_types, cached_set in self._query_cache.items():
-            if entity not in cached_set and all(qt in entity_comps for qt in query_types):
-                cached_set.add(entity)
+        row_components = archetype.row_components(row)
+        row_components.update(added)
+        self._move_entity(entity, archetype, row, target, row_components)
+
+        if len(missing) != len(added):
+            # components that were replaced rather than added count as changed
+            target, new_row = self._locations[entity & ENTITY_INDEX_MASK]  # type: ignore
+            for comp_type in added:
+                if comp_type not in missing:
+                    target.changed_ticks[comp_type][new_row] = self._tick
+
+    def remove_components(self, entity: int, *comp_types: Type[Any]) -> None:
+        """
+        Removes the given component types from an entity. Types it does not have are ignored.
+        """
+        location = self._location(entity)
+        if location is None:
+            return
+
+        archetype, row = location
+        removed = frozenset(t for t in comp_types if t in archetype.types)
+        if not removed:
+            return
+        if self._observers:
+            for comp_type in removed:
+                if comp_type in self._observers:
+                    self._record(comp_type, ("remove", entity, archetype.columns[comp_type][row]))
+
+        target = archetype.remove_edges.get(removed)
+        if target is None:
+            target = self._get_or_create_archetype(
+                archetype.types - removed,
+                (t for t in archetype.columns if t not in removed)
+            )
+            archetype.remove_edges[removed] = target
+
+        row_components = archetype.row_components(row)
+        self._move_entity(entity, archetype, row, target, row_components)
+
+    def restructure_entities(
+        self, entities: Sequence[int], removed: Iterable[Type[Any]] = (),
+        added: Sequence[Dict[Type[Any], Any]] | None = None
+    ) -> None:
+        """
+        Same as remove_components(e, *removed) followed by add_components(e, *added[i].values())
+        for every entities[i], but entities that share an archetype move together in one pass.
+        Every dict in `added` must have the same keys. Dead entities are skipped.
+        """
+        removed_types = frozenset(removed)
+        added_types = tuple(added[0]) if added else ()
+        if added is not None and len(added) != len(entities):
+            raise ValueError(f"{len(added)} component sets given for {len(entities)} entities")
+
+        # == group by source archetype ==
+        groups: Dict[Archetype, List[int]] = {}
+        for i, entity in enumerate(entities):
+            location = self._location(entity)
+            if location is not None:
+                groups.setdefault(location[0], []).append(i)
+
+        tick = self._tick
+        for source, indices in groups.items():
+            dropped = removed_types & source.types
+            target_types = (source.types - dropped).union(added_types)
+            if target_types == source.types and not added_types:
+                continue
+
+            target = self._archetypes.get(target_types)
+            if target is None:
+                target = self._get_or_create_archetype(
+                    target_types, (*(t for t in source.columns if t not in dropped), *added_types)
+                )
+
+            rows = [self._locations[entities[i] & ENTITY_INDEX_MASK][1] for i in indices]  # type: ignore
+            if self._journals:
+                self._journal(added_types, [entities[i] for i in indices])
+            if self._observers:
+                self._record_restructure(source, entities, indices, rows, dropped, added_types, added)
+            if target is source:
+                # only replacements, nothing moves
+                for comp_type in added_types:
+                    column = source.columns[comp_type]
+                    changed_ticks = source.changed_ticks[comp_type]
+                    added_ticks = source.added_ticks[comp_type] if comp_type in dropped else None
+                    for i, row in zip(indices, rows):
+                        column[row] = added[i][comp_type]  # type: ignore
+                        changed_ticks[row] = tick
+                        if added_ticks is not None:
+                            added_ticks[row] = tick
+                continue
+
+            # == append to target ==
+            first_row = len(target.entities)
+            moving = [entities[i] for i in indices]
+            target.entities.extend(moving)
+            for comp_type, column in target.columns.items():
+                if comp_type in added_types:
+                    column.extend([added[i][comp_type] for i in indices])  # type: ignore
+                    if comp_type in source.types and comp_type not in dropped:
+                        # replaced rather than added: keeps its added tick, counts as changed
+                        source_added = source.added_ticks[comp_type]
+                        target.added_ticks[comp_type].extend([source_added[row] for row in rows])
+                    else:
+                        target.added_ticks[comp_type].extend([tick] * len(rows))
+                    target.changed_ticks[comp_type].extend([tick] * len(rows))
+                else:
+                    source_column = source.columns[comp_type]
+                    source_added = source.added_ticks[comp_type]
+                    source_changed = source.changed_ticks[comp_type]
+                    column.extend([source_column[row] for row in rows])
+                    target.added_ticks[comp_type].extend([source_added[row] for row in rows])
+                    target.changed_ticks[comp_type].extend([source_changed[row] for row in rows])
+
+            # == remove from source ==
+            if len(rows) == len(source.entities):
+                source.entities.clear()
+                for comp_type, column in source.columns.items():
+                    column.clear()
+                    source.added_ticks[comp_type].clear()
+                    source.changed_ticks[comp_type].clear()
+            else:
+                # highest row first, so a row moved into a hole is never one still to be removed
+                for row in sorted(rows, reverse=True):
+                    moved = source.swap_remove(row)
+                    if moved is not None:
+                        self._locations[moved & ENTITY_INDEX_MASK] = (source, row)
+
+            locations = self._locations
+            for offset, entity in enumerate(moving):
+                locations[entity & ENTITY_INDEX_MASK] = (target, first_row + offset)
+            if target.tag_bits != source.tag_bits:
+                self._tags.set_many([entity & ENTITY_INDEX_MASK for entity in moving], moving, target.tag_bits)
+            if self._scoped_views:
+                for entity in moving:
+                    self._drop_scoped_views(entity)
+
+    # == observers ==
+
+    def observe(
+        self, comp_type: Type[Any], *,
+        on_add: ObserverHook | None = None, on_remove: ObserverHook | None = None, on_replace: ObserverHook | None = None
+    ) -> None:
+        """
+        Registers hooks for components of `comp_type` being added to an entity, removed from
+        it (also when the entity is removed) or replaced by another instance. Moving an entity
+        between archetypes is none of these. Hooks run from flush_observers(), in batches, in
+        the order the events happened.
+        """
+        hooks = self._observers.setdefault(comp_type, {event: [] for event in OBSERVER_EVENTS})
+        for event, hook in zip(OBSERVER_EVENTS, (on_add, on_remove, on_replace)):
+            if hook is not None:
+                hooks[event].append(hook)
+
+    def flush_observers(self) -> None:
+        """
+        Hands every queued event to its hooks, one batch per run of same-kind events.
+        Events that hooks cause are flushed too.
+        """
+        while self._observer_events:
+            pending, self._observer_events = self._observer_events, {}
+            for comp_type, events in pending.items():
+                hooks = self._observers[comp_type]
+                for event, run in groupby(events, key=lambda e: e[0]):
+                    batch = [e[1:] for e in run]
+                    for hook in hooks[event]:
+                        hook(self, batch)
 
-    def _get_or_build_cache(self, comp_types: Tuple[Type[Any], ...]) -> Set[int]:
-        if comp_types in self._query_cache:
-            return self._query_cache[comp_types]
+    def _record(self, comp_type: Type[Any], event: Tuple[Any, ...]) -> None:
+        self._observer_events.setdefault(comp_type, []).append(event)
 
-        stores = [self._components.get(ct, {}) for ct in comp_types]
-        if any(not store for store in stores):
-            self._query_cache[comp_types] = set()
-            return self._query_cache[comp_types]
+    def _record_restructure(
+        self, source: Archetype, entities: Sequence[int], indices: List[int], rows: List[int],
+        dropped: FrozenSet[Type[Any]], added_types: Tuple[Type[Any], ...], added: Sequence[Dict[Type[Any], Any]] | None
+    ) -> None:
+        for comp_type in dropped:
+            if comp_type in self._observers:
+                column = source.columns[comp_type]
+                for i, row in zip(indices, rows):
+                    self._record(comp_type, ("remove", entities[i], column[row]))
+        for comp_type in added_types:
+            if comp_type in self._observers:
+                if comp_type in source.types and comp_type not in dropped:
+                    column = source.columns[comp_type]
+                    for i, row in zip(indices, rows):
+                        self._record(comp_type, ("replace", entities[i], column[row], added[i][comp_type]))  # type: ignore
+                else:
+                    for i in indices:
+                        self._record(comp_type, ("add", entities[i], added[i][comp_type]))  # type: ignore
 
-        sorted_stores = sorted(stores, key=len)
-        common = set(sorted_stores[0].keys())
-        for store in sorted_stores[1:]:
-            common &= store.keys()
+    # == change detection ==
 
-        self._query_cache[comp_types] = common
-        return common
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    @contextmanager
+    def change_scope(self, system: Hashable) -> Iterator[int]:
+        """
+        Wraps one run of a change-tracking system. Yields the tick of the system's previous run,
+        to be passed as `since=` to view(). Changes the system marks during this run are not
+        reported back to it on its next run; changes made by anyone after it are.
+        """
+        since = self._last_run_ticks.get(system, 0)
+        self._tick += 1
+        this_run = self._tick
+        try:
+            yield since
+        finally:
+            self._last_run_ticks[system] = this_run
+            self._tick += 1
+            if self._journals:
+                self._prune_journals()
+
+    def mark_changed(self, entity: int, *comp_types: Type[Any]) -> None:
+        """
+        Records that the given components of an entity were mutated in place.
+        """
+        location = self._location(entity)
+        if location is None:
+            return
+        archetype, row = location
+        for comp_type in comp_types:
+            ticks = archetype.changed_ticks.get(comp_type)
+            if ticks is not None:
+                ticks[row] = self._tick
+                journal = self._journals.get(comp_type)
+                if journal is not None:
+                    journal[entity] = self._tick
+
+    def _touch(self, entity: int) -> None:
+        # hierarchy changes move an entity in world space, so they count as a change
+        # to all of its components
+        location = self._location(entity)
+        if location is None:
+            return
+        archetype, row = location
+        for ticks in archetype.changed_ticks.values():
+            ticks[row] = self._tick
+        if self._journals:
+            self._journal(archetype.types, (entity, ))
+
+    def _journal(self, comp_types: Iterable[Type[Any]], entities: Sequence[int]) -> None:
+        tick = self._tick
+        for comp_type in comp_types:
+            journal = self._journals.get(comp_type)
+            if journal is not None:
+                journal.update(dict.fromkeys(entities, tick))
+
+    def track_changes(self, *comp_types: Type[Any]) -> None:
+        """
+        Keeps a journal of the entities whose `comp_types` components get added or changed, so
+        that view() / query() with `changed=` / `added=` on those types cost as much as the
+        changes since `since`, not as much as every entity with the components. Journals only
+        know about changes from the call on; earlier `since` ticks still scan, and so do views
+        where the journals hold more than one entry per JOURNAL_SCAN_RATIO matching rows.
+        """
+        for comp_type in comp_types:
+            if comp_type not in self._journals:
+                self._journals[comp_type] = {}
+                self._journal_floors[comp_type] = self._tick
+
+    def _prune_journals(self) -> None:
+        # entries no change scope can ask about anymore. scopes that stopped running hold this
+        # back, leaving at most one entry per entity.
+        floor = min(self._last_run_ticks.values())
+        for comp_type, journal in self._journals.items():
+            if floor > self._journal_floors[comp_type]:
+                self._journals[comp_type] = {e: t for e, t in journal.items() if t > floor}
+                self._journal_floors[comp_type] = floor
+
+    def _get_or_build_cache(self, key: Tuple[Type[Any], ...] | Query) -> List[Archetype]:
+        matches = self._query_cache.get(key)
+        if matches is not None:
+            return matches
+
+        # systems on worker threads can miss the same query at once; only one may index it
+        with self._query_cache_lock:
+            matches = self._query_cache.get(key)
+            if matches is not None:
+                return matches
+
+            if isinstance(key, Query):
+                matches = [archetype for types, archetype in self._archetypes.items() if key.matches(types)]
+                index_types = key.index_types()
+            else:
+                required = frozenset(key)
+                matches = [archetype for types, archetype in self._archetypes.items() if types.issuperset(required)]
+                index_types = key[:1]
+            self._query_cache[key] = matches
+            for comp_type in index_types:
+                self._queries_by_type.setdefault(comp_type, []).append(key)
+            return matches
 
     @overload
     def get_components(self, entity: int, c1: Type[T1]) -> Tuple[T1] | None:
@@ -105,83 +734,164 @@ class Registry:
     def get_components(self, entity: int, *comp_types: Type[Any]) -> Tuple[Any, ...] | None: # type: ignore
         if not comp_types:
             return ()
-        comps = self._entity_components.get(entity)
-        if comps is None:
+        location = self._location(entity)
+        if location is None:
             return None
+        archetype, row = location
+        columns = archetype.columns
         try:
-            return tuple(comps[ct] for ct in comp_types)
+            return tuple(columns[ct][row] for ct in comp_types)
         except KeyError:
             return None
 
     def get_all_components(self, entity: int) -> Dict[Type[Any], Any]:
-        return self._entity_components.get(entity, {})
+        location = self._location(entity)
+        if location is None:
+            return {}
+        archetype, row = location
+        return archetype.row_components(row)
 
-    def get_components_of_type(self, comp_type: Type[T]) -> Dict[int, T]:
-        return self._components.get(comp_type, {})
+    def get_components_of_type(self, comp_type: Type[T]) -> ComponentMapping[T]:
+        return ComponentMapping(self, comp_type)
+
+    def archetypes(self) -> Iterator[Archetype]:
+        """
+        The non-empty archetype tables, for code that reads whole columns at once.
+        """
+        for archetype in tuple(self._archetypes.values()):
+            if archetype.entities:
+                yield archetype
 
     def view_all(self) -> Iterator[Tuple[int, Dict[Type[Any], Any]]]:
-        yield from self._entity_components.items()
+        for archetype in tuple(self._archetypes.values()):
+            columns = archetype.columns
+            for row, entity in enumerate(archetype.entities):
+                yield entity, {comp_type: column[row] for comp_type, column in columns.items()}
 
     @overload
-    def view(self, c1: Type[T1]) -> Iterator[Tuple[int, Tuple[T1]]]:
+    def view(self, c1: Type[T1], *, changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[Tuple[int, Tuple[T1]]]:
         ...
 
     @overload
-    def view(self, c1: Type[T1], c2: Type[T2]) -> Iterator[Tuple[int, Tuple[T1, T2]]]:
+    def view(self, c1: Type[T1], c2: Type[T2], *, changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[Tuple[int, Tuple[T1, T2]]]:
         ...
 
     @overload
-    def view(self, c1: Type[T1], c2: Type[T2], c3: Type[T3]) -> Iterator[Tuple[int, Tuple[T1, T2, T3]]]:
+    def view(self, c1: Type[T1], c2: Type[T2], c3: Type[T3], *, changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[Tuple[int, Tuple[T1, T2, T3]]]:
         ...
 
     @overload
-    def view(self, c1: Type[T1], c2: Type[T2], c3: Type[T3], c4: Type[T4]) -> Iterator[
+    def view(self, c1: Type[T1], c2: Type[T2], c3: Type[T3], c4: Type[T4], *, changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[
             Tuple[int, Tuple[T1, T2, T3, T4]]]:
         ...
 
     @overload
-    def view(self, c1: Type[T1], c2: Type[T2], c3: Type[T3], c4: Type[T4], c5: Type[T5]) -> Iterator[
+    def view(self, c1: Type[T1], c2: Type[T2], c3: Type[T3], c4: Type[T4], c5: Type[T5], *, changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[
             Tuple[int, Tuple[T1, T2, T3, T4, T5]]]:
         ...
 
-    def view(self, *comp_types: Type[Any]) -> Iterator[Tuple[int, Tuple[Any, ...]]]: # type: ignore
+    def view(self, *comp_types: Type[Any], changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[Tuple[int, Tuple[Any, ...]]]: # type: ignore
         """
         Returns an iterator of (entity, (comp1, comp2...)) for entities with all requested components.
+        With `changed=` / `added=`, only entities where any of those components was changed / added
+        after tick `since` are returned.
         """
         if not comp_types:
             return
+        yield from self._view_archetypes(self._get_or_build_cache(comp_types), comp_types, changed, added, since)
 
-        cached_entities = self._get_or_build_cache(comp_types)
-        if not cached_entities:
+    def query(self, query: Query, *, changed: ComponentTypes = (), added: ComponentTypes = (), since: int = 0) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """
+        Like view(), for the entities matching `query`. Returns (entity, (comp1, comp2...))
+        with the components in `query.comp_types`.
+        """
+        yield from self._view_archetypes(self._get_or_build_cache(query), query.comp_types, changed, added, since)
+
+    def _view_archetypes(
+        self, archetypes: List[Archetype], comp_types: ComponentTypes,
+        changed: ComponentTypes, added: ComponentTypes, since: int
+    ) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        if changed or added:
+            yield from self._view_filtered(archetypes, comp_types, changed, added, since)
+            return
+
+        for archetype in tuple(archetypes):
+            if not archetype.entities:
+                continue
+            if not comp_types:
+                yield from zip(archetype.entities, [()] * len(archetype.entities))
+                continue
+            columns = archetype.columns
+            yield from zip(archetype.entities, zip(*[columns[ct] for ct in comp_types]))
+
+    def _view_filtered(
+        self, archetypes: List[Archetype], comp_types: ComponentTypes,
+        changed: ComponentTypes, added: ComponentTypes, since: int
+    ) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        filter_types = (*changed, *added)
+        if since > 0 and all(since >= self._journal_floors.get(t, since + 1) for t in filter_types) \
+                and sum(len(self._journals[t]) for t in filter_types) * JOURNAL_SCAN_RATIO <= sum(len(a.entities) for a in archetypes):
+            yield from self._view_journaled(archetypes, comp_types, changed, added, since)
             return
 
-        stores = [self._components[ct] for ct in comp_types]
-        count = len(comp_types)
-
-        if count == 1:
-            s0 = stores[0]
-            for e in cached_entities:
-                yield e, (s0[e],)
-        elif count == 2:
-            s0, s1 = stores[0], stores[1]
-            for e in cached_entities:
-                yield e, (s0[e], s1[e])
-        elif count == 3:
-            s0, s1, s2 = stores[0], stores[1], stores[2]
-            for e in cached_entities:
-                yield e, (s0[e], s1[e], s2[e])
-        elif count == 4:
-            s0, s1, s2, s3 = stores[0], stores[1], stores[2], stores[3]
-            for e in cached_entities:
-                yield e, (s0[e], s1[e], s2[e], s3[e])
-        elif count == 5:
-            s0, s1, s2, s3, s4 = stores[0], stores[1], stores[2], stores[3], stores[4]
-            for e in cached_entities:
-                yield e, (s0[e], s1[e], s2[e], s3[e], s4[e])
+        for archetype in tuple(archetypes):
+            if not archetype.entities:
+                continue
+
+            tick_columns = [archetype.changed_ticks[ct] for ct in changed if ct in archetype.types]
+            tick_columns += [archetype.added_ticks[ct] for ct in added if ct in archetype.types]
+            if not tick_columns:
+                continue
+
+            if len(tick_columns) == 1:
+                rows = [row for row, t in enumerate(tick_columns[0]) if t > since]
+            else:
+                rows = [row for row, ticks in enumerate(zip(*tick_columns)) if max(ticks) > since]
+
+            entities = archetype.entities
+            columns = [archetype.columns[ct] for ct in comp_types]
+            for row in rows:
+                yield entities[row], tuple(column[row] for column in columns)
+
+    def _view_journaled(
+        self, archetypes: List[Archetype], comp_types: ComponentTypes,
+        changed: ComponentTypes, added: ComponentTypes, since: int
+    ) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        # the journals give a superset of the matches, the tick columns decide
+        filter_types = (*changed, *added)
+        if len(filter_types) == 1:
+            candidates = [e for e, t in self._journals[filter_types[0]].items() if t > since]
         else:
-            # slow fallback path for >5 components
-            for e in cached_entities:
-                yield e, tuple(store[e] for store in stores)
+            merged: Dict[int, None] = {}
+            for comp_type in filter_types:
+                merged.update((e, None) for e, t in self._journals[comp_type].items() if t > since)
+            candidates = list(merged)
+
+        matching = set(archetypes)
+        # archetype -> (tick columns, component columns), or None if it doesn't match
+        columns_of: Dict[Archetype, Tuple[List[List[int]], List[List[Any]]] | None] = {}
+        generations = self._generations
+        locations = self._locations
+        for entity in candidates:
+            index = entity & ENTITY_INDEX_MASK
+            location = locations[index] if generations[index] == entity >> ENTITY_INDEX_BITS else None
+            if location is None:
+                continue
+            archetype, row = location
+            columns = columns_of.get(archetype, False)
+            if columns is False:
+                columns = columns_of[archetype] = (
+                    [archetype.changed_ticks[ct] for ct in changed if ct in archetype.types]
+                    + [archetype.added_ticks[ct] for ct in added if ct in archetype.types],
+                    [archetype.columns[ct] for ct in comp_types]
+                ) if archetype in matching else None
+            if columns is None:
+                continue
+            tick_columns, component_columns = columns
+            for ticks in tick_columns:
+                if ticks[row] > since:
+                    yield entity, tuple(column[row] for column in component_columns)
+                    break
 
     @overload
     def get_singleton(self, c1: Type[T1]) -> \
@@ -210,46 +920,238 @@ class Registry:
 
     def get_singleton(self, *comp_types: Type[Any]) -> Tuple[int, Tuple[Any, ...]] | None: # type: ignore
         """
-        Returns the first entity with all requested components.
+        Returns the entity with the lowest handle among those with all requested components.
         """
         if not comp_types:
             return None
 
-        cached_entities = self._get_or_build_cache(comp_types)
+        lowest_entity: int | None = None
+        lowest_archetype: Archetype | None = None
+        for archetype in self._get_or_build_cache(comp_types):
+            if not archetype.entities:
+                continue
+            candidate = min(archetype.entities)
+            if lowest_entity is None or candidate < lowest_entity:
+                lowest_entity = candidate
+                lowest_archetype = archetype
 
-        try:
-            lowest_entity = min(cached_entities)
-        except ValueError:
-            # catch empty sequences
+        if lowest_entity is None or lowest_archetype is None:
             return None
 
-        stores = [self._components[ct] for ct in comp_types]
+        row = lowest_archetype.entities.index(lowest_entity)
+        return lowest_entity, tuple(lowest_archetype.columns[ct][row] for ct in comp_types)
 
-        return lowest_entity, tuple(store[lowest_entity] for store in stores)
+    # == resources ==
+
+    def insert_resource(self, resource: Any) -> None:
+        """
+        Stores a standalone resource, replacing any previous one of the same type.
+        """
+        self._resources[type(resource)] = resource
+
+    def _find_resource_owner(self, comp_type: Type[Any]) -> Tuple[int, Archetype, int] | None:
+        entity = self._resource_owners.get(comp_type)
+        if entity is not None:
+            location = self._location(entity)
+            if location is not None and comp_type in location[0].types:
+                return entity, location[0], location[1]
+
+        # slow path, taken once per type unless the owner loses the component
+        r = self.get_singleton(comp_type)
+        if r is None:
+            self._resource_owners.pop(comp_type, None)
+            return None
+        entity = r[0]
+        self._resource_owners[comp_type] = entity
+        archetype, row = self._locations[entity & ENTITY_INDEX_MASK]  # type: ignore
+        return entity, archetype, row
+
+    def get_resource(self, comp_type: Type[T]) -> T | None:
+        """
+        Returns the resource of the given type: a standalone one if inserted,
+        otherwise the component of that type on the entity that carries it.
+        """
+        resource = self._resources.get(comp_type)
+        if resource is not None:
+            return resource
+
+        owner = self._find_resource_owner(comp_type)
+        if owner is None:
+            return None
+        _, archetype, row = owner
+        return archetype.columns[comp_type][row]
+
+    def get_resource_entity(self, comp_type: Type[Any]) -> int | None:
+        """
+        Returns the entity carrying the resource of the given type, if it lives on one.
+        """
+        owner = self._find_resource_owner(comp_type)
+        return owner[0] if owner is not None else None
+
+    def remove_resource(self, comp_type: Type[Any]) -> None:
+        if self._resources.pop(comp_type, None) is not None:
+            return
+        owner = self._find_resource_owner(comp_type)
+        if owner is not None:
+            self.remove_components(owner[0], comp_type)
+            self._resource_owners.pop(comp_type, None)
+
+    # == tags ==
+
+    def track_tags(self, *comp_types: Type[Any]) -> None:
+        """
+        Keeps a bitset per entity slot recording which of `comp_types` each entity has, so that
+        whole arrays of handles can be classified at once with tag_bits() / tagged(). Meant for
+        marker components like Building: membership is read off the archetype, the component
+        values themselves are not looked at.
+        """
+        tags = self._tags
+        new_types = [t for t in comp_types if t not in tags.bits]
+        if not new_types:
+            return
+        for comp_type in new_types:
+            tags.register(comp_type)
+        for archetype in self._archetypes.values():
+            tag_bits = tags.bits_of(archetype.types)
+            if tag_bits != archetype.tag_bits:
+                archetype.tag_bits = tag_bits
+                entities = archetype.entities
+                tags.set_many([entity & ENTITY_INDEX_MASK for entity in entities], entities, tag_bits)
+
+    def tag_mask(self, *comp_types: Type[Any]) -> int:
+        """
+        The bits of the given tracked tag types, for testing against tag_bits().
+        """
+        return self._tags.mask(*comp_types)
+
+    def tag_bits(self, entities: Sequence[int] | npt.NDArray[np.integer]) -> npt.NDArray[np.uint32]:
+        """
+        The tag bits of every handle in `entities`. Stale handles get 0.
+        """
+        return self._tags.lookup(np.asarray(entities, dtype=np.int64), ENTITY_INDEX_MASK)
+
+    def tagged(self, *comp_types: Type[Any], without: ComponentTypes = ()) -> npt.NDArray[np.int64]:
+        """
+        Every live entity that has all of the tracked tag types `comp_types` and none of `without`.
+        """
+        return self._tags.select(self._tags.mask(*comp_types), self._tags.mask(*without))
+
+    # == enabling ==
+
+    def set_enabled(self, entity: int, enabled: bool) -> None:
+        """
+        Disabled entities carry the Disabled tag, so queries with `without=(Disabled, )` skip
+        them per archetype instead of checking a flag on every entity.
+        """
+        if enabled:
+            self.remove_components(entity, Disabled)
+        elif self.is_enabled(entity):
+            self.add_components(entity, Disabled())
+
+    def is_enabled(self, entity: int) -> bool:
+        location = self._location(entity)
+        return location is not None and Disabled not in location[0].types
+
+    # == hierarchy ==
 
     def set_parent(self, child: int, new_parent: int | None) -> None:
         if child == new_parent:
             raise ValueError(f"Cannot parent entity {child} to itself")
-        if child not in self._entity_components:
+        if self._location(child) is None:
             raise ValueError(f"Cannot parent non-existent entity {child} to parent {new_parent}")
-        if new_parent is not None and new_parent not in self._entity_components:
+        if new_parent is not None and self._location(new_parent) is None:
             raise ValueError(f"Cannot parent entity {child} to non-existent parent {new_parent}")
 
         old_parent = self._parents.get(child)
         if old_parent == new_parent:
             return
 
+        if self._scoped_views:
+            self._drop_scoped_views(child)
         if old_parent is not None:
             self._children[old_parent].discard(child)
+        self._touch(child)
+        self._hierarchy_dirty.add(child)
 
         if new_parent is None:
             self._parents.pop(child, None)
         else:
             self._parents[child] = new_parent
             self._children[new_parent].add(child)
+            if self._scoped_views:
+                self._drop_scoped_views(child)
 
     def get_parent(self, entity: int) -> int | None:
         return self._parents.get(entity)
 
     def get_children(self, entity: int) -> Set[int]:
         return self._children.get(entity, self._empty_set)
+
+    def hierarchy(self) -> HierarchyIndex:
+        """
+        All live entities in depth-first order with contiguous subtree ranges. Valid until the
+        next create / remove / set_parent.
+        """
+        if self._hierarchy_dirty:
+            with self._hierarchy_lock:
+                if self._hierarchy_dirty:
+                    self._hierarchy.update(self._hierarchy_dirty, self._parents, self._children)
+                    self._hierarchy_dirty.clear()
+        return self._hierarchy
+
+    def get_descendants(self, entity: int) -> npt.NDArray[np.int64]:
+        """
+        Every descendant of `entity`, parents before their children.
+        """
+        return self.hierarchy().descendants(entity)
+
+    def view_children(self, root: int, *comp_types: Type[Any]) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """
+        Like view(), restricted to the children of `root`. Which children match is cached
+        until one of them changes archetype or the children themselves change.
+        """
+        yield from self._view_scoped(self._get_or_build_scoped(root, comp_types, False), comp_types)
+
+    def view_descendants(self, root: int, *comp_types: Type[Any]) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """
+        Like view_children(), over the whole subtree below `root`, parents before their children.
+        """
+        yield from self._view_scoped(self._get_or_build_scoped(root, comp_types, True), comp_types)
+
+    def _get_or_build_scoped(self, root: int, comp_types: ComponentTypes, descendants: bool) -> List[int]:
+        key = (comp_types, descendants)
+        views = self._scoped_views.get(root)
+        if views is not None:
+            members = views.get(key)
+            if members is not None:
+                return members
+        if self._location(root) is None:
+            return []
+
+        candidates = self.get_descendants(root).tolist() if descendants else self._children[root]
+        required = frozenset(comp_types)
+        members = []
+        for entity in candidates:
+            location = self._location(entity)
+            if location is not None and location[0].types.issuperset(required):
+                members.append(entity)
+        self._scoped_views.setdefault(root, {})[key] = members
+        return members
+
+    def _view_scoped(self, members: List[int], comp_types: ComponentTypes) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        for entity in members:
+            location = self._location(entity)
+            # only fails when the caller restructures the subtree while iterating
+            if location is None or not location[0].types.issuperset(comp_types):
+                continue
+            archetype, row = location
+            columns = archetype.columns
+            yield entity, tuple(columns[ct][row] for ct in comp_types)
+
+    def _drop_scoped_views(self, entity: int) -> None:
+        # the views of everything above `entity` may include it
+        scoped_views = self._scoped_views
+        parent = self._parents.get(entity)
+        while parent is not None:
+            scoped_views.pop(parent, None)
+            parent = self._parents.get(parent)
@@ -0,0 +1,385 @@
+import dataclasses
+import importlib
+import io
+import json
+import pickle
+import struct
+import types
+from collections import deque
+from enum import Enum
+from itertools import repeat
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple, Type
+
+import numpy as np
+import numpy.typing as npt
+
+from entities.registry import Registry, paused_gc
+
+
+# a snapshot file is laid out as:
+#   MAGIC, u32 version, u64 header size, JSON header, then raw array blobs aligned to BLOB_ALIGNMENT.
+# the header describes every archetype as a tree of columns, each either a blob reference or,
+# for values that don't fit a NumPy column, a pickled list.
+# loading never imports or calls anything a snapshot names, other than component and asset
+# types and what NumPy needs to rebuild arrays, so snapshots from elsewhere can be opened.
+MAGIC = b"PYGLSNAP"
+VERSION = 2
+BLOB_ALIGNMENT = 64
+
+# encodes an asset-like object (a Mesh, a Texture...) as a picklable key, or returns None
+# if it is not a reference. the matching decoder turns that key back into an object.
+EncodeRef = Callable[[Any], Any]
+DecodeRef = Callable[[Any], Any]
+
+_SCALAR_TYPES = (bool, int, float, np.bool_, np.integer, np.floating)
+
+# the only modules a snapshot's types and pickles may name classes from
+_COMPONENT_MODULES = "entities.components."
+# what pickled arrays and NumPy scalars are rebuilt with, before and after NumPy 2
+_NUMPY_GLOBALS = frozenset(
+    (module, name)
+    for package in ("numpy.core", "numpy._core")
+    for module, name in (
+        (f"{package}.multiarray", "_reconstruct"), (f"{package}.multiarray", "scalar"), (f"{package}.numeric", "_frombuffer")
+    )
+) | {("numpy", "ndarray"), ("numpy", "dtype")}
+
+
+def _type_name(cls: Type[Any]) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _resolve_type(name: str) -> Type[Any]:
+    module_name, qualname = name.split(":")
+    if not module_name.startswith(_COMPONENT_MODULES):
+        raise ValueError(f"Snapshot names {name}, which is not a component or asset type")
+    obj: Any = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    if not isinstance(obj, type):
+        raise ValueError(f"Snapshot names {name}, which is not a component or asset type")
+    return obj
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) in _NUMPY_GLOBALS:
+            return super().find_class(module, name)
+        if module.startswith(_COMPONENT_MODULES):
+            obj = super().find_class(module, name)
+            if isinstance(obj, type):
+                return obj
+        raise pickle.UnpicklingError(f"Snapshot names {module}.{name}, which is not a component or asset type")
+
+
+# == writing ==
+
+
+class _BlobWriter:
+    def __init__(self):
+        self.blobs: List[npt.NDArray[Any]] = []
+        self.size = 0
+
+    def add(self, array: npt.NDArray[Any]) -> Dict[str, Any]:
+        array = np.ascontiguousarray(array)
+        offset = self.size
+        self.blobs.append(array)
+        self.size += -(-array.nbytes // BLOB_ALIGNMENT) * BLOB_ALIGNMENT
+        return {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+
+    def add_pickle(self, values: Any) -> Dict[str, Any]:
+        return self.add(np.frombuffer(pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8))
+
+
+def _encode_unique(values: Sequence[Any], blobs: _BlobWriter, encode_item: Callable[[List[Any]], Dict[str, Any]]) -> Dict[str, Any]:
+    # objects shared between rows, like one Material used by every building, stay shared
+    ids = np.fromiter(map(id, values), dtype=np.uint64, count=len(values))
+    _, first_rows, index = np.unique(ids, return_index=True, return_inverse=True)
+    if len(first_rows) == len(values):
+        return encode_item(list(values))
+
+    # keep the unique objects in order of first use
+    order = np.argsort(first_rows)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    column = encode_item([values[row] for row in first_rows[order].tolist()])
+    column["index"] = blobs.add(rank[index.reshape(-1)].astype(np.uint32))
+    return column
+
+
+def _encode_column(values: Sequence[Any], blobs: _BlobWriter, encode_ref: EncodeRef | None) -> Dict[str, Any]:
+    value_types = set(map(type, values))
+
+    if type(None) in value_types:
+        present = np.fromiter((v is not None for v in values), dtype=np.bool_, count=len(values))
+        if len(value_types) == 1:
+            return {"kind": "none"}
+        return {
+            "kind": "optional",
+            "present": blobs.add(present),
+            "values": _encode_column([v for v in values if v is not None], blobs, encode_ref),
+        }
+
+    if len(value_types) != 1:
+        return {"kind": "pickle", "values": blobs.add_pickle(list(values))}
+
+    first = values[0]
+    (value_type, ) = value_types
+
+    if encode_ref is not None and encode_ref(first) is not None:
+        return _encode_unique(values, blobs, lambda items: {
+            "kind": "ref",
+            "refs": blobs.add_pickle([encode_ref(item) for item in items]),
+        })
+
+    if isinstance(first, Enum):
+        position = {member: i for i, member in enumerate(value_type)}
+        return {
+            "kind": "enum",
+            "type": _type_name(value_type),
+            "values": blobs.add(np.fromiter(map(position.__getitem__, values), dtype=np.uint16, count=len(values))),
+        }
+
+    if isinstance(first, np.ndarray) and first.dtype != object \
+            and len(set(map(attrgetter("shape"), values))) == 1 and len(set(map(attrgetter("dtype"), values))) == 1:
+        return {"kind": "array", "values": blobs.add(np.stack(values))}
+
+    if isinstance(first, _SCALAR_TYPES):
+        array = np.array(values)
+        if array.dtype.kind in "biuf":
+            return {"kind": "scalar", "python": not isinstance(first, np.generic), "values": blobs.add(array)}
+
+    if hasattr(value_type, "to_columns"):
+        # types keeping their data in columns of their own, like Transform
+        return _encode_unique(values, blobs, lambda items: {
+            "kind": "columns",
+            "type": _type_name(value_type),
+            "columns": {name: blobs.add(array) for name, array in value_type.to_columns(items).items()},
+        })
+
+    if dataclasses.is_dataclass(first) and not isinstance(first, type):
+        fields = [f.name for f in dataclasses.fields(value_type)]
+        return _encode_unique(values, blobs, lambda items: {
+            "kind": "dataclass",
+            "type": _type_name(value_type),
+            "count": len(items),
+            "fields": {
+                name: _encode_column(list(map(attrgetter(name), items)), blobs, encode_ref)
+                for name in fields
+            },
+        })
+
+    return {"kind": "pickle", "values": blobs.add_pickle(list(values))}
+
+
+def save_snapshot(
+    registry: Registry, path: str | Path,
+    entities: Iterable[int] | None = None, encode_ref: EncodeRef | None = None
+) -> int:
+    """
+    Writes `entities` (default: all of them) and the parent links between them to `path`.
+    Parents outside the saved set are dropped. Returns the number of entities written.
+    """
+    selected = None if entities is None else set(entities)
+
+    # == gather rows per archetype ==
+    tables: List[Tuple[List[int], List[Tuple[Type[Any], List[Any]]]]] = []
+    for archetype in registry.archetypes():
+        rows = range(len(archetype.entities)) if selected is None \
+            else [row for row, e in enumerate(archetype.entities) if e in selected]
+        if not rows:
+            continue
+        table_entities = [archetype.entities[row] for row in rows]
+        table_columns = [(comp_type, [column[row] for row in rows]) for comp_type, column in archetype.columns.items()]
+        tables.append((table_entities, table_columns))
+
+    saved = [e for table_entities, _ in tables for e in table_entities]
+    saved_index = {e: i for i, e in enumerate(saved)}
+    parents = np.array([saved_index.get(registry.get_parent(e), -1) for e in saved], dtype=np.int32)  # type: ignore
+
+    # == encode ==
+    blobs = _BlobWriter()
+    header = {
+        "entity_count": len(saved),
+        "parents": blobs.add(parents),
+        "archetypes": [
+            {
+                "count": len(table_entities),
+                "components": [
+                    {"type": _type_name(comp_type), "column": _encode_column(values, blobs, encode_ref)}
+                    for comp_type, values in table_columns
+                ],
+            }
+            for table_entities, table_columns in tables
+        ],
+    }
+
+    # == write ==
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix_size = len(MAGIC) + struct.calcsize("<IQ") + len(header_bytes)
+    data_start = -(-prefix_size // BLOB_ALIGNMENT) * BLOB_ALIGNMENT
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<IQ", VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - prefix_size))
+        for blob in blobs.blobs:
+            f.write(blob.tobytes())
+            f.write(b"\0" * (-blob.nbytes % BLOB_ALIGNMENT))
+    return len(saved)
+
+
+# == reading ==
+
+
+class _BlobReader:
+    def __init__(self, path: str | Path, data_start: int):
+        # copy-on-write: loaded arrays are views into the file until something writes to them
+        self.raw = np.memmap(path, dtype=np.uint8, mode="c")
+        self.data_start = data_start
+
+    def get(self, ref: Dict[str, Any]) -> npt.NDArray[Any]:
+        dtype = np.dtype(ref["dtype"])
+        count = int(np.prod(ref["shape"], dtype=np.int64))
+        start = self.data_start + ref["offset"]
+        return self.raw[start:start + count * dtype.itemsize].view(np.ndarray).view(dtype).reshape(ref["shape"])
+
+    def get_pickle(self, ref: Dict[str, Any]) -> Any:
+        try:
+            return _SnapshotUnpickler(io.BytesIO(self.get(ref).tobytes())).load()
+        except pickle.UnpicklingError as e:
+            raise ValueError(str(e)) from e
+
+
+def _expand_unique(column: Dict[str, Any], items: List[Any], blobs: _BlobReader) -> List[Any]:
+    index = column.get("index")
+    if index is None:
+        return items
+    return [items[i] for i in blobs.get(index).tolist()]
+
+
+def _decode_column(column: Dict[str, Any], count: int, blobs: _BlobReader, decode_ref: DecodeRef | None) -> List[Any]:
+    kind = column["kind"]
+
+    if kind == "none":
+        return [None] * count
+
+    if kind == "optional":
+        present = blobs.get(column["present"])
+        values = iter(_decode_column(column["values"], int(present.sum()), blobs, decode_ref))
+        return [next(values) if p else None for p in present.tolist()]
+
+    if kind == "ref":
+        if decode_ref is None:
+            raise ValueError("Snapshot contains asset references but no decode_ref was given")
+        return _expand_unique(column, [decode_ref(ref) for ref in blobs.get_pickle(column["refs"])], blobs)
+
+    if kind == "enum":
+        members = list(_resolve_type(column["type"]))
+        return [members[i] for i in blobs.get(column["values"]).tolist()]
+
+    if kind == "columns":
+        cls = _resolve_type(column["type"])
+        items = cls.from_columns({name: blobs.get(ref) for name, ref in column["columns"].items()})
+        return _expand_unique(column, items, blobs)
+
+    if kind == "array":
+        # row views into one block
+        return list(blobs.get(column["values"]))
+
+    if kind == "scalar":
+        values = blobs.get(column["values"])
+        return values.tolist() if column["python"] else list(values)
+
+    if kind == "dataclass":
+        cls = _resolve_type(column["type"])
+        items_count = column["count"]
+        # skips __init__ and its default factories: every field is set right after
+        items = list(map(cls.__new__, repeat(cls, items_count)))
+        for name, field_column in column["fields"].items():
+            values = _decode_column(field_column, items_count, blobs, decode_ref)
+            descriptor = getattr(cls, name, None)
+            if isinstance(descriptor, types.MemberDescriptorType):
+                # slots: let the descriptor loop in C
+                deque(map(descriptor.__set__, items, values), maxlen=0)
+            else:
+                for item, value in zip(items, values):
+                    setattr(item, name, value)
+        return _expand_unique(column, items, blobs)
+
+    if kind == "pickle":
+        return blobs.get_pickle(column["values"])
+
+    raise ValueError(f"Unknown snapshot column kind {kind!r}")
+
+
+def load_snapshot(
+    registry: Registry, path: str | Path,
+    decode_ref: DecodeRef | None = None, parent: int | None = None
+) -> List[int]:
+    """
+    Creates the entities saved in `path` in `registry`, with fresh handles, in the order
+    they were saved. Saved roots are parented to `parent`. Returns the new handles.
+    Raises ValueError if the snapshot names a class that is not a component or asset type.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        version, header_size = struct.unpack("<IQ", f.read(struct.calcsize("<IQ")))
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        header = json.loads(f.read(header_size).decode("utf-8"))
+    prefix_size = len(MAGIC) + struct.calcsize("<IQ") + header_size
+    blobs = _BlobReader(path, -(-prefix_size // BLOB_ALIGNMENT) * BLOB_ALIGNMENT)
+
+    parents = blobs.get(header["parents"]).astype(np.int64)
+    entity_count = header["entity_count"]
+
+    with paused_gc():
+        # == decode every archetype ==
+        tables: List[List[List[Any]]] = []
+        table_of = np.empty(entity_count, dtype=np.int64)
+        first = 0
+        for table_index, archetype in enumerate(header["archetypes"]):
+            count = archetype["count"]
+            tables.append([
+                _decode_column(component["column"], count, blobs, decode_ref)
+                for component in archetype["components"]
+            ])
+            table_of[first:first + count] = table_index
+            first += count
+        table_starts = np.concatenate(([0], np.cumsum([archetype["count"] for archetype in header["archetypes"]])))
+
+        # == create, parents before children ==
+        depth = np.zeros(entity_count, dtype=np.int64)
+        ancestor = parents.copy()
+        while True:
+            has_ancestor = ancestor >= 0
+            if not has_ancestor.any():
+                break
+            depth += has_ancestor
+            ancestor[has_ancestor] = parents[ancestor[has_ancestor]]
+
+        # every run of rows with the same (depth, table, parent) is one create_entities call
+        order = np.lexsort((parents, table_of, depth))
+        keys = np.stack((depth[order], table_of[order], parents[order]), axis=1)
+        boundaries = np.flatnonzero((keys[1:] != keys[:-1]).any(axis=1)) + 1
+
+        handles = np.zeros(entity_count, dtype=np.int64)
+        for group in np.split(order, boundaries) if entity_count else ():
+            i = int(group[0])
+            table_index = int(table_of[i])
+            saved_parent = int(parents[i])
+            rows = (group - table_starts[table_index]).tolist()
+            columns = tables[table_index]
+            group_parent = int(handles[saved_parent]) if saved_parent >= 0 else parent
+            if len(rows) == table_starts[table_index + 1] - table_starts[table_index]:
+                # the whole table, rows already in order
+                group_columns = columns
+            else:
+                group_columns = [[column[row] for row in rows] for column in columns]
+            handles[group] = registry.create_entities(len(rows), *group_columns, parent=group_parent)
+
+    return handles.tolist()
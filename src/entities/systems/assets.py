@@ -1,3 +1,4 @@
+import dataclasses
 import os
 import threading
 import queue
@@ -10,12 +11,14 @@ from PIL import Image
 from OpenGL import GL
 
 from entities.components.visuals.assets import (
-    AssetsState, AssetStatus, Mesh, Texture,
+    AssetsState, AssetStatus, Mesh, MeshBounds, Texture,
     ModelAsset, ModelNode, MaterialTemplate,
     ModelTask, MeshFileTask, MeshGeometryTask,
     TextureFileTask, TextureImageTask,
     ModelResult, MeshResult, TextureResult
 )
+from entities.components.visuals.material import Material
+from entities.components.visuals.visuals import Visuals
 from entities.registry import Registry
 from math_utils import vec3, vec4
 
@@ -208,6 +211,16 @@ def _calculate_tangents(vertices, normals, uvs, faces):
     return tangents
 
 
+def _calculate_bounds(positions: npt.NDArray[np.float32]) -> MeshBounds | None:
+    if len(positions) == 0:
+        return None
+    minimum = positions.min(axis=0).astype(np.float32)
+    maximum = positions.max(axis=0).astype(np.float32)
+    center = (minimum + maximum) * np.float32(0.5)
+    radius = float(np.sqrt(np.max(np.sum((positions - center) ** 2, axis=1))))
+    return MeshBounds(minimum, maximum, center, radius)
+
+
 def _process_mesh_from_geom(asset_id: int, geom: trimesh.Trimesh, result_queue: queue.Queue):
     try:
         vertices = geom.vertices
@@ -230,7 +243,8 @@ def _process_mesh_from_geom(asset_id: int, geom: trimesh.Trimesh, result_queue:
         result_queue.put(MeshResult(
             asset_id=asset_id,
             vertices=interleaved.ravel(),
-            indices=geom.faces.ravel().astype(np.uint32)
+            indices=geom.faces.ravel().astype(np.uint32),
+            bounds=_calculate_bounds(interleaved[:, 0:3])
         ))
     except Exception as e:
         result_queue.put(MeshResult(asset_id=asset_id, error=e))
@@ -277,10 +291,9 @@ class AssetSystem:
 
     @staticmethod
     def update(registry: Registry):
-        r_assets = registry.get_singleton(AssetsState)
-        if r_assets is None: return
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None: return
 
-        _, (assets_state, ) = r_assets
         max_uploads_per_frame = 64
         uploads = 0
 
@@ -302,6 +315,8 @@ class AssetSystem:
                         elif nodes is not None:
                             model_obj.nodes = nodes
                             model_obj.status = AssetStatus.Ready
+                            AssetSystem._bind_placeholders(assets_state, asset_id, nodes)
+                            AssetSystem._retain_model_assets(assets_state, nodes)
                             for node in nodes:
                                 if node.mesh_id not in assets_state.meshes:
                                     assets_state.meshes[node.mesh_id] = Mesh(id=node.mesh_id, status=AssetStatus.Loading)
@@ -324,7 +339,10 @@ class AssetSystem:
                         else:
                             raise RuntimeError("AssetSystem: encountered illegal ModelResult")
 
-                case MeshResult(asset_id, vertices, indices, error):
+                case MeshResult(asset_id, vertices, indices, error, bounds):
+                    if asset_id in assets_state.freed_ids:
+                        assets_state.freed_ids.discard(asset_id)
+                        continue
                     mesh_obj = assets_state.meshes.get(asset_id)
                     if mesh_obj is None:
                         mesh_obj = Mesh(id=asset_id, status=AssetStatus.Loading)
@@ -334,9 +352,16 @@ class AssetSystem:
                         mesh_obj.status = AssetStatus.Failed
                         print(f"[AssetSystem] Error loading mesh: {error}")
                     elif vertices is not None:
-                        AssetSystem._setup_gl_mesh(mesh_obj, vertices, indices)
+                        mesh_obj.bounds = bounds
+                        if assets_state.defer_uploads:
+                            assets_state.deferred_meshes[asset_id] = (vertices, indices)
+                        else:
+                            AssetSystem._setup_gl_mesh(mesh_obj, vertices, indices)
 
                 case TextureResult(asset_id, data, format_info, is_srgb, error):
+                    if asset_id in assets_state.freed_ids:
+                        assets_state.freed_ids.discard(asset_id)
+                        continue
                     tex_obj = assets_state.textures.get(asset_id)
                     if tex_obj is None:
                         tex_obj = Texture(id=asset_id, filepath="", status=AssetStatus.Loading)
@@ -347,15 +372,254 @@ class AssetSystem:
                         print(f"[AssetSystem] Error loading texture: {error}")
                     elif data is not None and format_info is not None:
                         tex_obj.is_srgb = is_srgb
-                        AssetSystem._setup_gl_texture(tex_obj, data, format_info)
+                        if assets_state.defer_uploads:
+                            assets_state.deferred_textures[asset_id] = (data, format_info)
+                        else:
+                            AssetSystem._setup_gl_texture(tex_obj, data, format_info)
                     else:
                         raise RuntimeError("AssetSystem: encountered illegal TextureResult")
 
+    # == deferred uploads ==
+
+    @staticmethod
+    def is_settled(assets_state: AssetsState) -> bool:
+        """
+        Whether every requested asset has been processed, i.e. nothing is Loading except
+        deferred uploads.
+        """
+        if not assets_state.result_queue.empty():
+            return False
+        if any(model.status == AssetStatus.Loading for model in assets_state.models.values()):
+            return False
+        for table, deferred in (
+            (assets_state.meshes, assets_state.deferred_meshes),
+            (assets_state.textures, assets_state.deferred_textures),
+        ):
+            for asset_id, asset in table.items():
+                if asset.status == AssetStatus.Loading and asset_id not in deferred:
+                    return False
+        return True
+
+    @staticmethod
+    def upload_deferred(assets_state: AssetsState):
+        """
+        Uploads every deferred result to the current GL context and stops deferring.
+        """
+        for asset_id, (vertices, indices) in assets_state.deferred_meshes.items():
+            mesh_obj = assets_state.meshes.get(asset_id)
+            if mesh_obj is not None:
+                AssetSystem._setup_gl_mesh(mesh_obj, vertices, indices)
+        for asset_id, (data, format_info) in assets_state.deferred_textures.items():
+            tex_obj = assets_state.textures.get(asset_id)
+            if tex_obj is not None:
+                AssetSystem._setup_gl_texture(tex_obj, data, format_info)
+        assets_state.deferred_meshes.clear()
+        assets_state.deferred_textures.clear()
+        assets_state.defer_uploads = False
+
+    @staticmethod
+    def after_fork(assets_state: AssetsState):
+        """
+        Call in a forked child: the worker threads and whatever they held did not come along.
+        """
+        assets_state.workers_started = False
+        assets_state.id_lock = threading.Lock()
+        assets_state.task_queue = queue.Queue()
+        assets_state.result_queue = queue.Queue()
+
+    @staticmethod
+    def _bind_placeholders(assets_state: AssetsState, model_id: int, nodes: list[ModelNode]):
+        # placeholders take over the ids the model assigned, so results for those ids
+        # land on them. results that already arrived are copied over.
+        for node_index, slot, placeholder in assets_state.pending_model_bindings.pop(model_id, []):
+            node = nodes[node_index]
+            if slot == "mesh_id":
+                asset_id = node.mesh_id
+                table = assets_state.meshes
+            else:
+                asset_id = getattr(node.material_template, slot)
+                table = assets_state.textures
+            if asset_id is None:
+                continue
+
+            existing = table.get(asset_id)
+            if existing is not None and existing is not placeholder:
+                for f in dataclasses.fields(existing):
+                    setattr(placeholder, f.name, getattr(existing, f.name))
+            placeholder.id = asset_id
+            table[asset_id] = placeholder  # type: ignore
+
+    # == reference counting ==
+    # GPU objects live as long as something references them: attached Visuals (through the
+    # observers below), the Materials of those, or an explicit retain(). meshes and textures
+    # belonging to a loaded model are retained for as long as the model stays cached.
+
+    @staticmethod
+    def observe(registry: Registry):
+        registry.observe(
+            Visuals,
+            on_add=AssetSystem._on_visuals_added,
+            on_remove=AssetSystem._on_visuals_removed,
+            on_replace=AssetSystem._on_visuals_replaced,
+        )
+
+    @staticmethod
+    def retain(assets_state: AssetsState, asset: Mesh | Texture):
+        assets_state.ref_counts[asset] = assets_state.ref_counts.get(asset, 0) + 1
+
+    @staticmethod
+    def release(assets_state: AssetsState, asset: Mesh | Texture):
+        count = assets_state.ref_counts.get(asset, 0) - 1
+        if count > 0:
+            assets_state.ref_counts[asset] = count
+        else:
+            assets_state.ref_counts.pop(asset, None)
+            assets_state.unreferenced.append(asset)
+
+    @staticmethod
+    def set_mesh(assets_state: AssetsState, visuals: Visuals, mesh: Mesh):
+        """
+        Points `visuals` at `mesh`, moving its reference over if the Visuals is attached.
+        """
+        held = assets_state.visuals_holds.get(visuals)
+        if held is not None and held[0] is not mesh:
+            AssetSystem.retain(assets_state, mesh)
+            AssetSystem.release(assets_state, held[0])
+            assets_state.visuals_holds[visuals] = (mesh, held[1])
+        visuals.mesh = mesh
+
+    @staticmethod
+    def set_material_map(assets_state: AssetsState, material: Material, slot: str, texture: Texture | None):
+        """
+        Sets one of the `*_map` fields of `material`, moving its reference over if the
+        material is in use.
+        """
+        setattr(material, slot, texture)
+        held = assets_state.material_holds.get(material)
+        if held is not None:
+            count, textures = held
+            new_textures = AssetSystem._material_textures(material)
+            for tex in new_textures:
+                AssetSystem.retain(assets_state, tex)
+            for tex in textures:
+                AssetSystem.release(assets_state, tex)
+            assets_state.material_holds[material] = (count, new_textures)
+
+    @staticmethod
+    def collect(registry: Registry):
+        """
+        Frees the GPU objects of every asset nothing references any more. Runs at the sync
+        point, after the observers have seen the frame's changes.
+        """
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None or not assets_state.unreferenced:
+            return
+
+        unreferenced, assets_state.unreferenced = assets_state.unreferenced, []
+        for asset in unreferenced:
+            if asset in assets_state.ref_counts or asset.status == AssetStatus.Unloaded:
+                continue
+
+            deferred = assets_state.deferred_meshes if isinstance(asset, Mesh) else assets_state.deferred_textures
+            if asset.status == AssetStatus.Loading and deferred.pop(asset.id, None) is None:
+                assets_state.freed_ids.add(asset.id)
+            if isinstance(asset, Mesh):
+                if asset.vao:
+                    GL.glDeleteVertexArrays(1, [asset.vao])
+                buffers = [b for b in (asset.vbo, asset.ebo) if b]
+                if buffers:
+                    GL.glDeleteBuffers(len(buffers), buffers)
+                asset.vao = asset.vbo = asset.ebo = 0
+                table, by_path = assets_state.meshes, assets_state.filepath_to_mesh
+                assets_state.immediate_mesh_data.pop(asset.id, None)
+            else:
+                if asset.gl_id:
+                    GL.glDeleteTextures(1, [asset.gl_id])
+                asset.gl_id = None
+                table, by_path = assets_state.textures, assets_state.filepath_to_texture
+
+            asset.status = AssetStatus.Unloaded
+            if table.get(asset.id) is asset:
+                del table[asset.id]
+            if asset.filepath and by_path.get(asset.filepath) == asset.id:
+                del by_path[asset.filepath]
+
+    @staticmethod
+    def _on_visuals_added(registry: Registry, batch: list[tuple]):
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None: return
+        for _, visuals in batch:
+            AssetSystem._hold_visuals(assets_state, visuals)
+
+    @staticmethod
+    def _on_visuals_removed(registry: Registry, batch: list[tuple]):
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None: return
+        for _, visuals in batch:
+            AssetSystem._drop_visuals(assets_state, visuals)
+
+    @staticmethod
+    def _on_visuals_replaced(registry: Registry, batch: list[tuple]):
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None: return
+        for _, old, new in batch:
+            AssetSystem._hold_visuals(assets_state, new)
+            AssetSystem._drop_visuals(assets_state, old)
+
+    @staticmethod
+    def _hold_visuals(assets_state: AssetsState, visuals: Visuals):
+        if visuals in assets_state.visuals_holds:
+            return
+        AssetSystem.retain(assets_state, visuals.mesh)
+        held = assets_state.material_holds.get(visuals.material)
+        if held is not None:
+            assets_state.material_holds[visuals.material] = (held[0] + 1, held[1])
+        else:
+            textures = AssetSystem._material_textures(visuals.material)
+            for tex in textures:
+                AssetSystem.retain(assets_state, tex)
+            assets_state.material_holds[visuals.material] = (1, textures)
+        assets_state.visuals_holds[visuals] = (visuals.mesh, visuals.material)
+
+    @staticmethod
+    def _drop_visuals(assets_state: AssetsState, visuals: Visuals):
+        held = assets_state.visuals_holds.pop(visuals, None)
+        if held is None:
+            return
+        mesh, material = held
+        AssetSystem.release(assets_state, mesh)
+        count, textures = assets_state.material_holds[material]
+        if count > 1:
+            assets_state.material_holds[material] = (count - 1, textures)
+        else:
+            del assets_state.material_holds[material]
+            for tex in textures:
+                AssetSystem.release(assets_state, tex)
+
+    @staticmethod
+    def _material_textures(material: Material) -> tuple[Texture, ...]:
+        return tuple(t for t in (material.albedo_map, material.normal_map, material.roughness_map, material.metallic_map) if t is not None)
+
+    @staticmethod
+    def _retain_model_assets(assets_state: AssetsState, nodes: list[ModelNode]):
+        for node in nodes:
+            AssetSystem.retain(assets_state, AssetSystem.request_mesh(assets_state, node.mesh_id))
+            template = node.material_template
+            for tex_id, is_srgb in (
+                (template.albedo_map_id, True), (template.normal_map_id, False),
+                (template.roughness_map_id, False), (template.metallic_map_id, False),
+            ):
+                if tex_id is not None:
+                    AssetSystem.retain(assets_state, AssetSystem.request_texture(assets_state, tex_id, is_srgb=is_srgb))
+
     @staticmethod
     def create_immediate_mesh(assets_state: AssetsState, vertices: npt.NDArray[np.float32], indices: npt.NDArray[np.uint32]) -> Mesh:
         asset_id = AssetSystem.generate_id(assets_state)
         mesh = Mesh(id=asset_id, status=AssetStatus.Loading)
         assets_state.meshes[asset_id] = mesh
+        assets_state.immediate_mesh_data[asset_id] = (vertices, indices)
+        # freed at the next sync point unless something references it by then
+        assets_state.unreferenced.append(mesh)
 
         # lots of stuff come from mesh generation code that only gives
         # positions + normals + UVs. we'll just convert it on the fly
@@ -395,7 +659,8 @@ class AssetSystem:
                 asset_id=asset_id,
                 vertices=v_data,
                 indices=indices,
-                error=None
+                error=None,
+                bounds=_calculate_bounds(v_data.reshape(-1, 11)[:, 0:3]) if v_data.size % 11 == 0 else None
             )
         )
         return mesh
@@ -6,10 +6,9 @@ from entities.registry import Registry
 class BoundingBoxRenderSystem:
     @staticmethod
     def update(registry: Registry):
-        r_state = registry.get_singleton(RenderState)
-        if r_state is None:
+        render_state = registry.get_resource(RenderState)
+        if render_state is None:
             return
-        _, (render_state, ) = r_state
 
         if not render_state.show_bounding_boxes:
             return
@@ -0,0 +1,52 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from entities.components.bounds_state import BoundsState
+from entities.components.transform import TRANSFORMS, Transform
+from entities.components.visuals.assets import AssetStatus
+from entities.components.visuals.visuals import Visuals
+from entities.registry import Registry
+import math_utils
+
+
+class BoundsSystem:
+    """
+    Keeps the world-space boxes in TRANSFORMS (`bounds_minimums` / `bounds_maximums`) around
+    what entities with Visuals draw, from their model matrices and their meshes' bounds.
+    Called by RenderSystem with the entities whose matrix it just rebuilt; nothing else is
+    looked at, except entities whose mesh is still loading.
+    """
+    @staticmethod
+    def update(registry: Registry, drawn: Iterable[Tuple[Transform, Visuals]]) -> None:
+        state = registry.get_resource(BoundsState)
+        todo: Dict[int, Tuple[Transform, Visuals]] = state.pending if state is not None else {}
+        for transform, visuals in drawn:
+            todo[transform.row] = (transform, visuals)
+
+        pending: Dict[int, Tuple[Transform, Visuals]] = {}
+        rows: List[int] = []
+        minimums: List[np.ndarray] = []
+        maximums: List[np.ndarray] = []
+        empty: List[int] = []
+        for row, (transform, visuals) in todo.items():
+            bounds = visuals.mesh.bounds
+            if bounds is None:
+                empty.append(row)
+                if visuals.mesh.status == AssetStatus.Loading:
+                    pending[row] = (transform, visuals)
+                continue
+            rows.append(row)
+            minimums.append(bounds.minimum)
+            maximums.append(bounds.maximum)
+
+        if empty:
+            TRANSFORMS.bounds_minimums[empty] = np.inf
+            TRANSFORMS.bounds_maximums[empty] = -np.inf
+        if rows:
+            TRANSFORMS.bounds_minimums[rows], TRANSFORMS.bounds_maximums[rows] = math_utils.batch_transform_aabb(
+                TRANSFORMS.matrices[rows], np.array(minimums), np.array(maximums)
+            )
+        if state is not None:
+            state.pending = pending
+            state.boxes_updated = len(rows)
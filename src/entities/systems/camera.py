@@ -13,11 +13,11 @@ import math_utils
 class CameraSystem:
     @staticmethod
     def update(registry: Registry, window_size: tuple[int, int], time: float, delta_time: float):
-        r_camera_state = registry.get_singleton(CameraState)
+        camera_state = registry.get_resource(CameraState)
+        camera_state_entity = registry.get_resource_entity(CameraState)
 
-        if r_camera_state is None:
+        if camera_state is None or camera_state_entity is None:
             raise RuntimeError("CameraSystem is missing a CameraState singleton")
-        camera_state_entity, (camera_state, ) = r_camera_state
 
         parent_entity = registry.get_parent(camera_state_entity)
 
@@ -38,8 +38,8 @@ class CameraSystem:
             camera_state.last_camera_id = parent_entity
 
         io = imgui.get_io()
-        r_gizmo = registry.get_singleton(GizmoState)
-        gizmo_dragging = r_gizmo[1][0].is_dragging if r_gizmo else False
+        gizmo_state = registry.get_resource(GizmoState)
+        gizmo_dragging = gizmo_state.is_dragging if gizmo_state else False
 
         if gizmo_dragging:
             camera_state.is_rotating = False
@@ -89,6 +89,7 @@ class CameraSystem:
             new_rot = math_utils.quaternion_mul(q_yaw, new_rot)
 
             camera_transform.local.rotation = math_utils.normalize(new_rot)  # type: ignore
+            registry.mark_changed(parent_entity, Transform)
 
         # recalculate since the code directly above us definitely changed the rotation
         cam_rot_matrix = math_utils.create_transformation_matrix(
@@ -125,6 +126,7 @@ class CameraSystem:
         if is_input_active:
             camera.focal_point_distance = max(0.1, camera.focal_point_distance)
             camera_transform.local.position = camera_state.focal_point + (backward * camera.focal_point_distance)  # type: ignore
+            registry.mark_changed(parent_entity, Transform)
         else:
             CameraSystem.sync_focal_point(camera_state, camera, camera_transform)
 
@@ -142,7 +144,7 @@ class CameraSystem:
         window_width, window_height = window_size
         aspect_ratio = window_width / window_height
 
-        camera_state.camera_position = camera_transform.world.position
+        camera_state.camera_position = camera_transform.world.position.copy()
         camera_state.camera_near = camera.near
         camera_state.camera_far = camera.far
         camera_state.front = front
@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, FrozenSet, List, Sequence, Set, Tuple, Type
+
+from entities.components.command_buffer import AddComponents, CommandBuffer, CreateEntities, RemoveComponents, SetParent
+from entities.registry import Registry
+
+
+class CommandBufferSystem:
+    # == recording ==
+    # these are safe to call while iterating the registry, and from any thread.
+    # created entities get their handles right away, so later commands can refer to them.
+
+    @staticmethod
+    def create_entity(registry: Registry, buffer: CommandBuffer, *components: Any, parent: int | None = None) -> int:
+        (entity, ) = registry.reserve_entities(1)
+        buffer.commands.append(CreateEntities([entity], tuple([c] for c in components), parent))
+        return entity
+
+    @staticmethod
+    def create_entities(
+        registry: Registry, buffer: CommandBuffer, count: int,
+        *columns: Sequence[Any] | Callable[[int], Any], parent: int | None = None
+    ) -> list[int]:
+        entities = registry.reserve_entities(count)
+        buffer.commands.append(CreateEntities(entities, columns, parent))
+        return entities
+
+    @staticmethod
+    def add_components(buffer: CommandBuffer, entity: int, *components: Any) -> None:
+        buffer.commands.append(AddComponents(entity, components))
+
+    @staticmethod
+    def remove_components(buffer: CommandBuffer, entity: int, *comp_types: Type[Any]) -> None:
+        buffer.commands.append(RemoveComponents(entity, comp_types))
+
+    @staticmethod
+    def set_parent(buffer: CommandBuffer, child: int, parent: int | None) -> None:
+        buffer.commands.append(SetParent(child, parent))
+
+    # == applying ==
+
+    @staticmethod
+    def update(registry: Registry) -> None:
+        for _, (buffer, ) in registry.view(CommandBuffer):
+            CommandBufferSystem.apply(registry, buffer)
+
+    @staticmethod
+    def apply(registry: Registry, buffer: CommandBuffer) -> None:
+        commands = buffer.commands
+        if not commands:
+            return
+        buffer.commands = []
+
+        # == coalesce ==
+        # commands are folded per entity first, so every entity moves archetype at most
+        # once and new entities go straight into their final archetype in bulk.
+        touched: Set[int] = {c.entity for c in commands if isinstance(c, (AddComponents, RemoveComponents))}
+
+        created: Dict[int, Dict[Type[Any], Any]] = {}
+        created_parents: Dict[int, int] = {}
+        batches: List[CreateEntities] = []
+        deltas: Dict[int, Tuple[Dict[Type[Any], Any], Set[Type[Any]]]] = {}
+        parenting: List[Tuple[int, int | None]] = []
+
+        for command in commands:
+            if isinstance(command, CreateEntities):
+                if touched.isdisjoint(command.entities):
+                    batches.append(command)
+                    continue
+                # some of these are modified before they exist: build them one by one
+                count = len(command.entities)
+                columns = [[column(i) for i in range(count)] if callable(column) else list(column) for column in command.columns]
+                for i, entity in enumerate(command.entities):
+                    created[entity] = {type(values[i]): values[i] for values in columns}
+                    if command.parent is not None:
+                        created_parents[entity] = command.parent
+                        parenting.append((entity, command.parent))
+
+            elif isinstance(command, AddComponents):
+                pending = created.get(command.entity)
+                if pending is not None:
+                    pending.update((type(c), c) for c in command.components)
+                    continue
+                added, removed = deltas.setdefault(command.entity, ({}, set()))
+                for c in command.components:
+                    added[type(c)] = c
+                    removed.discard(type(c))
+
+            elif isinstance(command, RemoveComponents):
+                pending = created.get(command.entity)
+                if pending is not None:
+                    for comp_type in command.comp_types:
+                        pending.pop(comp_type, None)
+                    continue
+                added, removed = deltas.setdefault(command.entity, ({}, set()))
+                for comp_type in command.comp_types:
+                    added.pop(comp_type, None)
+                    removed.add(comp_type)
+
+            else:
+                parenting.append((command.child, command.parent))
+
+        # == new entities ==
+        # entities whose parent went away before the flush are never created at all, nor are
+        # their created children, however they were recorded
+        upcoming: Set[int] = set(created)
+        for batch in batches:
+            upcoming.update(batch.entities)
+        dropped: Set[int] = set()
+
+        def gone(parent: int) -> bool:
+            return parent in dropped or (parent not in upcoming and not registry.is_alive(parent))
+
+        dropping = True
+        while dropping:
+            dropping = False
+            for entity, parent in created_parents.items():
+                if entity not in dropped and gone(parent):
+                    dropped.add(entity)
+                    dropping = True
+            for batch in batches:
+                if batch.parent is not None and batch.entities and batch.entities[0] not in dropped and gone(batch.parent):
+                    dropped.update(batch.entities)
+                    dropping = True
+        if dropped:
+            registry.release_reserved(dropped)
+
+        groups: Dict[FrozenSet[Type[Any]], List[int]] = {}
+        for entity, components in created.items():
+            if entity not in dropped:
+                groups.setdefault(frozenset(components), []).append(entity)
+        for entities in groups.values():
+            comp_types = list(created[entities[0]])
+            columns = [[created[e][t] for e in entities] for t in comp_types]
+            registry.create_entities(len(entities), *columns, reserved=entities)
+
+        for batch in batches:
+            if batch.entities and batch.entities[0] in dropped:
+                continue
+            registry.create_entities(len(batch.entities), *batch.columns, parent=batch.parent, reserved=batch.entities)
+
+        # == existing entities ==
+        changes: Dict[Tuple[FrozenSet[Type[Any]], FrozenSet[Type[Any]]], Tuple[List[int], List[Dict[Type[Any], Any]]]] = {}
+        for entity, (added, removed) in deltas.items():
+            entities, components = changes.setdefault((frozenset(removed), frozenset(added)), ([], []))
+            entities.append(entity)
+            components.append(added)
+        for (removed_types, _), (entities, components) in changes.items():
+            registry.restructure_entities(entities, removed_types, components)
+
+        # == hierarchy ==
+        for child, parent in parenting:
+            if not registry.is_alive(child) or (parent is not None and not registry.is_alive(parent)):
+                continue
+            registry.set_parent(child, parent)
@@ -6,34 +6,38 @@ from entities.registry import Registry
 class DisposalSystem:
     @staticmethod
     def update(registry: Registry) -> None:
-        r_disposal = registry.get_singleton(Disposal)
-        if not r_disposal:
+        disposal = registry.get_resource(Disposal)
+        if disposal is None:
             raise RuntimeError("DisposalSystem is missing a Disposal singleton")
 
-        _, (disposal, ) = r_disposal
         if not disposal.entities_to_dispose:
             return
 
-        to_dispose: set[int] = set(disposal.entities_to_dispose)
-        stack: list[int] = list(to_dispose)
-
-        while stack:
-            current = stack.pop()
-            children = registry.get_children(current)
-
-            for child in children:
-                if child in to_dispose:
-                    continue
-
-                dispose_child = True
-                r_flags = registry.get_components(child, EntityFlags)
-                if r_flags is not None:
-                    (flags, ) = r_flags
-                    dispose_child = flags.dispose_alongside_parent
-
-                if dispose_child:
-                    to_dispose.add(child)
-                    stack.append(child)
+        # an entity may have been queued twice across frames; its handle is stale by now
+        queued: set[int] = {e for e in disposal.entities_to_dispose if registry.is_alive(e)}
+        to_dispose: set[int] = set()
+
+        # every queued subtree is a contiguous range of the hierarchy. children that don't go
+        # with their parent are skipped along with their own range. ancestors come first, so a
+        # queued entity inside an earlier range has been walked already.
+        hierarchy = registry.hierarchy()
+        for start in sorted(hierarchy.position(e) for e in queued):
+            if int(hierarchy.entities[start]) in to_dispose:
+                continue
+            end = int(hierarchy.ends[start])
+            entities = hierarchy.entities[start:end].tolist()
+            ends = hierarchy.ends[start:end].tolist()
+
+            i = 0
+            while i < len(entities):
+                entity = entities[i]
+                if i > 0 and entity not in queued:
+                    r_flags = registry.get_components(entity, EntityFlags)
+                    if r_flags is not None and not r_flags[0].dispose_alongside_parent:
+                        i = ends[i] - start
+                        continue
+                to_dispose.add(entity)
+                i += 1
 
         for entity in to_dispose:
             children = registry.get_children(entity)
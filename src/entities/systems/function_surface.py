@@ -11,15 +11,16 @@ from entities.systems.assets import AssetSystem
 class FunctionSurfaceSystem:
     @staticmethod
     def update(registry: Registry, time: float, delta_time: float):
-        r_admin = registry.get_singleton(AssetsState)
-        if r_admin is None:
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None:
             return
-        admin_entity, (assets_state, ) = r_admin
 
         for entity, (transform, visuals, fun) in registry.view(Transform, Visuals, SurfaceFunction):
             if not fun.generated and not fun.expression_dirty:
                 FunctionSurfaceSystem._generate_mesh(assets_state, visuals, fun)
                 fun.generated = True
+                # the new mesh has other bounds
+                registry.mark_changed(entity, Visuals)
 
     @staticmethod
     def _generate_mesh(assets_state: AssetsState, visuals: Visuals, fun: SurfaceFunction):
@@ -89,4 +90,4 @@ class FunctionSurfaceSystem:
         indices_flat = np.concatenate(
             [tris1, tris2], axis=0).flatten().astype(np.uint32)
 
-        visuals.mesh = AssetSystem.create_immediate_mesh(assets_state, vertices_flat, indices_flat)
+        AssetSystem.set_mesh(assets_state, visuals, AssetSystem.create_immediate_mesh(assets_state, vertices_flat, indices_flat))
@@ -17,15 +17,14 @@ from math_utils import (
 class GizmoSystem:
     @staticmethod
     def update(registry: Registry, window_size: tuple[int, int]):
-        r_admin = registry.get_singleton(GizmoState, UiState)
-        if r_admin is None:
+        gizmo_state = registry.get_resource(GizmoState)
+        ui_state = registry.get_resource(UiState)
+        if gizmo_state is None or ui_state is None:
             return
-        _, (gizmo_state, ui_state) = r_admin
 
-        r_camera_state = registry.get_singleton(CameraState)
-        if r_camera_state is None:
+        camera_state = registry.get_resource(CameraState)
+        if camera_state is None:
             return
-        _, (camera_state, ) = r_camera_state
 
         selected_entity = registry.get_parent(ui_state.selection_child_entity)
         if selected_entity is None:
@@ -137,6 +136,7 @@ class GizmoSystem:
                     GizmoSystem._apply_translation(gizmo_state, transform, camera_state, window_size, mouse_position)
                 elif gizmo_state.mode == GizmoMode.Rotate:
                     GizmoSystem._apply_rotation(gizmo_state, transform, camera_state, window_size, mouse_position)
+                registry.mark_changed(selected_entity, Transform)
 
         # == render the visual gizmo ==
         if not gizmo_too_close:
@@ -16,15 +16,18 @@ from math_utils import float1, vec3, create_transformation_matrix
 class GradientDescentSurfaceSystem:
     @staticmethod
     def update(registry: Registry, time: float, delta_time: float):
-        r_admin = registry.get_singleton(GizmoState, UiState, AssetsState)
-        if r_admin is None:
+        gizmo_state = registry.get_resource(GizmoState)
+        ui_state = registry.get_resource(UiState)
+        assets_state = registry.get_resource(AssetsState)
+        if gizmo_state is None or ui_state is None or assets_state is None:
             return
-        admin_entity, (gizmo_state, ui_state, assets_state, ) = r_admin
 
         for g_entity, (g_transform, g_visuals, g_surface) in registry.view(Transform, Visuals, GradientDescentSurface):
             if g_surface.dirty:
                 GradientDescentSurfaceSystem._generate_mesh(assets_state, g_visuals, g_surface)
                 g_surface.dirty = False
+                # the new mesh has other bounds
+                registry.mark_changed(g_entity, Visuals)
 
             do_step = False
             if g_surface.is_running:
@@ -33,16 +36,9 @@ class GradientDescentSurfaceSystem:
                     do_step = True
                     g_surface.step_timer = 0.0
 
-            children = registry.get_children(g_entity)
-
             m_surf = create_transformation_matrix(g_transform.world.position, g_transform.world.rotation, g_transform.world.scale)
 
-            for o_entity in children:
-                r_optimizer = registry.get_components(o_entity, Transform, OptimizerState)
-                if r_optimizer is None:
-                    continue
-                o_transform, o_optimizer = r_optimizer
-
+            for o_entity, (o_transform, o_optimizer) in registry.view_children(g_entity, Transform, OptimizerState):
                 # skip movement if being dragged by gizmo, but still snap to surface Y
                 local_x = o_transform.local.position[0]
                 local_z = o_transform.local.position[2]
@@ -81,6 +77,7 @@ class GradientDescentSurfaceSystem:
                 ) * g_surface.y_scale)
 
                 o_transform.local.position = vec3(local_x, local_y, local_z)
+                registry.mark_changed(o_entity, Transform)
 
                 if do_step:
                     pos_world = m_surf @ np.array([local_x, local_y, local_z, 1.0], dtype=np.float32)
@@ -172,4 +169,4 @@ class GradientDescentSurfaceSystem:
         tris2 = np.stack([i2, i3, i4], axis=-1)
         indices_flat = np.concatenate([tris1, tris2], axis=0).flatten().astype(np.uint32)
 
-        visuals.mesh = AssetSystem.create_immediate_mesh(assets_state, vertices_flat, indices_flat)
+        AssetSystem.set_mesh(assets_state, visuals, AssetSystem.create_immediate_mesh(assets_state, vertices_flat, indices_flat))
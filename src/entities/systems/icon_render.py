@@ -7,7 +7,7 @@ from entities.components.ui.icon_render_state import IconRenderState
 from entities.components.point_light import PointLight
 from entities.components.ui.ui_state import UiState
 from entities.components.camera import Camera
-from entities.components.transform import Transform, TransformData
+from entities.components.transform import Transform, TransformDataView
 from entities.components.render_state import RenderState
 from entities.registry import Registry
 
@@ -15,15 +15,16 @@ from entities.registry import Registry
 class IconRenderSystem:
     @staticmethod
     def update(registry: Registry, window_size: tuple[int, int]):
-        r_admin = registry.get_singleton(IconRenderState, RenderState, UiState)
-        if r_admin is None:
-            raise RuntimeError("IconRenderSystem is missing a (IconRenderState, RenderState, UiState) singleton")
-        _, (icon_render_state, render_state, ui_state) = r_admin
-
-        r_camera_state = registry.get_singleton(CameraState)
-        if r_camera_state is None:
+        icon_render_state = registry.get_resource(IconRenderState)
+        render_state = registry.get_resource(RenderState)
+        ui_state = registry.get_resource(UiState)
+        if icon_render_state is None or render_state is None or ui_state is None:
+            raise RuntimeError("IconRenderSystem is missing a (IconRenderState, RenderState, UiState) resource")
+
+        camera_state = registry.get_resource(CameraState)
+        camera_state_entity = registry.get_resource_entity(CameraState)
+        if camera_state is None or camera_state_entity is None:
             raise RuntimeError("IconRenderSystem is missing a CameraState singleton")
-        camera_state_entity, (camera_state, ) = r_camera_state
 
         camera_parent = registry.get_parent(camera_state_entity)
         selected_entity = registry.get_parent(ui_state.selection_child_entity)
@@ -53,7 +54,7 @@ class IconRenderSystem:
     @staticmethod
     def _draw_entity_icon(
         draw_list: imgui.ImDrawList,
-        transform: TransformData, view_projection_matrix: npt.NDArray[np.float32],
+        transform: TransformDataView, view_projection_matrix: npt.NDArray[np.float32],
         window_size: tuple[int, int],
         selected: bool, icon: str,
         color: npt.NDArray[np.float32]
@@ -1,6 +1,7 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Sequence, Tuple
 import ctypes
+import itertools
 import shutil
 
 import numpy as np
@@ -10,6 +11,7 @@ import PIL.Image as Image
 
 from engine.application import Application
 from entities.components.camera_state import CameraState
+from entities.components.disabled import Disabled
 from entities.components.entity_flags import EntityFlags
 from entities.components.street_scene.vehicle import Vehicle
 from entities.components.street_scene.building import Building
@@ -17,17 +19,31 @@ from entities.components.street_scene.environment import Environment
 from entities.components.gd.optimizer_state import OptimizerState
 from entities.components.visuals.assets import Mesh, AssetStatus
 from entities.components.render_state import RenderState, GlobalDrawMode, BoundingBox
+from entities.components.simulation_state import SimulationState
 from entities.components.point_light import PointLight
 from entities.components.directional_light import DirectionalLight
-from entities.components.transform import Transform
+from entities.components.transform import TRANSFORMS, Transform, TransformStore
 from entities.components.visuals.visuals import Visuals, DrawMode
+from entities.query import Query
 from entities.registry import Registry
+from entities.systems.bounds import BoundsSystem
 from visuals.shader import Shader, ShaderGlobals
 from visuals.shaders import flat_shader, tf2_ggx_hammon, debug_depth_shader, id_shader
 import math_utils
 
 
 class RenderSystem:
+    VISIBLE = Query(Transform, Visuals, without=(Disabled, ))
+    # entities the segmentation pass tells apart, each drawn along with its visible children.
+    # one query per class rather than any_of=, so they're drawn in the same order every frame
+    CLASSIFIED = tuple(Query(Transform, with_=(tag, ), without=(Disabled, )) for tag in (Vehicle, Building, Environment))
+    # segmentation classes by class id, and the color each is drawn with in exported maps
+    CLASS_NAMES = ("Environment", "Vehicle", "Building")
+    CLASS_COLORS = np.array([[0, 0, 0], [255, 0, 0], [0, 255, 0]], dtype=np.uint8)
+    # vertex attributes read per instance, see the shaders
+    INSTANCE_MODEL_LOCATION = 4
+    INSTANCE_ID_LOCATION = 8
+
     def __init__(self):
         # == unorthodox: global state ==
         self.shader_globals = ShaderGlobals()
@@ -59,12 +75,20 @@ class RenderSystem:
         GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
 
         self.fbo_size = (0, 0)
+        # store row -> entity drawn between two simulation ticks last frame
+        self._interpolated: dict[int, Tuple[Transform, Visuals]] = {}
 
         # == dynamic line rendering setup ==
         # very unorthodox, but we have deadlines to meet
         self.line_vao = GL.glGenVertexArrays(1)
         self.line_vbo = GL.glGenBuffers(1)
 
+        # == instancing setup ==
+        # model matrices (and entity ids, for the segmentation pass) of every instance a pass draws,
+        # uploaded once per pass. each group of instances reads its own range of them.
+        self.instance_matrix_vbo = GL.glGenBuffers(1)
+        self.instance_id_vbo = GL.glGenBuffers(1)
+
     def _setup_fullscreen_quad(self):
         quad_data = np.array([
             -1.0, -1.0, 0.0, 0.0,
@@ -151,32 +175,84 @@ class RenderSystem:
         # reuse resolve depth texture (segmentation is not multisampled for simplicity in this renderer)
         GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_TEXTURE_2D, self.resolve_depth_tex, 0)
 
-    def _draw_mesh(self, mesh: Mesh):
-        if mesh.status != AssetStatus.Ready:
+    def _upload_instances(self, rows: npt.NDArray[np.int64], entity_ids: npt.NDArray[np.uint32] | None = None):
+        if not len(rows):
             return
-
+        # a mat4 attribute takes a column per location, the store keeps matrices by rows
+        matrices = np.ascontiguousarray(TRANSFORMS.matrices[rows].transpose(0, 2, 1))
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_matrix_vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, matrices.nbytes, matrices, GL.GL_STREAM_DRAW)
+        if entity_ids is not None:
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_id_vbo)
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, entity_ids.nbytes, entity_ids, GL.GL_STREAM_DRAW)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+    def _draw_instances(self, mesh: Mesh, first: int, count: int, with_ids: bool = False):
+        # draws `count` instances of the mesh, from instance `first` of the last upload.
+        # the attributes are pointed at the range every call rather than using a base instance,
+        # which the 4.1 contexts on macOS don't have.
         GL.glBindVertexArray(mesh.vao)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_matrix_vbo)
+        for column in range(4):
+            location = RenderSystem.INSTANCE_MODEL_LOCATION + column
+            GL.glEnableVertexAttribArray(location)
+            GL.glVertexAttribPointer(location, 4, GL.GL_FLOAT, GL.GL_FALSE, 64, ctypes.c_void_p(first * 64 + column * 16))
+            GL.glVertexAttribDivisor(location, 1)
+        if with_ids:
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_id_vbo)
+            GL.glEnableVertexAttribArray(RenderSystem.INSTANCE_ID_LOCATION)
+            GL.glVertexAttribIPointer(RenderSystem.INSTANCE_ID_LOCATION, 1, GL.GL_UNSIGNED_INT, 4, ctypes.c_void_p(first * 4))
+            GL.glVertexAttribDivisor(RenderSystem.INSTANCE_ID_LOCATION, 1)
+        else:
+            GL.glDisableVertexAttribArray(RenderSystem.INSTANCE_ID_LOCATION)
+
         if mesh.has_indices:
-            GL.glDrawElements(GL.GL_TRIANGLES, mesh.indices_count, GL.GL_UNSIGNED_INT, None)
+            GL.glDrawElementsInstanced(GL.GL_TRIANGLES, mesh.indices_count, GL.GL_UNSIGNED_INT, None, count)
         else:
-            GL.glDrawArrays(GL.GL_TRIANGLES, 0, mesh.vertex_count)
+            GL.glDrawArraysInstanced(GL.GL_TRIANGLES, 0, mesh.vertex_count, count)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
         GL.glBindVertexArray(0)
 
+    @staticmethod
+    def _group_instances(
+        pairs: Sequence[Tuple[Transform, Visuals]], by_material: bool, instancing: bool
+    ) -> list[Tuple[Visuals, list[int]]]:
+        # indices into `pairs` of each group sharing a mesh, and a material if by_material, with
+        # the visuals of its first. groups are in the order they're first seen; without
+        # instancing every pair is a group of its own. meshes that aren't ready are left out.
+        groups: dict[object, Tuple[Visuals, list[int]]] = {}
+        for i, (_, visuals) in enumerate(pairs):
+            if visuals.mesh.status != AssetStatus.Ready:
+                continue
+            key = (visuals.mesh, visuals.material if by_material else None) if instancing else i
+            group = groups.get(key)
+            if group is None:
+                groups[key] = group = (visuals, [])
+            group[1].append(i)
+        return list(groups.values())
+
     def _attach_shader_globals_to(self, shader: Shader):
         self.shader_globals.attach_to(shader)
 
     @staticmethod
-    def _get_classification_and_color(registry: Registry, entity_id: int) -> Tuple[int, str, list[int]]:
-        if registry.get_components(entity_id, Vehicle):
-            return 1, "Vehicle", [255, 0, 0]
-        if registry.get_components(entity_id, Building):
-            return 2, "Building", [0, 255, 0]
-        if registry.get_components(entity_id, Environment):
-            return 0, "Environment", [0, 0, 0]
-        return 0, "Environment", [0, 0, 0]  # default
+    def track_classes(registry: Registry) -> None:
+        """
+        Has the registry keep the tag bitset _classify() reads. Call once after creating it.
+        """
+        registry.track_tags(Vehicle, Building, Environment)
+
+    @staticmethod
+    def _classify(registry: Registry, entity_ids: npt.NDArray[np.integer]) -> npt.NDArray[np.int64]:
+        # class id of every entity at once; vehicles win over buildings, anything else
+        # (including the background, 0) is environment
+        bits = registry.tag_bits(entity_ids)
+        class_ids = np.zeros(len(bits), dtype=np.int64)
+        class_ids[(bits & registry.tag_mask(Building)) != 0] = 2
+        class_ids[(bits & registry.tag_mask(Vehicle)) != 0] = 1
+        return class_ids
 
     def _export_dataset_frame(self, registry: Registry, width, height, render_state: RenderState, camera_state: CameraState, frame_name: str, segmentation_ids: np.ndarray):
-        base_path = Path("dataset")
+        base_path = Path(render_state.dataset_path)
 
         rgb_dir = base_path / "images"
         depth_dir = base_path / "depth"
@@ -218,25 +294,23 @@ class RenderSystem:
 
         # == yolo labels ==
         yolo_lines = []
+        class_ids = self._classify(registry, np.array([bbox.entity_id for bbox in render_state.bounding_boxes], dtype=np.int64))
 
-        for bbox in render_state.bounding_boxes:
+        for bbox, class_id in zip(render_state.bounding_boxes, class_ids.tolist()):
             x_center = (bbox.min_x + bbox.max_x) / 2.0
             y_center = (bbox.min_y + bbox.max_y) / 2.0
             w, h = (bbox.max_x - bbox.min_x), (bbox.max_y - bbox.min_y)
 
-            class_id, _, _ = self._get_classification_and_color(registry, bbox.entity_id)
             yolo_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w:.6f} {h:.6f}\n")
 
         with open(label_dir / f"{frame_name}.txt", "w") as f:
             f.writelines(yolo_lines)
 
         # == segmentation map ==
-        seg_rgb = np.zeros((height, width, 3), dtype=np.uint8)
-        for entity_id in np.unique(segmentation_ids):
-            if entity_id == 0: continue  # skip background
-
-            _, _, color = self._get_classification_and_color(registry, int(entity_id))
-            seg_rgb[segmentation_ids == entity_id] = color
+        # classify each visible id once, then color every pixel through its id's class
+        visible_entity_ids, pixel_ids = np.unique(segmentation_ids, return_inverse=True)
+        pixel_classes = self._classify(registry, visible_entity_ids)[pixel_ids.reshape((height, width))]
+        seg_rgb = self.CLASS_COLORS[pixel_classes]
 
         img_seg = Image.fromarray(seg_rgb, mode="RGB")
         img_seg.transpose(Image.Transpose.FLIP_TOP_BOTTOM).save(seg_dir / f"{frame_name}.png")
@@ -259,48 +333,46 @@ class RenderSystem:
 
         # == process visible entities ==
         render_state.bounding_boxes.clear()
-        # get all unique IDs currently on screen
+        # get all unique IDs currently on screen, and for every pixel the index of its ID
         # npt.NDArray[np.uint32], 1D shape
-        visible_entity_ids = np.unique(id_buffer)
-
-        for entity_id in visible_entity_ids:
-            if entity_id == 0:
-                continue  # skip background
-
-            class_id, class_name, _ = self._get_classification_and_color(registry, int(entity_id))
-            if class_id == 0:  
-                continue  # skip environment
-
-            # == calculate pixel bounds ==
-            # boolean mask of just this entity's pixels
-            entity_pixel_mask = (id_buffer == entity_id)
-
-            # squash 2D mask to 1D arrays to locate filled rows/cols
-            has_entity_pixels_in_row = np.any(entity_pixel_mask, axis=1)  # npt.NDArray[bool], 1D shape
-            has_entity_pixels_in_column = np.any(entity_pixel_mask, axis=0)  # npt.NDArray[bool], 1D shape
-
-            # npt.NDArray[np.uint32], (1, N) shape before the [0] indexing
-            # contains indices of `True`s from above arrays
-            occupied_rows = np.where(has_entity_pixels_in_row)[0]
-            occupied_columns = np.where(has_entity_pixels_in_column)[0]
-
-            if occupied_rows.size == 0 or occupied_columns.size == 0:
-                # mask is empty (?!)
-                continue
-
-            # extract the extreme edges (min/max pixel coordinates)
-            bottom_row_index, top_row_index = occupied_rows[0], occupied_rows[-1]
-            left_column_index, right_column_index = occupied_columns[0], occupied_columns[-1]
+        visible_entity_ids, pixel_ids = np.unique(id_buffer, return_inverse=True)
+        pixel_ids = pixel_ids.ravel()
+
+        # class 0 (the background and environment) gets no box
+        class_ids = self._classify(registry, visible_entity_ids)
+
+        # == calculate pixel bounds ==
+        # pixels of classified entities, grouped by entity. pixels are in row-major order and
+        # the sort is stable, so each group's rows are ascending
+        pixels = np.flatnonzero(class_ids[pixel_ids])
+        if pixels.size == 0:
+            return id_buffer
+        groups = pixel_ids[pixels]
+        order = np.argsort(groups, kind="stable")
+        pixels, groups = pixels[order], groups[order]
+        starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+        ends = np.append(starts[1:], len(pixels))
+
+        rows, columns = np.divmod(pixels, width)
+        bottom_rows, top_rows = rows[starts], rows[ends - 1]
+        left_columns = np.minimum.reduceat(columns, starts)
+        right_columns = np.maximum.reduceat(columns, starts)
+
+        for group, bottom_row_index, top_row_index, left_column_index, right_column_index in zip(
+            groups[starts].tolist(), bottom_rows.tolist(), top_rows.tolist(), left_columns.tolist(), right_columns.tolist()
+        ):
+            entity_id = int(visible_entity_ids[group])
+            class_name = self.CLASS_NAMES[class_ids[group]]
 
             # == fetch metadata and store ==
             name = "Unknown"
-            flags_comps = registry.get_components(int(entity_id), EntityFlags)
+            flags_comps = registry.get_components(entity_id, EntityFlags)
             if flags_comps:
                 name = flags_comps[0].name
 
             # append box: normalize to 0.0-1.0 UV space (and flip Y axis for top-left origin)
             render_state.bounding_boxes.append(BoundingBox(
-                entity_id=int(entity_id),
+                entity_id=entity_id,
                 name=name,
                 classification_name=class_name,
                 min_x=float(left_column_index) / width,
@@ -314,12 +386,61 @@ class RenderSystem:
     @staticmethod
     def _find_visual_children(registry: Registry, entity: int) -> list[Tuple[int, Transform, Visuals]]:
         results = []
-        children = registry.get_children(entity)
-        for child in children:
-            comps = registry.get_components(child, Transform, Visuals)
-            if comps:
-                results.append((child, comps[0], comps[1]))
-            results.extend(RenderSystem._find_visual_children(registry, child))
+        for child, (transform, visuals) in registry.view_descendants(entity, Transform, Visuals):
+            if registry.is_enabled(child):
+                results.append((child, transform, visuals))
+        return results
+
+    @staticmethod
+    def _cull(
+        render_state: RenderState, camera_state: CameraState, visible: list[Tuple[Transform, Visuals]]
+    ) -> Tuple[list[Tuple[Transform, Visuals]], npt.NDArray[np.bool_]]:
+        # returns what to draw, and which store rows were culled
+        culled = np.zeros(TRANSFORMS.capacity, dtype=np.bool_)
+        if not render_state.freeze_culling_frustum:
+            render_state.frozen_view_projection = None
+        elif render_state.frozen_view_projection is None:
+            render_state.frozen_view_projection = camera_state.view_projection_matrix.copy()
+
+        render_state.culling_tested = len(visible)
+        render_state.culling_culled = 0
+        render_state.culling_drawn = len(visible)
+        if not render_state.frustum_culling or not visible:
+            return visible, culled
+
+        view_projection = render_state.frozen_view_projection
+        if view_projection is None:
+            view_projection = camera_state.view_projection_matrix
+        rows = TransformStore.rows(transform for transform, _ in visible)
+        minimums = TRANSFORMS.bounds_minimums[rows]
+        maximums = TRANSFORMS.bounds_maximums[rows]
+        # boxes are empty until the mesh has bounds; nothing says those are outside
+        known = np.all(minimums <= maximums, axis=1)
+        inside = np.ones(len(rows), dtype=np.bool_)
+        inside[known] = math_utils.batch_aabb_in_frustum(
+            math_utils.frustum_planes(view_projection), minimums[known], maximums[known]
+        )
+        culled[rows[~inside]] = True
+
+        drawn = list(itertools.compress(visible, inside.tolist()))
+        render_state.culling_culled = len(visible) - len(drawn)
+        render_state.culling_drawn = len(drawn)
+        return drawn, culled
+
+    @staticmethod
+    def _simulated(registry: Registry) -> dict[int, Tuple[Transform, Visuals]]:
+        simulation = registry.get_resource(SimulationState)
+        if simulation is None or not simulation.interpolate:
+            return {}
+        # moved entities may have been removed since
+        transforms = registry.get_components_of_type(Transform)
+        visuals = registry.get_components_of_type(Visuals)
+        results = {}
+        for entity in simulation.moved:
+            transform = transforms.get(entity)
+            entity_visuals = visuals.get(entity)
+            if transform is not None and entity_visuals is not None:
+                results[transform.row] = (transform, entity_visuals)
         return results
 
     @staticmethod
@@ -340,15 +461,13 @@ class RenderSystem:
         self._setup_fbos(width, height)
 
         # == camera state setup ==
-        r_admin = registry.get_singleton(RenderState)
-        if r_admin is None:
+        render_state = registry.get_resource(RenderState)
+        if render_state is None:
             raise RuntimeError("RenderSystem is missing a RenderState singleton")
-        admin_entity, (render_state, ) = r_admin
 
-        r_camera_state = registry.get_singleton(CameraState)
-        if r_camera_state is None:
+        camera_state = registry.get_resource(CameraState)
+        if camera_state is None:
             raise RuntimeError("RenderSystem is missing a CameraState singleton")
-        camera_state_entity, (camera_state, ) = r_camera_state
 
         # == lights setup ==
         active_point_lights: list[Tuple[Transform, PointLight]] = []
@@ -387,21 +506,73 @@ class RenderSystem:
         num_point_lights = len(point_light_positions)
         num_dir_lights = len(dir_light_directions)
 
+        # == model matrices ==
+        # only transforms that moved since the last frame need their matrix rebuilt, all in one
+        # go on the store's columns. the main and segmentation passes both draw with these.
+        with registry.change_scope(RenderSystem) as since:
+            changed = {
+                transform.row: (transform, visuals)
+                for _, (transform, visuals) in registry.view(Transform, Visuals, changed=(Transform, Visuals), since=since)
+            }
+            # what the last simulation tick moved is drawn part way between that tick and the one
+            # before, every frame, and at its latest transform once it stops moving
+            interpolated = RenderSystem._simulated(registry)
+            for row, drawn in self._interpolated.items():
+                changed.setdefault(row, drawn)
+            for row in interpolated:
+                changed.pop(row, None)
+            self._interpolated = interpolated
+
+            rows = np.fromiter(changed, dtype=np.int64, count=len(changed))
+            if len(rows):
+                TRANSFORMS.matrices[rows] = math_utils.batch_transformation_matrix(
+                    TRANSFORMS.world_positions[rows], TRANSFORMS.world_rotations[rows], TRANSFORMS.world_scales[rows]
+                )
+            rows = np.fromiter(interpolated, dtype=np.int64, count=len(interpolated))
+            if len(rows):
+                alpha = registry.get_resource(SimulationState).alpha  # type: ignore
+                positions = TRANSFORMS.previous_positions[rows]
+                positions += (TRANSFORMS.world_positions[rows] - positions) * alpha
+                scales = TRANSFORMS.previous_scales[rows]
+                scales += (TRANSFORMS.world_scales[rows] - scales) * alpha
+                rotations = math_utils.batch_quaternion_slerp(
+                    TRANSFORMS.previous_rotations[rows], TRANSFORMS.world_rotations[rows], alpha
+                )
+                TRANSFORMS.matrices[rows] = math_utils.batch_transformation_matrix(positions, rotations, scales)
+
+            # world boxes follow the matrices
+            BoundsSystem.update(registry, itertools.chain(changed.values(), interpolated.values()))
+
+        # == frustum culling ==
+        # every box tested against the camera's frustum at once, only what survives is batched.
+        # the segmentation pass skips culled entities too.
+        visible = [pair for _, pair in registry.query(RenderSystem.VISIBLE)]
+        drawn, culled = RenderSystem._cull(render_state, camera_state, visible)
+
         # == batching ==
         batches: dict[tuple[DrawMode, bool], list[Tuple[Transform, Visuals]]] = {}
-        for entity, (transform, visuals) in registry.view(Transform, Visuals):
-            if not visuals.enabled: continue
-
+        for transform, visuals in drawn:
             actual_draw_mode = DrawMode.Wireframe if render_state.global_draw_mode == GlobalDrawMode.Wireframe else visuals.draw_mode
             batch_key = (actual_draw_mode, visuals.cull_back_faces)
             if batch_key not in batches: batches[batch_key] = []
-            math_utils.update_transformation_matrix(
-                transform.world.position, transform.world.rotation, transform.world.scale,
-                transform.matrix_cache
-            )
             batches[batch_key].append((transform, visuals))
         sorted_batch_keys = sorted(batches.keys(), key=lambda k: (k[0].name, k[1]))
 
+        # == instancing ==
+        # each batch drawn as groups of instances sharing a mesh and a material (just a mesh
+        # when drawing depth), one call per group.
+        depth_only = render_state.global_draw_mode == GlobalDrawMode.DepthOnly
+        instance_groups: dict[tuple[DrawMode, bool], list[Tuple[Visuals, int, int]]] = {}
+        instance_rows: list[int] = []
+        for batch_key in sorted_batch_keys:
+            batch = batches[batch_key]
+            instance_groups[batch_key] = []
+            for visuals, indices in RenderSystem._group_instances(batch, not depth_only, render_state.instancing):
+                instance_groups[batch_key].append((visuals, len(instance_rows), len(indices)))
+                instance_rows.extend(batch[i][0].row for i in indices)
+        self._upload_instances(np.array(instance_rows, dtype=np.int64))
+        render_state.draw_calls = sum(len(groups) for groups in instance_groups.values())
+
         # == global state update ==
         self.shader_globals.update(camera_state.projection_matrix, camera_state.view_matrix, camera_state.camera_position, time_val)
 
@@ -416,10 +587,10 @@ class RenderSystem:
         GL.glDepthMask(GL.GL_TRUE)
         GL.glEnable(GL.GL_MULTISAMPLE)
 
-        current_shader = self.debug_depth_shader if render_state.global_draw_mode == GlobalDrawMode.DepthOnly else self.tf2_ggx_shader
+        current_shader = self.debug_depth_shader if depth_only else self.tf2_ggx_shader
         current_shader.use()
 
-        if render_state.global_draw_mode == GlobalDrawMode.DepthOnly:
+        if depth_only:
             current_shader.set_float("u_Near", camera_state.camera_near)
             current_shader.set_float("u_Far", camera_state.camera_far)
 
@@ -428,9 +599,8 @@ class RenderSystem:
                 GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE if draw_mode == DrawMode.Wireframe else GL.GL_FILL)
                 if cull_faces: GL.glEnable(GL.GL_CULL_FACE); GL.glCullFace(GL.GL_BACK)
                 else: GL.glDisable(GL.GL_CULL_FACE)
-                for transform, visuals in batches[batch_key]:
-                    current_shader.set_mat4("u_Model", transform.matrix_cache)
-                    self._draw_mesh(visuals.mesh)
+                for visuals, first, count in instance_groups[batch_key]:
+                    self._draw_instances(visuals.mesh, first, count)
         else:
             current_shader.set_vec3_array("u_LightPos", point_light_positions)
             current_shader.set_vec3_array("u_LightColor", point_light_colors)
@@ -446,10 +616,9 @@ class RenderSystem:
                 GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE if draw_mode == DrawMode.Wireframe else GL.GL_FILL)
                 if cull_faces: GL.glEnable(GL.GL_CULL_FACE); GL.glCullFace(GL.GL_BACK)
                 else: GL.glDisable(GL.GL_CULL_FACE)
-                for transform, visuals in batches[batch_key]:
+                for visuals, first, count in instance_groups[batch_key]:
                     self.tf2_ggx_shader.set_material(visuals.material, self.default_texture_id)
-                    current_shader.set_mat4("u_Model", transform.matrix_cache)
-                    self._draw_mesh(visuals.mesh)
+                    self._draw_instances(visuals.mesh, first, count)
 
         # == trajectory line rendering (on multisampled FBO) ==
         GL.glBindVertexArray(self.line_vao)
@@ -475,6 +644,15 @@ class RenderSystem:
             GL.glEnableVertexAttribArray(0)
             GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, GL.GL_FALSE, 3 * 4, None)
             GL.glDrawArrays(GL.GL_LINE_STRIP, 0, len(optimizer.trajectory))
+
+        if render_state.frozen_view_projection is not None:
+            corners = math_utils.get_frustum_corners_world_space(render_state.frozen_view_projection, np.identity(4, dtype=np.float32))
+            points = corners[math_utils.FRUSTUM_EDGES].astype(np.float32).flatten()
+            self.flat_shader.set_vec3("u_Albedo", np.array([1.0, 0.8, 0.0], dtype=np.float32))
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, points.nbytes, points, GL.GL_DYNAMIC_DRAW)
+            GL.glEnableVertexAttribArray(0)
+            GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, GL.GL_FALSE, 3 * 4, None)
+            GL.glDrawArrays(GL.GL_LINES, 0, len(points) // 3)
         GL.glBindVertexArray(0)
         GL.glDepthRange(0.0, 1.0)
 
@@ -499,31 +677,39 @@ class RenderSystem:
             GL.glDisable(GL.GL_MULTISAMPLE)
             GL.glEnable(GL.GL_DEPTH_TEST)
 
+            # every classified entity and its visible children, drawn with the classified entity's id.
+            # instances are grouped within each class, so the classes still draw in CLASSIFIED order
+            id_pairs: list[Tuple[Transform, Visuals]] = []
+            id_entities: list[int] = []
+            id_groups: list[Tuple[Visuals, list[int]]] = []
+            for query in RenderSystem.CLASSIFIED:
+                start = len(id_pairs)
+                for classified_entity in [e for e, _ in registry.query(query)]:
+                    comps = registry.get_components(classified_entity, Transform, Visuals)
+                    if comps and not culled[comps[0].row]:
+                        id_pairs.append(comps)
+                        id_entities.append(classified_entity)
+
+                    visual_children = RenderSystem._find_visual_children(registry, classified_entity)
+                    for child_id, transform, visuals in visual_children:
+                        if culled[transform.row]:
+                            continue
+                        id_pairs.append((transform, visuals))
+                        id_entities.append(classified_entity)
+
+                class_groups = RenderSystem._group_instances(id_pairs[start:], False, render_state.instancing)
+                id_groups += [(visuals, [start + i for i in indices]) for visuals, indices in class_groups]
+
+            order = [i for _, indices in id_groups for i in indices]
+            self._upload_instances(
+                np.array([id_pairs[i][0].row for i in order], dtype=np.int64),
+                np.array([id_entities[i] for i in order], dtype=np.uint32),
+            )
             self.id_shader.use()
-            classified_entities = []
-            for e, _ in registry.view(Vehicle): classified_entities.append(e)
-            for e, _ in registry.view(Building): classified_entities.append(e)
-            for e, _ in registry.view(Environment): classified_entities.append(e)
-
-            for classified_entity in classified_entities:
-                comps = registry.get_components(classified_entity, Transform, Visuals)
-                if comps and comps[1].enabled:
-                    self.id_shader.set_uint("u_EntityID", classified_entity)
-                    model_matrix = math_utils.create_transformation_matrix(
-                        comps[0].world.position, comps[0].world.rotation, comps[0].world.scale
-                    )
-                    self.id_shader.set_mat4("u_Model", model_matrix)
-                    self._draw_mesh(comps[1].mesh)
-
-                visual_children = RenderSystem._find_visual_children(registry, classified_entity)
-                for child_id, transform, visuals in visual_children:
-                    if not visuals.enabled: continue
-                    self.id_shader.set_uint("u_EntityID", classified_entity)
-                    model_matrix = math_utils.create_transformation_matrix(
-                        transform.world.position, transform.world.rotation, transform.world.scale
-                    )
-                    self.id_shader.set_mat4("u_Model", model_matrix)
-                    self._draw_mesh(visuals.mesh)
+            first = 0
+            for visuals, indices in id_groups:
+                self._draw_instances(visuals.mesh, first, len(indices), with_ids=True)
+                first += len(indices)
 
             segmentation_ids = self._calculate_bounding_boxes(render_state, registry, width, height)
 
@@ -534,7 +720,7 @@ class RenderSystem:
 
         # == handle capture ==
         if render_state.is_first_frame_of_capture:
-            dataset_path = Path("dataset")
+            dataset_path = Path(render_state.dataset_path)
             if dataset_path.exists():
                 shutil.rmtree(dataset_path)
             dataset_path.mkdir(parents=True, exist_ok=True)
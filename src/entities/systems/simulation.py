@@ -0,0 +1,45 @@
+from entities.components.simulation_state import SimulationState
+from entities.components.transform import TRANSFORMS, Transform, TransformStore
+from entities.registry import Registry
+
+
+class SimulationSystem:
+    """
+    Bookkeeping for the fixed timestep: how many ticks a frame runs, and where what the
+    simulation moves was when the last tick started, for RenderSystem to interpolate from.
+    """
+    @staticmethod
+    def advance(state: SimulationState, delta_time: float, capped: bool = True) -> int:
+        """
+        Adds a frame's time and returns how many ticks to run for it.
+        """
+        tick_duration = state.tick_duration
+        state.accumulator += delta_time
+        # a frame lasting a whole number of ticks must not lose one to rounding
+        ticks = int(state.accumulator / tick_duration + 1e-6)
+        if capped and ticks > state.max_ticks_per_frame:
+            ticks = state.max_ticks_per_frame
+            state.accumulator = ticks * tick_duration
+        state.accumulator = max(0.0, state.accumulator - ticks * tick_duration)
+
+        state.alpha = min(1.0, state.accumulator / tick_duration) if state.interpolate else 1.0
+        state.ticks_last_frame = ticks
+        return ticks
+
+    @staticmethod
+    def begin_tick(registry: Registry, state: SimulationState) -> None:
+        # transforms changed since the previous tick started, by it or by anyone else, keep
+        # their world transform as of now. everything else kept it already.
+        with registry.change_scope(SimulationSystem) as since:
+            rows = TransformStore.rows(t for _, (t, ) in registry.view(Transform, changed=(Transform, ), since=since))
+            if len(rows):
+                TRANSFORMS.previous_positions[rows] = TRANSFORMS.world_positions[rows]
+                TRANSFORMS.previous_rotations[rows] = TRANSFORMS.world_rotations[rows]
+                TRANSFORMS.previous_scales[rows] = TRANSFORMS.world_scales[rows]
+            state.tick_start = registry.tick
+
+    @staticmethod
+    def end_tick(registry: Registry, state: SimulationState) -> None:
+        state.moved = [entity for entity, _ in registry.view(Transform, changed=(Transform, ), since=state.tick_start)]
+        state.ticks += 1
+        state.time += state.tick_duration
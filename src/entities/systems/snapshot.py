@@ -0,0 +1,177 @@
+import time
+from typing import Any
+
+from entities.components.disposal import Disposal
+from entities.components.entity_flags import EntityFlags
+from entities.components.snapshot_state import SnapshotState
+from entities.components.visuals.assets import AssetsState, AssetStatus, Mesh, ModelAsset, Texture
+from entities.registry import Registry
+from entities.snapshot import DecodeRef, EncodeRef, load_snapshot, save_snapshot
+from entities.systems.assets import AssetSystem
+
+MATERIAL_MAP_SLOTS = ("albedo_map_id", "normal_map_id", "roughness_map_id", "metallic_map_id")
+
+
+class SnapshotSystem:
+    """
+    Saves and loads the world: every entity that isn't internal, along with the parent
+    links between them. Assets are stored as where they came from (a file, a node of a
+    model, or the data of an immediate mesh) and requested again on load.
+    """
+    @staticmethod
+    def update(registry: Registry):
+        # runs after disposal, so a load never sees the world it replaces
+        snapshot_state = registry.get_resource(SnapshotState)
+        if snapshot_state is None:
+            return
+
+        if snapshot_state.save_path is not None:
+            path = snapshot_state.save_path
+            snapshot_state.save_path = None
+            start = time.perf_counter()
+            try:
+                count = SnapshotSystem.save_world(registry, path)
+                snapshot_state.last_message = f"Saved {count} entities in {(time.perf_counter() - start) * 1000.0:.0f} ms."
+            except OSError as e:
+                snapshot_state.last_message = f"Could not save: {e}"
+
+        if snapshot_state.load_path is not None:
+            path = snapshot_state.load_path
+            snapshot_state.load_path = None
+            start = time.perf_counter()
+            try:
+                count = len(SnapshotSystem.load_world(registry, path))
+                snapshot_state.last_message = f"Loaded {count} entities in {(time.perf_counter() - start) * 1000.0:.0f} ms."
+            except (OSError, ValueError) as e:
+                snapshot_state.last_message = f"Could not load: {e}"
+
+    @staticmethod
+    def request_load(registry: Registry, path: str):
+        """
+        Disposes of the current world and loads `path` in its place at the end of the frame.
+        """
+        snapshot_state = registry.get_resource(SnapshotState)
+        disposal = registry.get_resource(Disposal)
+        if snapshot_state is None or disposal is None:
+            return
+        disposal.entities_to_dispose.update(SnapshotSystem.world_roots(registry))
+        snapshot_state.load_path = path
+
+    @staticmethod
+    def world_roots(registry: Registry) -> list[int]:
+        return [
+            entity
+            for archetype in registry.archetypes()
+            for entity in archetype.entities
+            if registry.get_parent(entity) is None and not SnapshotSystem._is_internal(registry, entity)
+        ]
+
+    @staticmethod
+    def world_entities(registry: Registry) -> list[int]:
+        entities = []
+        stack = SnapshotSystem.world_roots(registry)
+        while stack:
+            entity = stack.pop()
+            entities.append(entity)
+            stack.extend(c for c in registry.get_children(entity) if not SnapshotSystem._is_internal(registry, c))
+        return entities
+
+    @staticmethod
+    def save_world(registry: Registry, path: str) -> int:
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None:
+            raise RuntimeError("SnapshotSystem is missing an AssetsState singleton")
+        return save_snapshot(
+            registry, path, SnapshotSystem.world_entities(registry),
+            encode_ref=SnapshotSystem.asset_encoder(assets_state)
+        )
+
+    @staticmethod
+    def load_world(registry: Registry, path: str) -> list[int]:
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None:
+            raise RuntimeError("SnapshotSystem is missing an AssetsState singleton")
+        return load_snapshot(registry, path, decode_ref=SnapshotSystem.asset_decoder(assets_state))
+
+    @staticmethod
+    def _is_internal(registry: Registry, entity: int) -> bool:
+        r_flags = registry.get_components(entity, EntityFlags)
+        return r_flags is not None and r_flags[0].is_internal
+
+    # == asset references ==
+
+    @staticmethod
+    def asset_encoder(assets_state: AssetsState) -> EncodeRef:
+        # assets loaded as part of a model only exist once the model is loaded again
+        model_meshes: dict[int, tuple[str, int]] = {}
+        model_textures: dict[int, tuple[str, int, str]] = {}
+        for model in assets_state.models.values():
+            for node_index, node in enumerate(model.nodes):
+                model_meshes[node.mesh_id] = (model.filepath, node_index)
+                for slot in MATERIAL_MAP_SLOTS:
+                    texture_id = getattr(node.material_template, slot)
+                    if texture_id is not None:
+                        model_textures[texture_id] = (model.filepath, node_index, slot)
+
+        def encode(value: Any) -> Any:
+            if isinstance(value, Mesh):
+                if value.filepath:
+                    return ("mesh_file", value.filepath)
+                if value.id in model_meshes:
+                    return ("model_node", *model_meshes[value.id], "mesh_id")
+                data = assets_state.immediate_mesh_data.get(value.id)
+                if data is not None:
+                    return ("mesh_data", *data)
+                return ("missing_mesh", )
+            if isinstance(value, Texture):
+                if value.filepath:
+                    return ("texture_file", value.filepath, value.is_srgb)
+                if value.id in model_textures:
+                    return ("model_node", *model_textures[value.id])
+                return ("missing_texture", value.is_srgb)
+            if isinstance(value, ModelAsset):
+                return ("model", value.filepath)
+            return None
+
+        return encode
+
+    @staticmethod
+    def asset_decoder(assets_state: AssetsState) -> DecodeRef:
+        def decode(key: Any) -> Any:
+            kind = key[0]
+            if kind == "mesh_file":
+                return AssetSystem.request_mesh(assets_state, key[1])
+            if kind == "texture_file":
+                return AssetSystem.request_texture(assets_state, key[1], is_srgb=key[2])
+            if kind == "model":
+                return AssetSystem.request_model(assets_state, key[1])
+            if kind == "mesh_data":
+                return AssetSystem.create_immediate_mesh(assets_state, key[1], key[2])
+            if kind == "model_node":
+                _, model_path, node_index, slot = key
+                return SnapshotSystem._model_node_asset(assets_state, model_path, node_index, slot)
+            if kind == "missing_mesh":
+                return Mesh(id=AssetSystem.generate_id(assets_state), status=AssetStatus.Failed)
+            if kind == "missing_texture":
+                return Texture(id=AssetSystem.generate_id(assets_state), filepath="", status=AssetStatus.Failed, is_srgb=key[1])
+            raise ValueError(f"Unknown asset reference {kind!r}")
+
+        return decode
+
+    @staticmethod
+    def _model_node_asset(assets_state: AssetsState, model_path: str, node_index: int, slot: str) -> Mesh | Texture:
+        model = AssetSystem.request_model(assets_state, model_path)
+        if model.status == AssetStatus.Ready:
+            node = model.nodes[node_index]
+            if slot == "mesh_id":
+                return AssetSystem.request_mesh(assets_state, node.mesh_id)
+            return AssetSystem.request_texture(assets_state, getattr(node.material_template, slot))
+
+        # stand in until the model has loaded, AssetSystem then binds it to the node's id
+        placeholder: Mesh | Texture
+        if slot == "mesh_id":
+            placeholder = Mesh(id=AssetSystem.generate_id(assets_state), status=AssetStatus.Loading)
+        else:
+            placeholder = Texture(id=AssetSystem.generate_id(assets_state), filepath="", status=AssetStatus.Loading)
+        assets_state.pending_model_bindings.setdefault(model.id, []).append((node_index, slot, placeholder))
+        return placeholder
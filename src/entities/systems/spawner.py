@@ -1,6 +1,7 @@
 from pathlib import Path
 
 from entities.registry import Registry
+from entities.components.command_buffer import CommandBuffer
 from entities.components.spawner_state import SpawnRequest, SpawnerState
 from entities.components.visuals.assets import AssetsState, AssetStatus, ModelAsset
 from entities.components.transform import Transform, TransformData
@@ -8,19 +9,21 @@ from entities.components.entity_flags import EntityFlags
 from entities.components.visuals.visuals import Visuals
 from entities.components.visuals.material import Material
 from entities.systems.assets import AssetSystem
+from entities.systems.command_buffer import CommandBufferSystem
 import math_utils
 
 
 class SpawnerSystem:
     @staticmethod
     def update(registry: Registry):
-        r_spawner = registry.get_singleton(SpawnerState)
-        if r_spawner is None: return
-        spawner_entity, (spawner_state, ) = r_spawner
+        spawner_state = registry.get_resource(SpawnerState)
+        if spawner_state is None: return
 
-        r_assets = registry.get_singleton(AssetsState)
-        if r_assets is None: return
-        assets_entity, (assets_state, ) = r_assets
+        assets_state = registry.get_resource(AssetsState)
+        if assets_state is None: return
+
+        buffer = registry.get_resource(CommandBuffer)
+        if buffer is None: return
 
         instantiations = []
         for i in range(len(spawner_state.pending_spawns) - 1, -1, -1):
@@ -33,33 +36,40 @@ class SpawnerSystem:
                 spawner_state.pending_spawns.pop(i)
 
         for (model, root_transform, parent_entity) in instantiations:
-            SpawnerSystem.instantiate_model(registry, assets_state, model, root_transform, parent_entity)
+            # the parent may have been disposed while the model was loading, e.g. by a scene regeneration
+            if parent_entity is not None and not registry.is_alive(parent_entity):
+                continue
+            SpawnerSystem.instantiate_model(registry, buffer, assets_state, model, root_transform, parent_entity)
 
     @staticmethod
-    def load_and_spawn_one(spawner_state: SpawnerState, model_asset: ModelAsset, transform: Transform | None = None, parent_entity: int | None = None):
+    def load_and_spawn_one(spawner_state: SpawnerState, model_asset: ModelAsset, transform: TransformData | None = None, parent_entity: int | None = None):
         if transform is None:
-            transform = Transform()
+            transform = TransformData()
         spawner_state.pending_spawns.append(SpawnRequest(model_asset, transform, parent_entity))
 
     @staticmethod
-    def instantiate_model(registry: Registry, assets_state: AssetsState, model: ModelAsset, root_transform: Transform, parent_entity: int | None = None) -> list[int]:
+    def instantiate_model(
+        registry: Registry, buffer: CommandBuffer, assets_state: AssetsState, model: ModelAsset,
+        root_transform: TransformData, parent_entity: int | None = None
+    ) -> list[int]:
+        """
+        Records the creation of one entity per model node into `buffer`.
+        The returned handles come alive when the buffer is applied, and so do their Transforms:
+        allocating store rows is left to the sync point, so this doesn't write Transform.
+        """
         if model.status != AssetStatus.Ready:
             print(f"Warning: Attempted to spawn model {model.filepath} before it was Ready.")
             return []
 
-        spawned_entities = []
+        flags = []
+        node_locals = []
+        visuals = []
 
         for node in model.nodes:
-            entity = registry.create_entity()
-
             # apply the root transform for loose instantiations
-            world_pos = root_transform.local.position + node.local_position
-            world_rot = math_utils.quaternion_mul(root_transform.local.rotation, node.local_rotation)
-            world_scale = root_transform.local.scale * node.local_scale
-            node_transform = Transform(local=TransformData(position=world_pos, rotation=world_rot, scale=world_scale))
-
-            if parent_entity is not None:
-                registry.set_parent(entity, parent_entity)
+            world_pos = root_transform.position + node.local_position
+            world_rot = math_utils.quaternion_mul(root_transform.rotation, node.local_rotation)
+            world_scale = root_transform.scale * node.local_scale
 
             mesh = AssetSystem.request_mesh(assets_state, node.mesh_id)
             mat = Material(
@@ -82,13 +92,12 @@ class SpawnerSystem:
             if node.material_template.metallic_map_id is not None:
                 mat.metallic_map = AssetSystem.request_texture(assets_state, node.material_template.metallic_map_id)
 
-            registry.add_components(
-                entity,
-                EntityFlags(name=f"{Path(model.filepath).name}"),
-                node_transform,
-                Visuals(mesh=mesh, material=mat)
-            )
-
-            spawned_entities.append(entity)
+            flags.append(EntityFlags(name=f"{Path(model.filepath).name}"))
+            node_locals.append(TransformData(position=world_pos, rotation=world_rot, scale=world_scale))
+            visuals.append(Visuals(mesh=mesh, material=mat))
 
-        return spawned_entities
+        return CommandBufferSystem.create_entities(
+            registry, buffer, len(flags),
+            flags, lambda i: Transform(local=node_locals[i]), visuals,
+            parent=parent_entity
+        )
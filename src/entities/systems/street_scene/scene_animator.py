@@ -23,15 +23,10 @@ class SceneAnimatorSystem:
             lanes_count = gen_state.lanes_per_direction
             lane_width = (gen_state.street_width / 2) / lanes_count
 
-            children = registry.get_children(scene_entity)
-            vehicles_data: list[Tuple[int, Transform, Vehicle]] = []
-
             # == collect all vehicle data ==
-            for child in children:
-                r_vehicle = registry.get_components(child, Transform, Vehicle)
-                if r_vehicle:
-                    transform, vehicle = r_vehicle
-                    vehicles_data.append((child, transform, vehicle))
+            vehicles_data: list[Tuple[int, Transform, Vehicle]] = [
+                (child, transform, vehicle) for child, (transform, vehicle) in registry.view_children(scene_entity, Transform, Vehicle)
+            ]
 
             # == compute acceleration and lane changes ==
             for i, (entity, transform, vehicle) in enumerate(vehicles_data):
@@ -122,6 +117,7 @@ class SceneAnimatorSystem:
                 # update Z (forward)
                 v_dir = 1.0 if vehicle.direction[2] > 0 else -1.0
                 transform.local.position[2] += v_dir * vehicle.current_speed * dt
+                registry.mark_changed(entity, Transform)
 
                 # wrap vehicles back onto other end of street
                 if transform.local.position[2] > half_length:
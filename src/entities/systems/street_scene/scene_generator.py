@@ -1,9 +1,14 @@
 import random
+from typing import Any, Type
 
-from entities.registry import Registry
-from entities.components.transform import Transform, TransformData
+import numpy as np
+import numpy.typing as npt
+
+from entities.registry import Registry, paused_gc
+from entities.components.command_buffer import CommandBuffer
+from entities.components.transform import Transform, TransformData, transforms_from_arrays
 from entities.components.visuals.visuals import Visuals
-from entities.components.visuals.assets import AssetsState
+from entities.components.visuals.assets import AssetsState, Mesh
 from entities.components.visuals.material import Material
 from entities.components.entity_flags import EntityFlags
 from entities.components.disposal import Disposal
@@ -12,6 +17,7 @@ from entities.components.street_scene.vehicle import Vehicle
 from entities.components.street_scene.building import Building
 from entities.components.street_scene.environment import Environment
 from entities.systems.assets import AssetSystem
+from entities.systems.command_buffer import CommandBufferSystem
 from meshes.volumes.cube import generate_cube
 from meshes.surfaces.plane import generate_plane
 from math_utils import vec3, float1, quaternion_from_euler, quaternion_identity
@@ -30,16 +36,13 @@ class SceneGeneratorSystem:
 
             generator_state.should_generate = False
 
-            r_assets = registry.get_singleton(AssetsState)
-            r_disposal = registry.get_singleton(Disposal)
-            r_spawner = registry.get_singleton(SpawnerState)
-            if not r_assets or not r_disposal or not r_spawner:
+            assets_state = registry.get_resource(AssetsState)
+            disposal = registry.get_resource(Disposal)
+            spawner_state = registry.get_resource(SpawnerState)
+            buffer = registry.get_resource(CommandBuffer)
+            if assets_state is None or disposal is None or spawner_state is None or buffer is None:
                 return
 
-            _, (assets_state,) = r_assets
-            _, (disposal,) = r_disposal
-            _, (spawner_state,) = r_spawner
-
             children = registry.get_children(generator_entity)
             for child in children:
                 should_dispose = True
@@ -76,10 +79,13 @@ class SceneGeneratorSystem:
             if generator_state.cube_mesh is None:
                 cube_vertices, cube_indices = generate_cube(size=1.0)
                 generator_state.cube_mesh = AssetSystem.create_immediate_mesh(assets_state, cube_vertices, cube_indices)
+                # reused by every regeneration, even while no building is using it
+                AssetSystem.retain(assets_state, generator_state.cube_mesh)
 
             if generator_state.plane_mesh is None:
                 plane_vertices, plane_indices = generate_plane()
                 generator_state.plane_mesh = AssetSystem.create_immediate_mesh(assets_state, plane_vertices, plane_indices)
+                AssetSystem.retain(assets_state, generator_state.plane_mesh)
 
             if generator_state.car_model is None:
                 generator_state.car_model = AssetSystem.request_model(assets_state, "assets/car/1399 Taxi.obj")
@@ -89,42 +95,46 @@ class SceneGeneratorSystem:
             cube_mesh = generator_state.cube_mesh
             plane_mesh = generator_state.plane_mesh
 
+            # transforms are made when the buffer is applied, so that allocating their store rows
+            # happens at the sync point and this system doesn't write Transform
+
             # == roads ==
-            road = registry.create_entity()
-            registry.add_components(
-                road,
-                EntityFlags(name="Road"),
-                Transform(local=TransformData(
-                    position=vec3(0, 0, 0),
-                    scale=vec3(generator_state.street_width, 1, generator_state.street_length)
-                )),
-                Visuals(plane_mesh, mat_road),
-                Environment()
+            road = TransformData(
+                position=vec3(0, 0, 0),
+                scale=vec3(generator_state.street_width, 1, generator_state.street_length)
+            )
+            CommandBufferSystem.create_entities(
+                registry, buffer, 1,
+                [EntityFlags(name="Road")],
+                lambda i: Transform(local=road),
+                [Visuals(plane_mesh, mat_road)],
+                [Environment()],
+                parent=generator_entity
             )
-            registry.set_parent(road, generator_entity)
 
             # == sidewalks ==
             sidewalk_height = 0.2
             sidewalk_width = generator_state.sidewalk_width + 20.0
+            sidewalks = []
             for side in [-1, 1]:
-                sidewalk = registry.create_entity()
                 x_pos = side * (generator_state.street_width / 2 + sidewalk_width / 2)
-                registry.add_components(
-                    sidewalk,
-                    EntityFlags(
-                        name=f"Sidewalk {'Left' if side < 0 else 'Right'}"
-                    ),
-                    Transform(local=TransformData(
-                        position=vec3(x_pos, sidewalk_height / 2, 0),
-                        scale=vec3(sidewalk_width, sidewalk_height, generator_state.street_length)
-                    )),
-                    Visuals(cube_mesh, mat_sidewalk),
-                    Environment()
-                )
-                registry.set_parent(sidewalk, generator_entity)
+                sidewalks.append(TransformData(
+                    position=vec3(x_pos, sidewalk_height / 2, 0),
+                    scale=vec3(sidewalk_width, sidewalk_height, generator_state.street_length)
+                ))
+            CommandBufferSystem.create_entities(
+                registry, buffer, 2,
+                [EntityFlags(name="Sidewalk Left"), EntityFlags(name="Sidewalk Right")],
+                lambda i: Transform(local=sidewalks[i]),
+                lambda i: Visuals(cube_mesh, mat_sidewalk),
+                lambda i: Environment(),
+                parent=generator_entity
+            )
 
             # == buildings ==
-            for i in range(generator_state.building_count):
+            building_positions = []
+            building_scales = []
+            for _ in range(generator_state.building_count):
                 side = random.choice([-1, 1])
                 z_pos = random.uniform(-generator_state.street_length / 2, generator_state.street_length / 2)
                 x_pos = side * (generator_state.street_width / 2 + generator_state.sidewalk_width + random.uniform(2, 10))
@@ -133,25 +143,24 @@ class SceneGeneratorSystem:
                 depth = random.uniform(generator_state.min_building_width, generator_state.max_building_width)
                 height = random.uniform(generator_state.min_building_height, generator_state.max_building_height)
 
-                building = registry.create_entity()
-                registry.add_components(
-                    building,
-                    EntityFlags(
-                        name=f"Building {i}"
-                    ),
-                    Transform(local=TransformData(
-                        position=vec3(x_pos, sidewalk_height + height / 2, z_pos),
-                        scale=vec3(width, height, depth)
-                    )),
-                    Visuals(cube_mesh, mat_building),
-                    Building()
-                )
-                registry.set_parent(building, generator_entity)
+                building_positions.append((x_pos, sidewalk_height + height / 2, z_pos))
+                building_scales.append((width, height, depth))
+
+            SceneGeneratorSystem.create_static_meshes(
+                registry, buffer, generator_entity, "Building",
+                np.array(building_positions, dtype=np.float32).reshape(-1, 3),
+                np.array(building_scales, dtype=np.float32).reshape(-1, 3),
+                cube_mesh, mat_building, Building
+            )
 
             # == vehicles ==
             lanes_count = generator_state.lanes_per_direction
             lane_width = (generator_state.street_width / 2) / lanes_count
 
+            vehicle_flags = []
+            vehicle_locals = []
+            vehicle_components = []
+            vehicle_models = []
             for i in range(generator_state.vehicle_count):
                 side = random.choice([-1, 1])
                 lane_index = random.randint(0, lanes_count - 1)
@@ -184,37 +193,69 @@ class SceneGeneratorSystem:
                 # base directional rotation (facing forward or backward along Z)
                 dir_rot = quaternion_from_euler(vec3(0, 0 if side > 0 else 180, 0))
 
-                vehicle_entity = registry.create_entity()
-                registry.add_components(
-                    vehicle_entity,
-                    EntityFlags(
-                        name=f"{'Bus' if is_bus else 'Vehicle'} {i}"
-                    ),
-                    Transform(local=TransformData(
-                        position=vec3(x_pos, 0.0, z_pos),
-                        scale=vec3(1, 1, 1),
-                        rotation=dir_rot.copy()
-                    )),
-                    Vehicle(
-                        target_speed=speed,
-                        current_speed=speed,
-                        direction=direction,
-                        lane_id=lane_id,
-                        target_lane_id=lane_id,
-                        base_rotation=dir_rot,
-                        max_acceleration=max_accel,
-                        max_braking=max_brake
-                    )
-                )
-                registry.set_parent(vehicle_entity, generator_entity)
+                vehicle_flags.append(EntityFlags(
+                    name=f"{'Bus' if is_bus else 'Vehicle'} {i}"
+                ))
+                vehicle_locals.append(TransformData(
+                    position=vec3(x_pos, 0.0, z_pos),
+                    scale=vec3(1, 1, 1),
+                    rotation=dir_rot.copy()
+                ))
+                vehicle_components.append(Vehicle(
+                    target_speed=speed,
+                    current_speed=speed,
+                    direction=direction,
+                    lane_id=lane_id,
+                    target_lane_id=lane_id,
+                    base_rotation=dir_rot,
+                    max_acceleration=max_accel,
+                    max_braking=max_brake
+                ))
+                vehicle_models.append((model, model_scale, model_offset))
+
+            # the spawn requests only reach the spawner next frame, after the buffer made the vehicles alive
+            vehicle_entities = CommandBufferSystem.create_entities(
+                registry, buffer, generator_state.vehicle_count,
+                vehicle_flags, lambda i: Transform(local=vehicle_locals[i]), vehicle_components,
+                parent=generator_entity
+            )
 
+            for vehicle_entity, (model, model_scale, model_offset) in zip(vehicle_entities, vehicle_models):
                 if model:
                     SpawnerSystem.load_and_spawn_one(
                         spawner_state,
                         model,
-                        transform=Transform(local=TransformData(
+                        transform=TransformData(
                             scale=model_scale,
                             rotation=model_offset
-                        )),
+                        ),
                         parent_entity=vehicle_entity
                     )
+
+    @staticmethod
+    def create_static_meshes(
+        registry: Registry, buffer: CommandBuffer, parent: int, name: str,
+        positions: npt.NDArray[np.float32], scales: npt.NDArray[np.float32],
+        mesh: Mesh, material: Material, tag: Type[Any],
+    ) -> list[int]:
+        """
+        Creates one entity per row of `positions` / `scales` (both (N, 3)), all sharing
+        `mesh` and `material` and tagged with `tag`, recorded as a single batch under `parent`.
+        The Transforms are made in bulk when the buffer is applied.
+        """
+        transforms: list[Transform] = []
+
+        def transform(i: int) -> Transform:
+            if not transforms:
+                with paused_gc():
+                    transforms.extend(transforms_from_arrays(positions, scales))
+            return transforms[i]
+
+        return CommandBufferSystem.create_entities(
+            registry, buffer, len(positions),
+            lambda i: EntityFlags(name=f"{name} {i}"),
+            transform,
+            lambda i: Visuals(mesh, material),
+            lambda i: tag(),
+            parent=parent
+        )
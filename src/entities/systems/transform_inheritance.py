@@ -1,53 +1,94 @@
-from entities.registry import Registry
-from entities.components.transform import Transform
+from entities.registry import ComponentMapping, Registry
+from entities.components.transform import TRANSFORMS, Transform
 import math_utils
 import numpy as np
+import numpy.typing as npt
 
 
 class TransformInheritanceSystem:
     @staticmethod
     def update(registry: Registry):
-        transforms_dict = registry.get_components_of_type(Transform)
-        if not transforms_dict:
-            return
-
-        scaled_pos_scratch = np.zeros(3, dtype=np.float32)
-
-        stack: list[int] = []
-        for entity in transforms_dict:
-            parent = registry.get_parent(entity)
-            if parent is None or parent not in transforms_dict:
-                stack.append(entity)
-
-        while stack:
-            entity = stack.pop()
-            transform = transforms_dict[entity]
-
-            parent = registry.get_parent(entity)
-            parent_transform = transforms_dict.get(parent) if parent is not None else None
-
-            local = transform.local
-            world = transform.world
-
-            if transform.inherit and parent_transform is not None:
-                parent_world = parent_transform.world
-
-                math_utils.quaternion_mul_out(parent_world.rotation, local.rotation, world.rotation)
-                np.multiply(parent_world.scale, local.scale, out=world.scale)
-
-                np.multiply(local.position, parent_world.scale, out=scaled_pos_scratch)
-                math_utils.rotate_vector_by_quaternion_out(
-                    scaled_pos_scratch,
-                    parent_world.rotation,
-                    world.position
-                )
-
-                world.position += parent_world.position
-            else:
-                world.position[:] = local.position
-                world.rotation[:] = local.rotation
-                world.scale[:] = local.scale
-
-            for child in registry.get_children(entity):
-                if child in transforms_dict:
-                    stack.append(child)
+        with registry.change_scope(TransformInheritanceSystem) as since:
+            # only subtrees under a changed transform need their world transforms recomputed.
+            # world transforms written here are marked changed for downstream systems.
+            # everything below is sized by those subtrees, not by the whole hierarchy.
+            dirty = [entity for entity, _ in registry.view(Transform, changed=(Transform, ), since=since)]
+            if not dirty:
+                return
+
+            hierarchy = registry.hierarchy()
+            transforms = registry.get_components_of_type(Transform)
+
+            # every subtree is a contiguous range of the hierarchy, nested in or disjoint from
+            # any other, so the entries to look at are the ranges not nested in an earlier one
+            dirty_positions = np.unique([hierarchy.position(entity) for entity in dirty])
+            dirty_positions = dirty_positions[dirty_positions >= 0]
+            ends = hierarchy.ends[dirty_positions]
+            outer = dirty_positions >= np.concatenate(([-1], np.maximum.accumulate(ends)[:-1]))
+            starts, lengths = dirty_positions[outer], (ends - dirty_positions)[outer]
+            offsets = np.cumsum(lengths) - lengths
+            positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+            count = len(positions)
+            if not count:
+                return
+
+            # parents inside the ranges are referred to by their index into `positions`
+            parents = hierarchy.parents[positions]
+            parent_index = np.minimum(np.searchsorted(positions, parents), count - 1)
+            parent_inside = positions[parent_index] == parents
+            is_dirty = np.zeros(count, dtype=np.bool_)
+            is_dirty[np.searchsorted(positions, dirty_positions)] = True
+
+            # store rows, -1 without a Transform, for the entries and the parents of the ranges
+            rows = TransformInheritanceSystem._rows(transforms, hierarchy.entities[positions])
+            parent_rows = np.full(count, -1, dtype=np.int64)
+            parent_rows[parent_inside] = rows[parent_index[parent_inside]]
+            outside = np.flatnonzero(~parent_inside & (parents >= 0))
+            parent_rows[outside] = TransformInheritanceSystem._rows(transforms, hierarchy.entities[parents[outside]])
+
+            # parents are one level up, so every parent-child pair of a level is composed at once.
+            # an entry is recomputed if it has a Transform and is dirty or its parent was
+            # recomputed: the walk down stops at entities without a Transform, and dirty
+            # entities below those start over, taking their local transform as world transform.
+            reached = np.zeros(count, dtype=np.bool_)
+            depths = hierarchy.depths[positions]
+            order = np.argsort(depths, kind="stable")
+            level_starts = np.flatnonzero(np.diff(depths[order], prepend=-1))
+            for level in np.split(order, level_starts[1:]):
+                recompute = (rows[level] >= 0) & (is_dirty[level] | (parent_inside[level] & reached[parent_index[level]]))
+                reached[level] = recompute
+                level = level[recompute]
+                child_rows = rows[level]
+                level_parent_rows = parent_rows[level]
+
+                inherit = TRANSFORMS.inherits[child_rows] & (level_parent_rows >= 0)
+                children = child_rows[inherit]
+                parents_of = level_parent_rows[inherit]
+                if len(children):
+                    parent_rotations = TRANSFORMS.world_rotations[parents_of]
+                    parent_scales = TRANSFORMS.world_scales[parents_of]
+
+                    TRANSFORMS.world_rotations[children] = math_utils.batch_quaternion_mul(
+                        parent_rotations, TRANSFORMS.local_rotations[children]
+                    )
+                    TRANSFORMS.world_scales[children] = parent_scales * TRANSFORMS.local_scales[children]
+
+                    world_positions = math_utils.batch_rotate_vector_by_quaternion(
+                        TRANSFORMS.local_positions[children] * parent_scales, parent_rotations
+                    )
+                    world_positions += TRANSFORMS.world_positions[parents_of]
+                    TRANSFORMS.world_positions[children] = world_positions
+
+                roots = child_rows[~inherit]
+                if len(roots):
+                    TRANSFORMS.world_positions[roots] = TRANSFORMS.local_positions[roots]
+                    TRANSFORMS.world_rotations[roots] = TRANSFORMS.local_rotations[roots]
+                    TRANSFORMS.world_scales[roots] = TRANSFORMS.local_scales[roots]
+
+            for entity in hierarchy.entities[positions[reached]].tolist():
+                registry.mark_changed(entity, Transform)
+
+    @staticmethod
+    def _rows(transforms: ComponentMapping[Transform], entities: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        found = [transforms.get(entity) for entity in entities.tolist()]
+        return np.array([-1 if transform is None else transform.row for transform in found], dtype=np.int64)
@@ -52,7 +52,7 @@ def draw_creation_section(
     add_menu_expanded = imgui.collapsing_header("+ Add")
 
     if not add_menu_expanded:
-        preview_visuals.enabled = False
+        registry.set_enabled(ui_state.preview_entity, False)
     else:
         if imgui.button("Load model..."):
             dialog = pfd.open_file(
@@ -67,13 +67,14 @@ def draw_creation_section(
                 model_asset = AssetSystem.request_model(assets_state, filepath)
                 SpawnerSystem.load_and_spawn_one(
                     spawner_state, model_asset,
-                    Transform(local=TransformData(scale=vec3(0.04, 0.04, 0.04))),
+                    TransformData(scale=vec3(0.04, 0.04, 0.04)),
                 )
                 ui_state.should_close_add_menu = True
 
         preview_transform.local.position = vec3(*camera_state.focal_point)
         preview_transform.local.rotation = quaternion_identity()
         preview_transform.local.scale = vec3(1.0, 1.0, 1.0)
+        registry.mark_changed(ui_state.preview_entity, Transform)
 
         changed_type = False
 
@@ -247,9 +248,9 @@ def draw_creation_section(
             mesh_changed = mesh_changed or changed_mr or changed_tr or changed_mse or changed_tse
 
         if ui_state.add_mesh_type in (AddType.DirectionalLight, AddType.PointLight, AddType.Camera, AddType.FunctionSurface, AddType.GradientDescentSurface):
-            preview_visuals.enabled = False
+            registry.set_enabled(ui_state.preview_entity, False)
         else:
-            preview_visuals.enabled = True
+            registry.set_enabled(ui_state.preview_entity, True)
             if mesh_changed:
                 vi = None
                 if ui_state.add_mesh_type == AddType.Triangle:
@@ -290,7 +291,8 @@ def draw_creation_section(
                     vi = generate_torus(ui_state.torus_main_radius, ui_state.torus_tube_radius, ui_state.torus_main_sectors, ui_state.torus_tube_sectors)
 
                 if vi is not None:
-                    preview_visuals.mesh = AssetSystem.create_immediate_mesh(assets_state, *vi)
+                    AssetSystem.set_mesh(assets_state, preview_visuals, AssetSystem.create_immediate_mesh(assets_state, *vi))
+                    registry.mark_changed(ui_state.preview_entity, Visuals)
                 ui_state.preview_visual_initialized = True
 
         imgui.separator()
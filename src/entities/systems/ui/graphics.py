@@ -78,4 +78,21 @@ def draw_graphics_section(
         if changed_bb:
             render_state.show_bounding_boxes = new_bb
 
+        changed_fc, new_fc = imgui.checkbox("Frustum culling", render_state.frustum_culling)
+        if changed_fc:
+            render_state.frustum_culling = new_fc
+        imgui.same_line()
+        changed_ff, new_ff = imgui.checkbox("Freeze culling frustum", render_state.freeze_culling_frustum)
+        if changed_ff:
+            render_state.freeze_culling_frustum = new_ff
+        imgui.text(
+            f"{render_state.culling_tested} tested / {render_state.culling_culled} culled / {render_state.culling_drawn} drawn"
+        )
+
+        changed_in, new_in = imgui.checkbox("Instancing", render_state.instancing)
+        if changed_in:
+            render_state.instancing = new_in
+        imgui.same_line()
+        imgui.text(f"{render_state.draw_calls} draw calls")
+
         imgui.pop_item_width()
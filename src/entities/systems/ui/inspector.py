@@ -78,6 +78,7 @@ def draw_inspector_section(
                             cam_transform,
                             target_transform
                         )
+                        registry.mark_changed(target_camera, Transform)
 
             imgui.separator()
 
@@ -136,6 +137,9 @@ def draw_component_properties(
             if changed_scale:
                 comp.local.scale = vec3(*new_scale)
 
+            if changed_inherit or changed_pos or changed_rot or changed_scale:
+                registry.mark_changed(entity_id, Transform)
+
             imgui.tree_pop()
 
     elif isinstance(comp, DirectionalLight):
@@ -200,9 +204,9 @@ def draw_component_properties(
     elif isinstance(comp, Visuals) and not comp.is_internal:
         if imgui.tree_node_ex(comp_type.__name__, imgui.TreeNodeFlags_.default_open):
             changed_enabled, new_enabled = imgui.checkbox(
-                "Shown", comp.enabled)
+                "Shown", registry.is_enabled(entity_id))
             if changed_enabled:
-                comp.enabled = new_enabled
+                registry.set_enabled(entity_id, new_enabled)
             imgui.same_line()
             if imgui.radio_button("Fill", comp.draw_mode == DrawMode.Normal):
                 comp.draw_mode = DrawMode.Normal
@@ -282,13 +286,13 @@ def draw_component_properties(
                                 filepath = result[0]
                                 is_srgb = (attr_name == "albedo_map")
                                 new_tex = AssetSystem.request_texture(assets_state, filepath, is_srgb=is_srgb)
-                                setattr(comp.material, attr_name, new_tex)
+                                AssetSystem.set_material_map(assets_state, comp.material, attr_name, new_tex)
 
                         if current_tex is not None:
                             imgui.same_line()
                             imgui.push_style_color(imgui.Col_.button, (0.6, 0.2, 0.2, 1.0))
                             if imgui.button("Clear"):
-                                setattr(comp.material, attr_name, None)
+                                AssetSystem.set_material_map(assets_state, comp.material, attr_name, None)
                             imgui.pop_style_color()
 
                         imgui.pop_id()
@@ -468,5 +472,6 @@ def focus_camera_on_transform(
     camera_transform: Transform,
     target_transform: Transform,
 ):
-    camera_state.focal_point = target_transform.world.position
+    # copy: the camera moves the focal point in place, which must not move the target
+    camera_state.focal_point = target_transform.world.position.copy()
     camera_transform.local.position = camera_state.focal_point - camera_state.front * camera.focal_point_distance  # type: ignore
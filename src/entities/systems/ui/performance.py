@@ -0,0 +1,68 @@
+from imgui_bundle import imgui
+
+from entities.components.scheduler_state import SchedulerState
+from entities.components.simulation_state import SimulationState
+
+
+def draw_performance_section(scheduler_state: SchedulerState, simulation_state: SimulationState | None):
+    if imgui.collapsing_header("Performance"):
+        changed_p, new_p = imgui.checkbox("Run systems in parallel", scheduler_state.parallel)
+        if changed_p:
+            scheduler_state.parallel = new_p
+
+        imgui.text(f"Systems took {scheduler_state.frame_time * 1000.0:.2f} ms last frame.")
+        _draw_timings("performance_timings", scheduler_state)
+
+        if simulation_state is not None:
+            imgui.separator()
+            _draw_simulation(simulation_state)
+
+
+def _draw_simulation(simulation_state: SimulationState):
+    changed_rate, new_rate = imgui.input_float("tick rate (Hz)", simulation_state.tick_rate)
+    if changed_rate:
+        simulation_state.tick_rate = max(1.0, new_rate)
+
+    changed_max, new_max = imgui.input_int("max ticks per frame", simulation_state.max_ticks_per_frame)
+    if changed_max:
+        simulation_state.max_ticks_per_frame = max(1, new_max)
+
+    changed_i, new_i = imgui.checkbox("Interpolate between ticks", simulation_state.interpolate)
+    if changed_i:
+        simulation_state.interpolate = new_i
+
+    imgui.text(
+        f"{simulation_state.ticks_last_frame} ticks last frame, drawn at {simulation_state.alpha:.2f} of a tick."
+    )
+    if simulation_state.ticks > 0:
+        imgui.text(f"The last tick's systems took {simulation_state.schedule.frame_time * 1000.0:.2f} ms.")
+        _draw_timings("simulation_timings", simulation_state.schedule)
+
+
+def _draw_timings(table_id: str, scheduler_state: SchedulerState):
+    critical = set(scheduler_state.critical_path)
+    if imgui.begin_table(table_id, 4, imgui.TableFlags_.row_bg):
+        imgui.table_setup_column("System", imgui.TableColumnFlags_.width_stretch)
+        imgui.table_setup_column("Start", imgui.TableColumnFlags_.width_fixed)
+        imgui.table_setup_column("ms", imgui.TableColumnFlags_.width_fixed)
+        imgui.table_setup_column("Thread", imgui.TableColumnFlags_.width_fixed)
+        imgui.table_headers_row()
+
+        for timing in scheduler_state.timings:
+            imgui.table_next_row()
+            imgui.table_next_column()
+            # systems on the critical path bound the frame, so they are worth optimizing first
+            if timing.name in critical:
+                imgui.text_colored((1.0, 0.8, 0.0, 1.0), timing.name)
+            else:
+                imgui.text(timing.name)
+            imgui.table_next_column()
+            imgui.text(f"{timing.start * 1000.0:.2f}")
+            imgui.table_next_column()
+            imgui.text(f"{timing.duration * 1000.0:.2f}")
+            imgui.table_next_column()
+            imgui.text("main" if timing.main_thread else "pool")
+
+        imgui.end_table()
+
+    imgui.text_wrapped("Critical path: " + " > ".join(scheduler_state.critical_path))
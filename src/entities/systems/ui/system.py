@@ -10,27 +10,35 @@ from entities.components.ui.ui_state import UiState
 from entities.components.visuals.visuals import Visuals
 from entities.components.visuals.assets import AssetStatus, AssetsState
 from entities.components.spawner_state import SpawnerState
+from entities.components.scheduler_state import SchedulerState
+from entities.components.simulation_state import SimulationState
+from entities.components.snapshot_state import SnapshotState
 from entities.registry import Registry
 
 from entities.systems.ui.creation import draw_creation_section
 from entities.systems.ui.entity_list import draw_entity_list_section
 from entities.systems.ui.inspector import draw_inspector_section
 from entities.systems.ui.graphics import draw_graphics_section
+from entities.systems.ui.performance import draw_performance_section
+from entities.systems.ui.world import draw_world_section
 
 
 class UiSystem:
     @staticmethod
     def update(registry: Registry, time: float, delta_time: float):
-        r_ui = registry.get_singleton(UiState)
-        r_admin = registry.get_singleton(AssetsState, SpawnerState, RenderState, IconRenderState, Disposal)
-        r_camera_state = registry.get_singleton(CameraState)
-        r_gizmo = registry.get_singleton(GizmoState)
-        if r_ui is None or r_admin is None or r_camera_state is None or r_gizmo is None:
+        ui_state = registry.get_resource(UiState)
+        assets_state = registry.get_resource(AssetsState)
+        spawner_state = registry.get_resource(SpawnerState)
+        render_state = registry.get_resource(RenderState)
+        icon_render_state = registry.get_resource(IconRenderState)
+        disposal = registry.get_resource(Disposal)
+        camera_state = registry.get_resource(CameraState)
+        camera_state_entity = registry.get_resource_entity(CameraState)
+        gizmo_state = registry.get_resource(GizmoState)
+        if ui_state is None or assets_state is None or spawner_state is None or render_state is None \
+                or icon_render_state is None or disposal is None or camera_state is None \
+                or camera_state_entity is None or gizmo_state is None:
             return
-        ui_entity, (ui_state, ) = r_ui
-        admin_entity, (assets_state, spawner_state, render_state, icon_render_state, disposal) = r_admin
-        camera_state_entity, (camera_state, ) = r_camera_state
-        gizmo_state_entity, (gizmo_state, ) = r_gizmo
 
         r_preview = registry.get_components(ui_state.preview_entity, Transform, Visuals)
         if r_preview is None:
@@ -115,4 +123,13 @@ class UiSystem:
             render_state, icon_render_state, ui_state
         )
 
+        snapshot_state = registry.get_resource(SnapshotState)
+        if snapshot_state is not None:
+            draw_world_section(registry, snapshot_state)
+
+        # shows the previous frame, this one is still running
+        scheduler_state = registry.get_resource(SchedulerState)
+        if scheduler_state is not None:
+            draw_performance_section(scheduler_state, registry.get_resource(SimulationState))
+
         imgui.end()
@@ -0,0 +1,42 @@
+from imgui_bundle import imgui, portable_file_dialogs as pfd
+
+from entities.components.snapshot_state import SnapshotState
+from entities.registry import Registry
+from entities.systems.snapshot import SnapshotSystem
+
+
+SNAPSHOT_FILTERS = ["World snapshots", "*.snapshot", "All Files", "*"]
+
+
+def draw_world_section(
+    registry: Registry,
+    snapshot_state: SnapshotState,
+):
+    if imgui.collapsing_header("World"):
+        if imgui.button("Save world..."):
+            dialog = pfd.save_file(
+                title="Save world snapshot",
+                default_path=snapshot_state.path_input,
+                filters=SNAPSHOT_FILTERS
+            )
+            result = dialog.result()
+
+            if result:
+                snapshot_state.path_input = result
+                snapshot_state.save_path = result
+
+        imgui.same_line()
+        if imgui.button("Load world..."):
+            dialog = pfd.open_file(
+                title="Load world snapshot",
+                default_path=snapshot_state.path_input,
+                filters=SNAPSHOT_FILTERS
+            )
+            result = dialog.result()
+
+            if result and len(result) > 0:
+                snapshot_state.path_input = result[0]
+                SnapshotSystem.request_load(registry, result[0])
+
+        if snapshot_state.last_message is not None:
+            imgui.text_wrapped(snapshot_state.last_message)
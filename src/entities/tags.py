@@ -0,0 +1,95 @@
+from typing import Any, Dict, Iterable, List, Sequence, Type
+
+import numpy as np
+import numpy.typing as npt
+
+MAX_TAGS = 32
+
+
+class TagIndex:
+    """
+    One word per entity slot with a bit set for each tracked component type the entity has,
+    so class lookups and set operations over many entities are single array operations.
+
+    Registry derives every word from the entity's archetype: each archetype knows its
+    `tag_bits`, and a word is only written when an entity lands in an archetype with
+    different bits. A nonzero word is always written along with the handle of the entity it
+    describes, which is how stale handles are told apart without touching the registry.
+    """
+    __slots__ = ("types", "bits", "words", "handles")
+
+    def __init__(self) -> None:
+        self.types: List[Type[Any]] = []
+        self.bits: Dict[Type[Any], int] = {}
+        self.words: npt.NDArray[np.uint32] = np.zeros(0, dtype=np.uint32)
+        self.handles: npt.NDArray[np.int64] = np.zeros(0, dtype=np.int64)
+
+    def register(self, comp_type: Type[Any]) -> int:
+        bit = self.bits.get(comp_type)
+        if bit is not None:
+            return bit
+        if len(self.types) == MAX_TAGS:
+            raise ValueError(f"Cannot track more than {MAX_TAGS} tag types")
+        bit = 1 << len(self.types)
+        self.types.append(comp_type)
+        self.bits[comp_type] = bit
+        return bit
+
+    def bits_of(self, types: Iterable[Type[Any]]) -> int:
+        word = 0
+        for comp_type in types:
+            word |= self.bits.get(comp_type, 0)
+        return word
+
+    def mask(self, *types: Type[Any]) -> int:
+        """
+        The bits of `types`, all of which must be tracked.
+        """
+        word = 0
+        for comp_type in types:
+            bit = self.bits.get(comp_type)
+            if bit is None:
+                raise KeyError(f"{comp_type.__name__} is not a tracked tag type")
+            word |= bit
+        return word
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity > len(self.words):
+            size = max(capacity, 2 * len(self.words), 1024)
+            self.words = np.concatenate([self.words, np.zeros(size - len(self.words), dtype=np.uint32)])
+            self.handles = np.concatenate([self.handles, np.zeros(size - len(self.handles), dtype=np.int64)])
+
+    def set(self, slot: int, entity: int, word: int) -> None:
+        if slot >= len(self.words):
+            self._reserve(slot + 1)
+        self.words[slot] = word
+        self.handles[slot] = entity
+
+    def set_many(self, slots: Sequence[int], entities: Sequence[int], word: int) -> None:
+        if not slots:
+            return
+        index = np.fromiter(slots, dtype=np.int64, count=len(slots))
+        self._reserve(int(index.max()) + 1)
+        self.words[index] = word
+        self.handles[index] = np.fromiter(entities, dtype=np.int64, count=len(entities))
+
+    def lookup(self, entities: npt.NDArray[np.int64], index_mask: int) -> npt.NDArray[np.uint32]:
+        """
+        The word of each handle in `entities`, 0 for stale ones.
+        """
+        slots = entities & index_mask
+        in_range = slots < len(self.words)
+        words = np.zeros(len(entities), dtype=np.uint32)
+        slots = slots[in_range]
+        live = self.handles[slots] == entities[in_range]
+        words[np.flatnonzero(in_range)[live]] = self.words[slots[live]]
+        return words
+
+    def select(self, include: int, exclude: int = 0) -> npt.NDArray[np.int64]:
+        """
+        Handles of every entity that has all bits in `include` and none in `exclude`.
+        """
+        if not include:
+            raise ValueError("Selecting by tags needs at least one tag to include")
+        words = self.words
+        return self.handles[((words & include) == include) & ((words & exclude) == 0)]
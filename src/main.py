@@ -1,8 +1,34 @@
+import argparse
+import sys
+
+from engine.forked_capture import capture_variants, prepare_world, regenerate_street
 from engine.game import Game
 
 
 def main():
-    app = Game(1280, 720)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--world", help="start from a world snapshot instead of generating the street scene")
+    parser.add_argument(
+        "--capture-variants", type=int, metavar="N",
+        help="instead of opening a window, capture N variants of the world in forked worker processes"
+    )
+    parser.add_argument("--capture-frames", type=int, default=30, help="frames captured per variant")
+    parser.add_argument("--capture-workers", type=int, help="worker processes running at once (default: CPU count)")
+    parser.add_argument("--capture-dir", default="dataset", help="where each variant's dataset goes")
+    args = parser.parse_args()
+
+    if args.capture_variants is not None:
+        registry = prepare_world(args.world)
+        failed = capture_variants(
+            registry, args.capture_variants, args.capture_frames, out_dir=args.capture_dir,
+            workers=args.capture_workers, setup=None if args.world else regenerate_street
+        )
+        if failed:
+            print(f"Capturing failed for variants {failed}")
+            sys.exit(1)
+        return
+
+    app = Game(1280, 720, world_path=args.world)
     app.run()
 
 
@@ -344,6 +344,20 @@ def get_frustum_corners_world_space(proj_matrix: npt.NDArray[np.float32], view_m
     return pts[:, :3] / pts[:, 3, np.newaxis]  # type: ignore
 
 
+def frustum_planes(view_projection: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    # the six planes (a, b, c, d) of the clip volume, normals pointing inside and normalized,
+    # so a*x + b*y + c*z + d is the distance of a world space point in front of each plane.
+    # order: left, right, bottom, top, near, far.
+    m = np.asarray(view_projection, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes.astype(np.float32)
+
+
+# pairs of _NDC_CORNERS differing in one coordinate
+FRUSTUM_EDGES = np.array([(i, i | bit) for bit in (1, 2, 4) for i in range(8) if not i & bit], dtype=np.int64)
+
+
 def get_light_space_matrix(proj_matrix: npt.NDArray[np.float32], view_matrix: npt.NDArray[np.float32], light_dir: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
     corners = get_frustum_corners_world_space(proj_matrix, view_matrix)
 
@@ -417,3 +431,219 @@ def get_light_space_matrix(proj_matrix: npt.NDArray[np.float32], view_matrix: np
     light_proj = create_orthographic_projection(min_x, max_x, min_y, max_y, near_plane, far_plane)
 
     return light_proj @ light_view
+
+
+# == batched ==
+# counterparts of the functions above for whole populations: (N, 3) vectors, (N, 4) quaternions,
+# (N, 4, 4) matrices, float32 unless given otherwise. results go into `out` when it is given,
+# which is also returned. rows are independent, so `out` may be one of the inputs.
+
+def batch_normalize(v, out=None):
+    v = np.asarray(v)
+    norms = np.linalg.norm(v, axis=-1, keepdims=True)
+    if out is None:
+        out = np.empty(v.shape, dtype=np.float32)
+    # zero rows stay zero, like normalize() returning them as they are
+    np.divide(v, np.where(norms == 0, 1.0, norms), out=out)
+    return out
+
+
+def batch_quaternion_mul(q1, q2, out=None):
+    # in float64 with the same operations as quaternion_mul_out, so both round to the same results
+    x1, y1, z1, w1 = np.asarray(q1, dtype=np.float64).T
+    x2, y2, z2, w2 = np.asarray(q2, dtype=np.float64).T
+    if out is None:
+        out = np.empty((len(x1), 4), dtype=np.float32)
+
+    out[:, 0] = w1*x2 + x1*w2 + y1*z2 - z1*y2
+    out[:, 1] = w1*y2 - x1*z2 + y1*w2 + z1*x2
+    out[:, 2] = w1*z2 + x1*y2 - y1*x2 + z1*w2
+    out[:, 3] = w1*w2 - x1*x2 - y1*y2 - z1*z2
+    return out
+
+
+def batch_rotate_vector_by_quaternion(v, q, out=None):
+    # in float64 like batch_quaternion_mul, matching rotate_vector_by_quaternion_out
+    qx, qy, qz, qw = np.asarray(q, dtype=np.float64).T
+    vx, vy, vz = np.asarray(v, dtype=np.float64).T
+    if out is None:
+        out = np.empty((len(vx), 3), dtype=np.float32)
+
+    tx = 2.0 * (qy * vz - qz * vy)
+    ty = 2.0 * (qz * vx - qx * vz)
+    tz = 2.0 * (qx * vy - qy * vx)
+
+    out[:, 0] = vx + qw * tx + (qy * tz - qz * ty)
+    out[:, 1] = vy + qw * ty + (qz * tx - qx * tz)
+    out[:, 2] = vz + qw * tz + (qx * ty - qy * tx)
+    return out
+
+
+def batch_quaternion_slerp(q0, q1, fraction, out=None):
+    # `fraction` is one value for all rows or one per row
+    q0 = batch_normalize(q0).astype(np.float64)
+    q1 = batch_normalize(q1).astype(np.float64)
+    fraction = np.broadcast_to(np.asarray(fraction, dtype=np.float64), (len(q0), ))[:, None]
+    if out is None:
+        out = np.empty((len(q0), 4), dtype=np.float32)
+
+    dot = np.einsum("ij,ij->i", q0, q1)[:, None]
+    # the shorter way round
+    q1 = np.where(dot < 0.0, -q1, q1)
+    dot = np.clip(np.abs(dot), -1.0, 1.0)
+
+    theta = np.arccos(dot) * fraction
+    q2 = batch_normalize(q1 - q0 * dot).astype(np.float64)
+    slerped = q0 * np.cos(theta) + q2 * np.sin(theta)
+    # nearly parallel: linear interpolation, as slerp would divide by almost zero
+    lerped = batch_normalize(q0 + fraction * (q1 - q0)).astype(np.float64)
+    out[:] = np.where(dot > 0.9995, lerped, slerped)
+    return out
+
+
+def batch_quaternion_from_axis_angle(axes, angles_degrees, out=None):
+    axes = batch_normalize(axes).astype(np.float64)
+    half_angles = np.radians(np.asarray(angles_degrees, dtype=np.float64)) * 0.5
+    half_angles = np.broadcast_to(half_angles, (len(axes), ))
+    if out is None:
+        out = np.empty((len(axes), 4), dtype=np.float32)
+
+    out[:, :3] = axes * np.sin(half_angles)[:, None]
+    out[:, 3] = np.cos(half_angles)
+    return out
+
+
+def batch_quaternion_from_euler(euler_degrees, out=None):
+    rx, ry, rz = (np.radians(np.asarray(euler_degrees, dtype=np.float64)) * 0.5).T
+    if out is None:
+        out = np.empty((len(rx), 4), dtype=np.float32)
+
+    sx, cx = np.sin(rx), np.cos(rx)
+    sy, cy = np.sin(ry), np.cos(ry)
+    sz, cz = np.sin(rz), np.cos(rz)
+
+    out[:, 0] = sx * cy * cz - cx * sy * sz
+    out[:, 1] = cx * sy * cz + sx * cy * sz
+    out[:, 2] = cx * cy * sz - sx * sy * cz
+    out[:, 3] = cx * cy * cz + sx * sy * sz
+    return out
+
+
+def batch_quaternion_to_euler(q, out=None):
+    x, y, z, w = np.asarray(q, dtype=np.float64).T
+    if out is None:
+        out = np.empty((len(x), 3), dtype=np.float32)
+
+    sinp = 2 * (w * y - z * x)
+    # gimbal lock: pitch at +-90 degrees, all of the rest put into roll
+    locked = np.abs(sinp) >= 1.0 - 1e-7
+
+    pitch = np.where(locked, np.copysign(np.pi / 2, sinp), np.arcsin(np.clip(sinp, -1.0, 1.0)))
+    roll = np.where(
+        locked, 2 * np.arctan2(x, w),
+        np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    )
+    yaw = np.where(locked, 0.0, np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z)))
+
+    out[:, 0] = np.degrees(roll)
+    out[:, 1] = np.degrees(pitch)
+    out[:, 2] = np.degrees(yaw)
+    return out
+
+
+def batch_quaternion_matrix(q, out=None):
+    x, y, z, w = batch_normalize(q).astype(np.float64).T
+    if out is None:
+        out = np.empty((len(x), 4, 4), dtype=np.float32)
+
+    xx, yy, zz = x*x, y*y, z*z
+    wx, wy, wz = w*x, w*y, w*z
+    xy, xz, yz = x*y, x*z, y*z
+
+    out[:, 0, 0] = 1.0 - 2.0*(yy + zz)
+    out[:, 0, 1] = 2.0*(xy - wz)
+    out[:, 0, 2] = 2.0*(xz + wy)
+    out[:, 1, 0] = 2.0*(xy + wz)
+    out[:, 1, 1] = 1.0 - 2.0*(xx + zz)
+    out[:, 1, 2] = 2.0*(yz - wx)
+    out[:, 2, 0] = 2.0*(xz - wy)
+    out[:, 2, 1] = 2.0*(yz + wx)
+    out[:, 2, 2] = 1.0 - 2.0*(xx + yy)
+    out[:, :3, 3] = 0.0
+    out[:, 3, :3] = 0.0
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def batch_transformation_matrix(
+    positions: npt.NDArray[np.float32],
+    rotation_quaternions: npt.NDArray[np.float32],
+    scales: npt.NDArray[np.float32],
+    out: npt.NDArray[np.float32] | None = None
+) -> npt.NDArray[np.float32]:
+    # model matrices, in float64 like batch_quaternion_mul, matching update_transformation_matrix
+    x, y, z, w = np.asarray(rotation_quaternions, dtype=np.float64).T
+    sx, sy, sz = np.asarray(scales, dtype=np.float64).T
+    if out is None:
+        out = np.empty((len(x), 4, 4), dtype=np.float32)
+
+    mag2 = x*x + y*y + z*z + w*w
+    renormalize = (np.abs(mag2 - 1.0) > 1e-6) & (mag2 > 1e-8)
+    if renormalize.any():
+        mag = np.where(renormalize, np.sqrt(mag2), 1.0)
+        x = x / mag; y = y / mag; z = z / mag; w = w / mag
+
+    x2, y2, z2 = x * 2.0, y * 2.0, z * 2.0
+    xx, xy, xz = x * x2, x * y2, x * z2
+    yy, yz, zz = y * y2, y * z2, z * z2
+    wx, wy, wz = w * x2, w * y2, w * z2
+
+    out[:, 0, 0] = (1.0 - (yy + zz)) * sx
+    out[:, 0, 1] = (xy - wz) * sy
+    out[:, 0, 2] = (xz + wy) * sz
+    out[:, 1, 0] = (xy + wz) * sx
+    out[:, 1, 1] = (1.0 - (xx + zz)) * sy
+    out[:, 1, 2] = (yz - wx) * sz
+    out[:, 2, 0] = (xz - wy) * sx
+    out[:, 2, 1] = (yz + wx) * sy
+    out[:, 2, 2] = (1.0 - (xx + yy)) * sz
+    out[:, :3, 3] = positions
+    out[:, 3, :3] = 0.0
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def batch_transform_aabb(matrices, minimums, maximums, out=None):
+    # axis-aligned boxes around the transformed boxes (N, 3) minimums / maximums: the center
+    # is transformed, the half extents go through the absolute of the upper 3x3.
+    # `out` is a (minimums, maximums) pair.
+    matrices = np.asarray(matrices, dtype=np.float64)
+    minimums = np.asarray(minimums, dtype=np.float64)
+    maximums = np.asarray(maximums, dtype=np.float64)
+    if out is None:
+        out = (np.empty((len(matrices), 3), dtype=np.float32), np.empty((len(matrices), 3), dtype=np.float32))
+
+    linear = matrices[:, :3, :3]
+    centers = np.einsum("nij,nj->ni", linear, (minimums + maximums) * 0.5) + matrices[:, :3, 3]
+    extents = np.einsum("nij,nj->ni", np.abs(linear), (maximums - minimums) * 0.5)
+    np.subtract(centers, extents, out=out[0])
+    np.add(centers, extents, out=out[1])
+    return out
+
+
+def batch_aabb_in_frustum(planes, minimums, maximums, out=None):
+    # whether each box is at least partly inside the planes from frustum_planes(): a box is
+    # outside when its corner furthest along a plane's normal is behind that plane.
+    # conservative, boxes near a corner of the frustum may pass while being outside.
+    # `out` is an (N, ) bool array.
+    planes = np.asarray(planes, dtype=np.float64)
+    normals = planes[:, :3]
+    if out is None:
+        out = np.empty(len(minimums), dtype=np.bool_)
+
+    furthest = (
+        np.asarray(maximums, dtype=np.float64) @ np.maximum(normals, 0.0).T
+        + np.asarray(minimums, dtype=np.float64) @ np.minimum(normals, 0.0).T
+    )
+    np.all(furthest + planes[:, 3] >= 0.0, axis=1, out=out)
+    return out
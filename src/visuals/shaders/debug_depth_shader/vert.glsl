@@ -1,5 +1,7 @@
 #version 450 core
 layout (location = 0) in vec3 a_Pos;
+// per instance, a column per location
+layout (location = 4) in mat4 a_Model;
 
 layout (std140) uniform SceneData {
     mat4 u_Projection;
@@ -8,8 +10,6 @@ layout (std140) uniform SceneData {
     float u_Time;
 };
 
-uniform mat4 u_Model;
-
 void main() {
-    gl_Position = u_Projection * u_View * vec4(vec3(u_Model * vec4(a_Pos, 1.0)), 1.0);
+    gl_Position = u_Projection * u_View * vec4(vec3(a_Model * vec4(a_Pos, 1.0)), 1.0);
 }
\ No newline at end of file
@@ -8,8 +8,8 @@ layout (std140) uniform SceneData {
     float u_Time;
 };
 
-uniform uint u_EntityID;
+flat in uint v_EntityID;
 
 void main() {
-    FragColor = u_EntityID;
+    FragColor = v_EntityID;
 }
@@ -2,6 +2,9 @@
 layout (location = 0) in vec3 a_Pos;
 layout (location = 1) in vec3 a_Normal;
 layout (location = 2) in vec2 a_UV;
+// per instance, a column per location
+layout (location = 4) in mat4 a_Model;
+layout (location = 8) in uint a_EntityID;
 
 layout (std140) uniform SceneData {
     mat4 u_Projection;
@@ -10,10 +13,12 @@ layout (std140) uniform SceneData {
     float u_Time;
 };
 
-uniform mat4 u_Model;
 // uniform vec3 u_EntityColor;
 
+flat out uint v_EntityID;
+
 void main() {
-    vec3 worldPos = vec3(u_Model * vec4(a_Pos, 1.0));
+    v_EntityID = a_EntityID;
+    vec3 worldPos = vec3(a_Model * vec4(a_Pos, 1.0));
     gl_Position = u_Projection * u_View * vec4(worldPos, 1.0);
 }
\ No newline at end of file
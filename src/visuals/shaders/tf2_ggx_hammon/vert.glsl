@@ -3,6 +3,8 @@ layout (location = 0) in vec3 a_Pos;
 layout (location = 1) in vec3 a_Normal;
 layout (location = 2) in vec2 a_UV;
 layout (location = 3) in vec3 a_Tangent;
+// per instance, a column per location
+layout (location = 4) in mat4 a_Model;
 
 layout (std140) uniform SceneData {
     mat4 u_Projection;
@@ -11,16 +13,14 @@ layout (std140) uniform SceneData {
     float u_Time;
 };
 
-uniform mat4 u_Model;
-
 out vec3 v_WorldPos;
 out vec3 v_Normal;
 out vec2 v_UV;
 out vec3 v_Tangent;
 
 void main() {
-    v_WorldPos = vec3(u_Model * vec4(a_Pos, 1.0));
-    mat3 normalMatrix = mat3(transpose(inverse(u_Model)));
+    v_WorldPos = vec3(a_Model * vec4(a_Pos, 1.0));
+    mat3 normalMatrix = mat3(transpose(inverse(a_Model)));
     v_Normal = normalMatrix * a_Normal;
     v_Tangent = normalMatrix * a_Tangent;
     v_UV = a_UV;